@@ -0,0 +1,90 @@
+"""
+Micro-benchmark: per-page CPU cost of listing/ad extraction.
+
+Compares the previous per-node parsel XPath path (plus the joins
+CleaningPipeline used to do) against careerjet.extractors, on the saved
+fixtures in benchmarks/fixtures.
+
+    python benchmarks/bench_extraction.py [--repeat 200]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+from parsel import Selector
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "careerjet"))
+
+from careerjet.extractors import extract_description, extract_listing  # noqa: E402
+
+FIXTURES = os.path.join(HERE, "fixtures")
+BASE_URL = "https://www.careerjet.com.bd/jobs?s=&l=Bangladesh"
+
+
+def load(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def listing_per_node(selector):
+    """The extraction CareerjetCrawlerSpider.parse and CleaningPipeline used to do."""
+    jobs = []
+    for job in selector.xpath("//ul[@class='jobs']//li/article"):
+        company = job.xpath(".//p[@class='company']//text()").getall() or []
+        location = job.xpath(".//ul[@class='location']//text()").getall() or []
+        salary = job.xpath(".//ul[@class='salary']//text()").getall() or []
+        jobs.append({
+            'title': (job.xpath(".//header/h2/a/text()").get() or '').strip(),
+            'company': " ".join(p.strip() for p in company if p.strip()) or None,
+            'job_link': job.xpath(".//header/h2/a/@href").get(),
+            'location': " ".join(p.strip() for p in location if p.strip()) or None,
+            'salary': "".join(p.strip() for p in salary if p.strip()) or None,
+        })
+    return jobs
+
+
+def description_per_node(selector):
+    parts = selector.xpath("//section[@class='content']//text()").getall()
+    return " ".join(part.strip() for part in parts if part.strip())
+
+
+def bench(label, func, repeat):
+    seconds = min(timeit.repeat(func, number=repeat, repeat=3)) / repeat
+    print(f"  {label:<28} {seconds * 1e6:9.1f} µs/page")
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    listing_html = load("listing.html")
+    ad_html = load("job_ad.html")
+    listing = Selector(text=listing_html)
+    ad = Selector(text=ad_html)
+
+    assert len(listing_per_node(listing)) == len(extract_listing(listing.root, BASE_URL))
+    assert description_per_node(ad) == extract_description(ad.root)
+
+    print(f"Listing page ({len(extract_listing(listing.root, BASE_URL))} jobs), extraction only:")
+    before = bench("per-node parsel XPath", lambda: listing_per_node(listing), args.repeat)
+    after = bench("compiled lxml XPath", lambda: extract_listing(listing.root, BASE_URL), args.repeat)
+    print(f"  speed-up: {before / after:.1f}x")
+
+    print("Listing page, parse + extraction:")
+    before = bench("per-node parsel XPath", lambda: listing_per_node(Selector(text=listing_html)), args.repeat)
+    after = bench("compiled lxml XPath",
+                  lambda: extract_listing(Selector(text=listing_html).root, BASE_URL), args.repeat)
+    print(f"  speed-up: {before / after:.1f}x")
+
+    print("Job ad page, extraction only:")
+    before = bench("per-node parsel XPath", lambda: description_per_node(ad), args.repeat)
+    after = bench("compiled lxml XPath", lambda: extract_description(ad.root), args.repeat)
+    print(f"  speed-up: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Cold-start budget for the command-line entry points.
+
+Imports each entry point in a fresh interpreter under `python -X importtime`
+(without COHERE_API_KEY, so a module that still needs the key at import
+fails here too) and compares the fastest cumulative import time of a few
+runs (the least disturbed by other load) with
+benchmarks/importtime_budget.json. The extractor entry points must also not
+load LangChain or Cohere at import time; those are deferred until the first
+LLM call.
+
+    python benchmarks/bench_importtime.py               # exits 1 on a regression
+    python benchmarks/bench_importtime.py --verbose     # also list the slowest imports
+    python benchmarks/bench_importtime.py --write-budget
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.join(HERE, "..", "careerjet")
+EXTRACTOR_DIR = os.path.join(HERE, "..", "job_info_extractor_ai")
+BUDGET_PATH = os.path.join(HERE, "importtime_budget.json")
+
+# (module, directory it is run from, whether LangChain/Cohere may be imported)
+ENTRY_POINTS = (
+    ("get_job_components", EXTRACTOR_DIR, False),
+    ("concurrent_extractor", EXTRACTOR_DIR, False),
+    ("extraction_cache", EXTRACTOR_DIR, False),
+    ("job_store", EXTRACTOR_DIR, False),
+    ("check_db", PROJECT_DIR, False),
+    ("tail_feed", PROJECT_DIR, False),
+    ("search_jobs", PROJECT_DIR, False),
+)
+HEAVY_PREFIXES = ("langchain", "cohere", "langsmith")
+
+
+def import_profile(module, directory):
+    """[(module name, nesting depth, self µs, cumulative µs)] of one cold import."""
+    env = {key: value for key, value in os.environ.items() if key != "COHERE_API_KEY"}
+    env["PYTHONPATH"] = os.path.abspath(directory)
+    # Run elsewhere: get_job_components opens its log file in the working directory
+    with tempfile.TemporaryDirectory() as cwd:
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=cwd, env=env, capture_output=True, text=True,
+        )
+    if completed.returncode:
+        raise RuntimeError(f"import {module} failed:\n{completed.stderr.strip().splitlines()[-1]}")
+    profile = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        profile.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+    return profile
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5, help="Cold imports per entry point")
+    parser.add_argument("--budget", default=BUDGET_PATH)
+    parser.add_argument("--write-budget", action="store_true",
+                        help="Write the measured times times --headroom plus --slack as the new budget")
+    parser.add_argument("--headroom", type=float, default=1.5)
+    parser.add_argument("--slack", type=float, default=10.0, help="Milliseconds added to every budget")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    budget = {}
+    if os.path.exists(args.budget) and not args.write_budget:
+        with open(args.budget, encoding="utf-8") as f:
+            budget = json.load(f)
+
+    measured, failures = {}, []
+    print(f"{'entry point':<24}{'best ms':>10}{'budget ms':>10}")
+    for module, directory, heavy_allowed in ENTRY_POINTS:
+        profiles = [import_profile(module, directory) for _ in range(args.runs)]
+        total = min(
+            next(cumulative for name, _, _, cumulative in profile if name == module) for profile in profiles
+        ) / 1000
+        measured[module] = round(total, 1)
+        limit = budget.get(module)
+        print(f"{module:<24}{total:>10.1f}{limit if limit is not None else '-':>10}")
+        if limit is not None and total > limit:
+            failures.append(f"{module}: {total:.1f} ms > {limit} ms")
+        heavy = sorted({name for name, _, _, _ in profiles[0] if name.startswith(HEAVY_PREFIXES)})
+        if heavy and not heavy_allowed:
+            failures.append(f"{module} imports {', '.join(heavy[:3])}{' ...' if len(heavy) > 3 else ''}")
+        if args.verbose:
+            slowest = sorted((p for p in profiles[0] if p[1] == 1), key=lambda p: -p[3])[:5]
+            for name, _, _, cumulative in slowest:
+                print(f"    {name:<36}{cumulative / 1000:>8.1f}")
+
+    if args.write_budget:
+        with open(args.budget, "w", encoding="utf-8") as f:
+            json.dump({module: round(ms * args.headroom + args.slack) for module, ms in measured.items()}, f, indent=2)
+            f.write("\n")
+        print(f"Wrote {args.budget}")
+    for failure in failures:
+        print(f"REGRESSION {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Benchmark backfill_normalized.py against the per-item normalization path.
+
+Builds a throwaway `jobs` table of --rows synthetic listings, checks that
+careerjet.normalize.normalize_frame agrees with parse_salary /
+canonical_location on every distinct input, then times both backfills.
+
+    python benchmarks/bench_normalize.py [--rows 300000]
+"""
+import argparse
+import contextlib
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "careerjet"))
+
+import pandas as pd  # noqa: E402
+
+from backfill_normalized import backfill, update_buffer  # noqa: E402
+from careerjet.db import connect, ensure_change_tracking, ensure_columns, write_batch  # noqa: E402
+from careerjet.normalize import (  # noqa: E402
+    NORMALIZED_COLUMNS, canonical_location, normalize_frame, parse_salary,
+)
+
+SALARIES = [
+    None, "", "22000-26000", "300000", "৳ 22,000 - 26,000", "৳ 62,000 - 76,000 per month",
+    "Tk. 15,000 to 20,000 monthly", "BDT 1,200,000 per annum", "$ 1,500 - 2,000 / month",
+    "25k - 30k", "৳ 500 per hour", "Negotiable", "USD 40,000 a year", "15000 - 18000 Taka",
+]
+LOCATIONS = [
+    None, "", "Dhaka", "dhaka", "  Jamalpur,  Mymensingh", "Chittagong", "Chattogram, Chattogram",
+    "Comilla", "Bangladesh", "Barisal", "Jessore, Khulna", "Bogra", "Sylhet ",
+]
+
+
+def same(a, b):
+    if a is None or (isinstance(a, float) and math.isnan(a)) or a is pd.NA:
+        return b is None or (isinstance(b, float) and math.isnan(b)) or b is pd.NA
+    return a == b
+
+
+def check_agreement():
+    inputs = [(salary, location) for salary in SALARIES for location in LOCATIONS]
+    frame = pd.DataFrame(inputs, columns=["salary", "location"])
+    vectorized = normalize_frame(frame, "BDT")
+    for index, (salary, location) in enumerate(inputs):
+        expected = {**parse_salary(salary, "BDT"), "location_canonical": canonical_location(location)}
+        for column, value in expected.items():
+            got = vectorized.at[index, column]
+            assert same(value, got), f"{column} for {salary!r}/{location!r}: {value!r} != {got!r}"
+    print(f"normalize_frame matches the per-item path on {len(frame)} inputs")
+
+
+def build_db(path, rows):
+    rng = random.Random(7)
+    conn = connect(path)
+    conn.execute("""
+        CREATE TABLE jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT, company TEXT, job_link TEXT UNIQUE,
+            location TEXT, salary TEXT, page INTEGER, scraped_at DATETIME, crawl_status TEXT
+        )
+    """)
+    write_batch(conn, {"INSERT INTO jobs (job_link, salary, location) VALUES (?, ?, ?)": [
+        (f"https://example.com/jobad/{i}", rng.choice(SALARIES), rng.choice(LOCATIONS))
+        for i in range(rows)
+    ]})
+    conn.close()
+
+
+def per_item_backfill(path):
+    conn = connect(path)
+    ensure_columns(conn, "jobs", NORMALIZED_COLUMNS)
+    ensure_change_tracking(conn, "jobs")
+    rows = [
+        (*parse_salary(salary, "BDT").values(), canonical_location(location), job_id)
+        for job_id, salary, location in conn.execute("SELECT id, salary, location FROM jobs")
+    ]
+    write_batch(conn, update_buffer(rows))
+    conn.close()
+    return len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=300000)
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    parser.add_argument("--keep", action="store_true", help="Keep the benchmark databases and print their directory")
+    args = parser.parse_args()
+
+    check_agreement()
+    with (contextlib.nullcontext(tempfile.mkdtemp(prefix="careerjet-normalize-")) if args.keep
+          else tempfile.TemporaryDirectory(prefix="careerjet-normalize-")) as workdir:
+        for label, run in (
+            ("per-item parse_salary", per_item_backfill),
+            ("vectorized backfill", lambda path: backfill(path, args.chunk_size)),
+        ):
+            path = os.path.join(workdir, f"{label.split()[0]}.db")
+            build_db(path, args.rows)
+            started = time.perf_counter()
+            total = run(path)
+            seconds = time.perf_counter() - started
+            print(f"  {label:<24} {total} rows in {seconds:6.2f}s ({total / seconds:,.0f} rows/s)")
+    if args.keep:
+        print(f"Databases kept in {workdir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Benchmark the full-text search index (careerjet.search).
+
+Builds --rows synthetic jobs with descriptions and extracted components,
+times the initial index build and an incremental sync after a few changes,
+then reports query latency percentiles for keyword, filtered and phrase
+queries, ranking every match and only the newest --max-candidates window.
+
+    python benchmarks/bench_search.py [--rows 300000] [--queries 200]
+"""
+import argparse
+import contextlib
+import itertools
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "careerjet"))
+
+from careerjet.db import connect, ensure_change_tracking, write_batch  # noqa: E402
+from careerjet.search import match_expression, search, sync_index  # noqa: E402
+from pages import COMPANIES, LOCATIONS, TITLES  # noqa: E402
+
+SKILLS = [
+    "python", "django", "excel", "accounting", "tally", "photoshop", "illustrator", "sql", "tableau",
+    "negotiation", "logistics", "procurement", "recruitment", "marketing", "english", "bangla",
+    "javascript", "react", "communication", "leadership", "inventory", "audit", "vat", "sales",
+]
+# Zipf-distributed vocabulary, so term frequencies look like real postings: a
+# few words are in most ads, most words are rare. Skills get mid-range ranks.
+VOCABULARY = [f"w{i}" for i in range(20000)]
+for position, skill in enumerate(SKILLS):
+    VOCABULARY.insert(20 + 15 * position, skill)
+CUMULATIVE = list(itertools.accumulate(1 / (rank + 5) for rank in range(len(VOCABULARY))))
+QUERIES = [
+    ("python", {}),
+    ("software engineer", {}),
+    ("accounts officer tally", {}),
+    ("procurement", {"location": "Chattogram"}),
+    ("sales", {"location": "dhaka", "min_salary": 40000}),
+    ("data analyst sql", {"max_salary": 30000}),
+    ('"graphic designer" photoshop', {"raw": True}),
+    ("title: manager AND recruitment", {"raw": True}),
+    ("python", {"location": "Sylhet", "min_salary": 150000}),  # Filters leave few of the newest matches
+]
+# search_jobs.py --max-candidates timed against exact ranking
+CANDIDATE_WINDOW = 5000
+
+
+def text(rng, words):
+    return " ".join(rng.choices(VOCABULARY, cum_weights=CUMULATIVE, k=words)) + "."
+
+
+def build_db(path, rows):
+    rng = random.Random(11)
+    conn = connect(path)
+    conn.executescript("""
+        CREATE TABLE jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT, company TEXT, job_link TEXT UNIQUE,
+            location TEXT, salary TEXT, location_canonical TEXT, salary_min REAL, salary_max REAL,
+            salary_currency TEXT
+        );
+        CREATE TABLE job_description (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, job_link TEXT UNIQUE, job_description TEXT, status TEXT
+        );
+        CREATE TABLE job_components (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, job_link TEXT UNIQUE,
+            job_responsibilities TEXT, job_requirements TEXT
+        );
+    """)
+    for table in ("jobs", "job_description", "job_components"):  # As the spiders and extractor do
+        ensure_change_tracking(conn, table)
+    for start in range(0, rows, 50000):
+        jobs, descriptions, components = [], [], []
+        for i in range(start, min(rows, start + 50000)):
+            link = f"https://example.com/jobad/{i}"
+            low = rng.randrange(10, 120) * 1000
+            location = rng.choice(LOCATIONS)
+            jobs.append((rng.choice(TITLES), rng.choice(COMPANIES), link, location, location, low, low * 1.3, "BDT"))
+            descriptions.append((link, text(rng, 80)))
+            if i % 3:
+                components.append((link, text(rng, 15), text(rng, 15)))
+        write_batch(conn, {
+            "INSERT INTO jobs (title, company, job_link, location, location_canonical, salary_min, salary_max, "
+            "salary_currency) VALUES (?, ?, ?, ?, ?, ?, ?, ?)": jobs,
+            "INSERT INTO job_description (job_link, job_description, status) VALUES (?, ?, 'DONE')": descriptions,
+            "INSERT INTO job_components (job_link, job_responsibilities, job_requirements) VALUES (?, ?, ?)":
+                components,
+        })
+    conn.close()
+
+
+def benchmark(path, args):
+    """Build the database at `path`, index it and time the queries."""
+    build_db(path, args.rows)
+    conn = connect(path)
+
+    started = time.perf_counter()
+    indexed = sync_index(conn)
+    print(f"  initial index       {indexed} jobs in {time.perf_counter() - started:6.2f}s")
+
+    # A re-crawled description, a backfilled listing and components rewritten in place, as the spiders,
+    # backfill_normalized.py and the extractor would write them, and a claim that must not re-index its job
+    conn.execute("INSERT OR REPLACE INTO job_description (job_link, job_description, status) "
+                 "VALUES ('https://example.com/jobad/5', 'kubernetes operator wanted.', 'NEW')")
+    conn.execute("UPDATE jobs SET title = 'Platform Engineer', company = 'Meghna Group' "
+                 "WHERE job_link = 'https://example.com/jobad/7'")
+    conn.execute("UPDATE job_components SET job_responsibilities = 'terraform pipelines.' "
+                 "WHERE job_link = 'https://example.com/jobad/10'")
+    conn.execute("UPDATE job_description SET status = 'IN_PROGRESS' WHERE job_link = 'https://example.com/jobad/12'")
+    started = time.perf_counter()
+    indexed = sync_index(conn)
+    print(f"  incremental sync    {indexed} jobs in {time.perf_counter() - started:6.2f}s")
+    assert indexed == 3, f"{indexed} jobs re-indexed after 3 content changes"
+    assert [r["job_link"] for r in search(conn, "kubernetes")] == ["https://example.com/jobad/5"]
+    assert search(conn, "platform engineer")[0]["job_link"] == "https://example.com/jobad/7"
+    assert [r["job_link"] for r in search(conn, "terraform")] == ["https://example.com/jobad/10"]
+    (entries,) = conn.execute("SELECT COUNT(*) FROM jobs_fts").fetchone()
+    assert entries == args.rows, f"{entries} index entries for {args.rows} jobs"
+
+    for query, options in QUERIES:
+        (matches,) = conn.execute("SELECT COUNT(*) FROM jobs_fts WHERE jobs_fts MATCH ?",
+                                  (query if options.get("raw") else match_expression(query),)).fetchone()
+        line = f"  {query + ' ' + str(options or ''):<58} {matches:7d} matches"
+        for label, max_candidates in (("all", None), (f"newest {CANDIDATE_WINDOW}", CANDIDATE_WINDOW)):
+            timings = []
+            for _ in range(args.queries):
+                started = time.perf_counter()
+                search(conn, query, max_candidates=max_candidates, **options)
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            line += (f"  {label} p50 {statistics.median(timings):6.2f} ms"
+                     f" p95 {timings[int(len(timings) * 0.95)]:6.2f} ms")
+        print(line)
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=300000)
+    parser.add_argument("--queries", type=int, default=200, help="Timed runs of each query")
+    parser.add_argument("--keep", action="store_true", help="Keep the benchmark database and print its path")
+    args = parser.parse_args()
+
+    with (contextlib.nullcontext(tempfile.mkdtemp(prefix="careerjet-search-")) if args.keep
+          else tempfile.TemporaryDirectory(prefix="careerjet-search-")) as workdir:
+        path = os.path.join(workdir, "jobs.db")
+        benchmark(path, args)
+    if args.keep:
+        print(f"Database kept at {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Measure rule pre-extraction (job_info_extractor_ai/rule_extractor.py) against
+hand-labelled job descriptions.
+
+For every field it reports coverage (share of jobs where the rules are
+confident enough to be used), accuracy on those jobs, and the route each job
+would take: rules only, a sections-only LLM call, or the full LLM schema.
+
+    python benchmarks/eval_rule_extractor.py [--threshold 0.7] [--verbose]
+
+Fixtures carry the company shown on the job's listing page, as the
+extractor passes it from the `jobs` table. Text fields count as correct when
+their word-level F1 with the label is at least --min-f1; emails must match
+exactly, and an expected None must be None.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+from collections import Counter
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "job_info_extractor_ai"))
+
+from rule_extractor import DEFAULT_RULES_THRESHOLD, RULE_FIELDS, SECTION_FIELDS, pre_extract  # noqa: E402
+
+FIXTURES = os.path.join(HERE, "fixtures", "job_descriptions.json")
+_word = re.compile(r"\w+")
+
+
+def f1(expected, got):
+    expected, got = Counter(_word.findall(expected.lower())), Counter(_word.findall(got.lower()))
+    common = sum((expected & got).values())
+    if not common:
+        return 0.0
+    precision, recall = common / sum(got.values()), common / sum(expected.values())
+    return 2 * precision * recall / (precision + recall)
+
+
+def correct(field, expected, got, min_f1):
+    if expected is None or got is None:
+        return expected is None and got is None
+    if field == "application_email":
+        return expected.lower() == got.lower()
+    return f1(expected, got) >= min_f1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--fixtures", default=FIXTURES)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_RULES_THRESHOLD)
+    parser.add_argument("--min-f1", type=float, default=0.6)
+    parser.add_argument("--verbose", action="store_true", help="Print every confident wrong value")
+    args = parser.parse_args()
+
+    with open(args.fixtures, encoding="utf-8") as f:
+        fixtures = json.load(f)
+    covered, right, plans = Counter(), Counter(), Counter()
+    for fixture in fixtures:
+        extraction = pre_extract(fixture["description"], fixture.get("listing_company"))
+        plans[extraction.plan(args.threshold)] += 1
+        for field, value in extraction.confident(args.threshold).items():
+            covered[field] += 1
+            if correct(field, fixture["expected"][field], value, args.min_f1):
+                right[field] += 1
+            elif args.verbose:
+                print(f"  {fixture['id']}: {field} = {value!r} "
+                      f"(confidence {extraction.confidence[field]}), expected {fixture['expected'][field]!r}")
+
+    total = len(fixtures)
+    print(f"{total} labelled descriptions, threshold {args.threshold}")
+    print(f"  {'field':<22} {'coverage':>9} {'accuracy':>9}")
+    for field in SECTION_FIELDS + RULE_FIELDS:
+        accuracy = f"{right[field] / covered[field]:9.0%}" if covered[field] else f"{'-':>9}"
+        print(f"  {field:<22} {covered[field] / total:9.0%} {accuracy}")
+    used = sum(covered.values())
+    print(f"  {'all fields':<22} {used / (total * len(SECTION_FIELDS + RULE_FIELDS)):9.0%} "
+          f"{(sum(right.values()) / used if used else 0):9.0%}")
+    print("  route: " + ", ".join(f"{plan} {plans[plan]}" for plan in ("rules", "sections", "llm")))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Local stand-in for careerjet.com.bd serving synthetic listing pages and job ads.
+
+    python benchmarks/fake_careerjet.py --port 8765 --latency 0.05 --error-rate 0.01
+
+Point the spiders at it with `-s CAREERJET_BASE_URL=http://127.0.0.1:8765`.
+"""
+import argparse
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from pages import job_ad_page, listing_page
+
+
+class FakeCareerjetHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        config = self.server.config
+        delay = config["latency"] + random.uniform(-config["jitter"], config["jitter"])
+        if delay > 0:
+            time.sleep(delay)
+
+        url = urlparse(self.path)
+        if url.path == "/robots.txt":
+            return self.respond(200, "User-agent: *\nAllow: /\n", "text/plain")
+        if random.random() < config["error_rate"]:
+            return self.respond(503, "Service Unavailable", "text/plain")
+        if url.path == "/jobs":
+            page = int(parse_qs(url.query).get("p", ["1"])[0])
+            jobs = config["jobs_per_page"] if page <= config["pages"] else 0
+            return self.respond(200, listing_page(page, jobs))
+        if url.path.startswith("/jobad/"):
+            return self.respond(200, job_ad_page(url.path.rsplit("/", 1)[-1]))
+        self.respond(404, "Not Found", "text/plain")
+
+    def respond(self, status, body, content_type="text/html; charset=utf-8"):
+        payload = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeCareerjetServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256  # The default of 5 makes concurrent clients hit SYN retries
+
+
+def make_server(host="127.0.0.1", port=0, latency=0.0, jitter=0.0, error_rate=0.0,
+                pages=100, jobs_per_page=20):
+    """Create (but do not start) a server; port 0 picks a free port."""
+    server = FakeCareerjetServer((host, port), FakeCareerjetHandler)
+    server.config = {
+        "latency": latency,
+        "jitter": jitter,
+        "error_rate": error_rate,
+        "pages": pages,
+        "jobs_per_page": jobs_per_page,
+    }
+    return server
+
+
+def serve_in_background(**kwargs):
+    """Start a server on a daemon thread and return (server, base_url)."""
+    server = make_server(**kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve synthetic Careerjet pages.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Mean response delay (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="± uniform jitter on the delay (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of 503 responses")
+    parser.add_argument("--pages", type=int, default=100, help="Listing pages that contain jobs")
+    parser.add_argument("--jobs-per-page", type=int, default=20)
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.latency, args.jitter, args.error_rate,
+                         args.pages, args.jobs_per_page)
+    print(f"Serving fake Careerjet on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
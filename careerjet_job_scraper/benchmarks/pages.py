@@ -0,0 +1,92 @@
+"""
+Synthetic Careerjet pages with the same structure the spiders parse:
+listing pages (`ul.jobs li article`) and job ads (`section.content`).
+"""
+import random
+
+TITLES = [
+    "Senior Software Engineer", "Area Manager Student Recruitment", "Accounts Officer",
+    "Freelance Business Content Writer (English)", "Sales Executive", "Data Analyst",
+    "Customer Service Representative", "Graphic Designer", "Procurement Manager",
+]
+COMPANIES = [
+    "Funding Dreams Initiative", "Bengal Tech Ltd.", "Padma Garments", "Meghna Group",
+    "Jamuna Logistics", "Shapla Foods",
+]
+LOCATIONS = ["Dhaka", "Chattogram", "Sylhet", "Khulna", "Rajshahi", "Bangladesh"]
+
+
+def job_id(page, index):
+    return f"bd{page:06d}{index:04d}"
+
+
+def listing_page(page, jobs_per_page=20, seed=None):
+    """HTML for listing page `page`, with `jobs_per_page` articles."""
+    rng = random.Random(page if seed is None else seed)
+    articles = []
+    for index in range(jobs_per_page):
+        low = rng.randrange(5, 80) * 1000
+        salary = (
+            f'<ul class="salary"><li>৳ {low:,} - {low + rng.randrange(2, 20) * 1000:,}</li></ul>'
+            if rng.random() < 0.6 else ''
+        )
+        articles.append(f'''
+      <li>
+        <article class="job clicky" data-url="/jobad/{job_id(page, index)}">
+          <header>
+            <h2><a href="/jobad/{job_id(page, index)}" title="x">
+              {rng.choice(TITLES)}
+            </a></h2>
+          </header>
+          <p class="company">
+            <a href="#">{rng.choice(COMPANIES)}</a>
+          </p>
+          <ul class="location">
+            <li>{rng.choice(LOCATIONS)}</li>
+          </ul>
+          {salary}
+          <div class="desc">Short teaser for the job ad …</div>
+          <footer><ul class="tags"><li><span class="badge">Full time</span></li></ul></footer>
+        </article>
+      </li>''')
+    return f'''<!DOCTYPE html>
+<html lang="en">
+<head><title>Jobs in Bangladesh - page {page}</title></head>
+<body>
+  <nav><ul><li><a href="/">Home</a></li><li><a href="/jobs">Jobs</a></li></ul></nav>
+  <main>
+    <ul class="jobs">{"".join(articles)}
+    </ul>
+  </main>
+  <footer><p>© Careerjet</p></footer>
+</body>
+</html>'''
+
+
+def job_ad_page(ad_id, paragraphs=12, seed=None):
+    """HTML for one job ad, with a `section.content` description."""
+    rng = random.Random(ad_id if seed is None else seed)
+    email = f"hr{rng.randrange(100)}@example.com"
+    body = "\n".join(
+        f"<p>{rng.choice(TITLES)} will {rng.choice(['coordinate', 'deliver', 'own', 'review'])} "
+        f"daily work with {rng.choice(COMPANIES)} teams in {rng.choice(LOCATIONS)}.</p>"
+        for _ in range(paragraphs)
+    )
+    return f'''<!DOCTYPE html>
+<html lang="en">
+<head><title>{rng.choice(TITLES)}</title></head>
+<body>
+  <nav><ul><li><a href="/">Home</a></li></ul></nav>
+  <section class="content">
+    <h3>Job Responsibilities</h3>
+    {body}
+    <h3>Requirements</h3>
+    <ul><li>Bachelor degree</li><li>2+ years of experience</li></ul>
+    <p>Salary: Tk. {rng.randrange(10, 90) * 1000:,} per month</p>
+    <p>Send your CV to <a href="mailto:{email}">{email}</a></p>
+    <p>Only shortlisted candidates will be called for interview.</p>
+    <p>We are an equal opportunity employer.</p>
+  </section>
+  <footer><p>© Careerjet</p></footer>
+</body>
+</html>'''
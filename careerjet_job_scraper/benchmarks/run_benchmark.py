@@ -0,0 +1,298 @@
+"""
+End-to-end offline benchmark of the scraping and extraction stages.
+
+Starts benchmarks/fake_careerjet.py, runs careerjet_crawler and
+careerjet_description against it into a throwaway database, then runs the
+async extractor with the stub LLM. Reports items per second, p50/p99
+latency and database write time per stage.
+
+    python benchmarks/run_benchmark.py --pages 20 --latency 0.02 --output bench.json
+    python benchmarks/run_benchmark.py --baseline bench.json   # fail on regressions
+    python benchmarks/run_benchmark.py --postgres postgresql://localhost/careerjet_bench
+
+With --postgres, both spiders and the extractor use that database
+(STORAGE_BACKEND = 'postgres') instead of a throwaway SQLite file; point it
+at an empty database (benchmarks/check_postgres.py creates one).
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.join(HERE, "..", "careerjet")
+EXTRACTOR_DIR = os.path.join(HERE, "..", "job_info_extractor_ai")
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def summarize(items, seconds, latencies, db_write_seconds):
+    return {
+        "items": items,
+        "seconds": round(seconds, 3),
+        "items_per_second": round(items / seconds, 2) if seconds else 0.0,
+        "latency_p50_ms": round(percentile(latencies, 50) * 1000, 1) if latencies else None,
+        "latency_p99_ms": round(percentile(latencies, 99) * 1000, 1) if latencies else None,
+        "db_write_seconds": round(db_write_seconds, 4),
+    }
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(args):
+    port = free_port()
+    server = subprocess.Popen([
+        sys.executable, os.path.join(HERE, "fake_careerjet.py"),
+        "--port", str(port),
+        "--latency", str(args.latency),
+        "--jitter", str(args.jitter),
+        "--error-rate", str(args.error_rate),
+        "--pages", str(args.pages),
+        "--jobs-per-page", str(args.jobs_per_page),
+    ], stdout=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(f"{base_url}/robots.txt", timeout=1)
+            return server, base_url
+        except OSError:
+            time.sleep(0.05)
+    server.terminate()
+    raise RuntimeError("Fake Careerjet server did not start")
+
+
+class LatencyRecorder:
+    """Collects download latency for every response a crawler receives."""
+
+    def __init__(self):
+        self.latencies = []
+
+    def response_received(self, response, request, spider):
+        latency = request.meta.get("download_latency")
+        if latency is not None:
+            self.latencies.append(latency)
+
+
+def run_spiders(base_url, db_path, args):
+    backend = "postgres" if args.postgres else "sqlite"
+    sys.path.insert(0, PROJECT_DIR)
+    os.environ.setdefault("SCRAPY_SETTINGS_MODULE", "careerjet.settings")
+    from scrapy import signals
+    from scrapy.crawler import CrawlerProcess
+    from scrapy.utils.project import get_project_settings
+
+    settings = get_project_settings()
+    settings.setdict({
+        "CAREERJET_BASE_URL": base_url,
+        "SQLITE_DB_PATH": db_path,
+        "LOG_FILE": None,
+        "LOG_STDOUT": False,
+        "LOG_LEVEL": args.log_level,
+        "HTTPCACHE_ENABLED": False,
+        "DOWNLOAD_DELAY": 0,
+        "AUTOTHROTTLE_ENABLED": False,
+        "CONCURRENT_REQUESTS": args.concurrency,
+        "CONCURRENT_REQUESTS_PER_DOMAIN": args.concurrency,
+        "LISTING_MAX_PAGES": args.pages,
+        "TELNETCONSOLE_ENABLED": False,
+        "STAGE_METRICS_PATH": os.path.join(os.path.dirname(db_path), "metrics", "%(name)s"),
+        "ADAPTIVE_CONCURRENCY_ENABLED": args.adaptive,
+        "ADAPTIVE_STATE_PATH": os.path.join(os.path.dirname(db_path), "adaptive_concurrency.json"),
+        "DEDUPE_ENABLED": args.dedupe,
+        "DEDUPE_INDEX_PATH": os.path.join(os.path.dirname(db_path), "dedupe.db"),
+        "FEED_STREAM_ENABLED": args.feeds,
+        "FEED_STREAM_DIR": os.path.join(os.path.dirname(db_path), "feeds"),
+        "STORAGE_BACKEND": backend,
+        "POSTGRES_DSN": args.postgres,
+    }, priority="cmdline")
+
+    from twisted.internet import defer
+
+    process = CrawlerProcess(settings)
+
+    results = {}
+    stages = [
+        ("careerjet_crawler", f"{backend}/jobs/flush_seconds"),
+        ("careerjet_description", f"{backend}/job_description/flush_seconds"),
+    ]
+
+    @defer.inlineCallbacks
+    def crawl_all():
+        try:
+            for name, flush_stat in stages:
+                crawler = process.create_crawler(name)
+                recorder = LatencyRecorder()
+                crawler.signals.connect(recorder.response_received, signal=signals.response_received)
+                started = time.perf_counter()
+                yield process.crawl(crawler)
+                stats = crawler.stats.get_stats()
+                results[name] = summarize(
+                    stats.get("item_scraped_count", 0),
+                    time.perf_counter() - started,
+                    recorder.latencies,
+                    stats.get(flush_stat, 0.0),
+                )
+        finally:
+            # Imported late: the first crawler installs the configured reactor
+            from twisted.internet import reactor
+            reactor.stop()
+
+    crawl_all()
+    process.start(stop_after_crawl=False)
+    return results
+
+
+class TimedLLM:
+    """Wraps a structured-output runnable and records each call's latency."""
+
+    def __init__(self, llm):
+        self.llm = llm
+        self.latencies = []
+
+    async def ainvoke(self, prompt):
+        started = time.perf_counter()
+        try:
+            return await self.llm.ainvoke(prompt)
+        finally:
+            self.latencies.append(time.perf_counter() - started)
+
+
+def run_extractor(db_path, args):
+    store_path = args.postgres or db_path
+    sys.path.insert(0, EXTRACTOR_DIR)
+    os.environ.setdefault("COHERE_API_KEY", "benchmark-stub")
+    from concurrent_extractor import process_and_save_jobs_async
+    from llm_job_description_parser_v2 import JobSectionsSchema
+    from rule_extractor import DEFAULT_RULES_THRESHOLD
+    from stub_llm import StubStructuredLLM
+
+    llm = TimedLLM(StubStructuredLLM(latency=args.llm_latency, jitter=args.llm_latency / 4))
+    batch_llm = TimedLLM(StubStructuredLLM(latency=args.llm_latency, jitter=args.llm_latency / 4, batched=True))
+    sections_llm = TimedLLM(StubStructuredLLM(latency=args.llm_latency, jitter=args.llm_latency / 4,
+                                              schema=JobSectionsSchema))
+    started = time.perf_counter()
+    stats = asyncio.run(process_and_save_jobs_async(
+        db_path=store_path,
+        concurrency=args.llm_workers,
+        rate=args.llm_rate,
+        llm=llm,
+        boilerplate_path=os.path.join(os.path.dirname(db_path), "boilerplate.json"),
+        batch_llm=batch_llm,
+        batch_tokens=args.llm_batch_tokens or None,
+        sections_llm=sections_llm,
+        rules_threshold=DEFAULT_RULES_THRESHOLD if args.rules else None,
+    ))
+    latencies = llm.latencies + batch_llm.latencies + sections_llm.latencies
+    return {
+        **summarize(
+            stats["processed"] + stats["cached"] + stats["rules"],
+            time.perf_counter() - started,
+            latencies,
+            stats["db_write_seconds"],
+        ),
+        "tokens_in": stats["tokens_in"],
+        "tokens_out": stats["tokens_out"],
+        "token_reduction": stats["compaction"]["token_reduction"],
+        "llm_calls": len(latencies),
+        "rule_only_jobs": stats["rules"],
+    }
+
+
+def check_regressions(results, baseline_path, tolerance):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    failures = []
+    for stage, current in results.items():
+        previous = baseline.get(stage)
+        if not previous or not previous.get("items_per_second"):
+            continue
+        floor = previous["items_per_second"] * (1 - tolerance)
+        if current["items_per_second"] < floor:
+            failures.append(
+                f"{stage}: {current['items_per_second']} items/s < {floor:.2f} "
+                f"(baseline {previous['items_per_second']})"
+            )
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark.")
+    parser.add_argument("--pages", type=int, default=10, help="Listing pages served")
+    parser.add_argument("--jobs-per-page", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.02, help="Server latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.01)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--concurrency", type=int, default=16, help="Scrapy concurrent requests")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="Enable AdaptiveConcurrencyMiddleware instead of fixed concurrency")
+    parser.add_argument("--dedupe", action="store_true",
+                        help="Enable DeduplicationPipeline (synthetic listings repeat, so many are dropped)")
+    parser.add_argument("--feeds", action="store_true",
+                        help="Also stream items to NDJSON feeds (FEED_STREAM_ENABLED)")
+    parser.add_argument("--rules", action="store_true",
+                        help="Enable rule pre-extraction (synthetic ads are fully covered, so few LLM calls remain)")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Stub LLM latency (s)")
+    parser.add_argument("--llm-workers", type=int, default=8)
+    parser.add_argument("--llm-rate", type=int, default=100000, help="LLM calls per minute")
+    parser.add_argument("--llm-batch-tokens", type=int, default=0,
+                        help="Pack descriptions into batched LLM calls of this many tokens (0 = off)")
+    parser.add_argument("--postgres", metavar="DSN",
+                        help="Run every stage against this (empty) PostgreSQL database instead of SQLite")
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--keep", action="store_true",
+                        help="Keep the working directory (database, feeds, metrics) and print its path")
+    parser.add_argument("--output", help="Write results as JSON")
+    parser.add_argument("--baseline", help="Compare against a previous --output file")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed items/s drop versus the baseline (fraction)")
+    args = parser.parse_args()
+
+    with (contextlib.nullcontext(tempfile.mkdtemp(prefix="careerjet-bench-")) if args.keep
+          else tempfile.TemporaryDirectory(prefix="careerjet-bench-")) as workdir:
+        db_path = os.path.join(workdir, "careerjet_jobs.db")
+        server, base_url = start_server(args)
+        try:
+            results = run_spiders(base_url, db_path, args)
+            results["process_and_save_jobs"] = run_extractor(db_path, args)
+        finally:
+            server.terminate()
+
+    print(f"{'stage':<24}{'items':>7}{'sec':>9}{'items/s':>10}{'p50 ms':>9}{'p99 ms':>9}{'db s':>9}")
+    for stage, row in results.items():
+        print(f"{stage:<24}{row['items']:>7}{row['seconds']:>9}{row['items_per_second']:>10}"
+              f"{str(row['latency_p50_ms']):>9}{str(row['latency_p99_ms']):>9}{row['db_write_seconds']:>9}")
+    extractor = results["process_and_save_jobs"]
+    print(f"LLM calls: {extractor['llm_calls']} ({extractor['rule_only_jobs']} jobs by rules alone); tokens: {extractor['tokens_in']} in, {extractor['tokens_out']} out "
+          f"({extractor['token_reduction']:.0%} of description tokens removed by compaction)")
+
+    if args.keep:
+        print(f"Working directory kept at {workdir}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        failures = check_regressions(results, args.baseline, args.tolerance)
+        for failure in failures:
+            print(f"REGRESSION {failure}")
+        if failures:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Fill salary_min/salary_max/salary_period/salary_currency/location_canonical
+for rows already in `jobs`.
+
+    python backfill_normalized.py --db careerjet_jobs.db [--chunk-size 50000]
+
+Rows are read in id order, chunk by chunk, normalized with vectorized pandas
+string operations (careerjet.normalize.normalize_frame) and written back with
+one executemany per chunk, so hundreds of thousands of rows take seconds.
+Rows written before the columns existed only kept the "low-high" salary
+text, so their currency falls back to --default-currency.
+
+Only rows whose values actually change are updated. Each chunk takes the
+next value of the change sequence (careerjet.db.ensure_change_tracking) and
+stamps it on the rows it updates, so the next incremental export_parquet.py
+run and search sync pick them up.
+"""
+import argparse
+import time
+
+import pandas as pd
+
+from careerjet.db import (
+    CURRENT_CHANGE, NEXT_CHANGE_SQL, connect, ensure_change_tracking, ensure_columns, write_batch,
+)
+from careerjet.normalize import NORMALIZED_COLUMNS, normalize_frame
+
+# ?1..?N are the normalized values and ?N+1 the id; unchanged rows are skipped. Setting
+# change_seq directly costs one sequence step per chunk instead of a trigger run per row
+UPDATE_SQL = f'''
+    UPDATE jobs SET {", ".join(f"{name} = ?{i}" for i, name in enumerate(NORMALIZED_COLUMNS, 1))},
+        change_seq = {CURRENT_CHANGE}
+    WHERE id = ?{len(NORMALIZED_COLUMNS) + 1}
+      AND NOT ({" AND ".join(f"{name} IS ?{i}" for i, name in enumerate(NORMALIZED_COLUMNS, 1))})
+'''
+
+
+def update_buffer(rows):
+    """write_batch() buffer that updates `rows` under one new change sequence value."""
+    return {NEXT_CHANGE_SQL: [()], UPDATE_SQL: rows}
+
+
+def backfill(db_path, chunk_size=50000, default_currency='BDT', only_missing=False):
+    """Normalize every row (or only rows without location_canonical) and return the count."""
+    conn = connect(db_path)
+    try:
+        ensure_columns(conn, 'jobs', NORMALIZED_COLUMNS)
+        ensure_change_tracking(conn, 'jobs')
+        missing = "AND location_canonical IS NULL AND salary_min IS NULL" if only_missing else ""
+        last_id, total = 0, 0
+        while True:
+            chunk = pd.read_sql_query(
+                f"SELECT id, salary, location FROM jobs WHERE id > ? {missing} ORDER BY id LIMIT ?",
+                conn, params=(last_id, chunk_size), index_col='id',
+            )
+            if chunk.empty:
+                break
+            normalized = normalize_frame(chunk, default_currency)
+            # NaN/<NA> -> None so SQLite stores NULL
+            values = normalized.astype(object).where(normalized.notna(), None)
+            rows = [(*row, job_id) for job_id, row in zip(values.index, values.itertuples(index=False))]
+            write_batch(conn, update_buffer(rows))
+            last_id = int(chunk.index[-1])
+            total += len(chunk)
+        return total
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill normalized salary and location columns.")
+    parser.add_argument('--db', default='careerjet_jobs.db')
+    parser.add_argument('--chunk-size', type=int, default=50000)
+    parser.add_argument('--default-currency', default='BDT',
+                        help="Currency for salaries stored without a symbol")
+    parser.add_argument('--only-missing', action='store_true',
+                        help="Skip rows that already have normalized values")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    total = backfill(args.db, args.chunk_size, args.default_currency, args.only_missing)
+    print(f"Normalized {total} rows in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,297 @@
+"""
+Crash-resumable checkpoints for the spiders.
+
+With CHECKPOINT_ENABLED, every spider run keeps a small SQLite file,
+CHECKPOINT_DIR/<checkpoint name>.db, next to SQLITE_DB_PATH by default. The
+checkpoint name is the spider name plus its shard or page range, so the
+workers of sharded_crawl.py each resume their own part of the crawl.
+
+careerjet_crawler (spiders with `checkpoint_frontier = True`) keeps its whole
+request frontier there through CheckpointScheduler, a disk-backed request
+queue and dupefilter in one table:
+
+    QUEUED -> IN_FLIGHT (handed to the downloader) -> DONE or FAILED
+
+A request only becomes DONE once its callback has run to the end
+(CheckpointMiddleware sends `request_processed`) and the pipeline write that
+followed has committed its items (SQLitePipeline sends `items_committed`).
+A request that ends in its errback becomes FAILED (the errback sends
+`request_processed` with `failed=True`). A retry or redirect carries the
+frontier row id in `request.meta['checkpoint_id']` and goes back into the
+same row instead of a new one. After a crash, IN_FLIGHT requests go back to
+the queue, queued requests are scheduled before anything new, and the
+fingerprints of DONE and FAILED pages make the spider's start requests for
+them duplicates, so finished pages are never fetched again.
+
+careerjet_description already streams its work from the database under
+leases; its checkpoint only remembers the claim owner, so a restarted spider
+hands the rows the killed run left IN_PROGRESS straight back to NEW instead of
+waiting for their leases to expire. Closing the spider releases its claims,
+so that checkpoint is deleted whatever the reason.
+
+A crawl that closes with reason `finished` deletes its checkpoint, so the
+next run starts from scratch. Any other reason (Ctrl-C, CLOSESPIDER_*)
+keeps it to resume from. A checkpoint is locked by the process using it; a
+second process with the same checkpoint name runs without one.
+"""
+import logging
+import os
+import pickle
+
+from scrapy.core.scheduler import Scheduler
+from scrapy.utils.request import request_from_dict
+
+from careerjet.db import connect
+
+try:
+    import fcntl
+except ImportError:  # Windows: checkpoints are not locked
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Signals: a callback consumed all of a request's output, or an errback handled its
+# failure (failed=True) / the pipeline committed buffered items
+request_processed = object()
+items_committed = object()
+
+QUEUED, IN_FLIGHT, DONE, FAILED = 0, 1, 2, 3
+
+
+class CheckpointLocked(RuntimeError):
+    pass
+
+
+class Checkpoint:
+    """
+    One spider run's checkpoint file: a key/value `meta` table and the
+    request `frontier`. Every change is committed immediately (WAL, so a
+    killed process loses nothing that was committed).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.lock = self._acquire_lock(f'{path}.lock')
+        self.connection = connect(path)
+        self.connection.executescript('''
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+            CREATE TABLE IF NOT EXISTS frontier (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                fingerprint TEXT UNIQUE,  -- NULL for dont_filter requests
+                priority INTEGER NOT NULL,
+                state INTEGER NOT NULL,
+                request BLOB
+            );
+            CREATE INDEX IF NOT EXISTS frontier_queue ON frontier (state, priority DESC, id);
+        ''')
+
+    @classmethod
+    def from_settings(cls, settings, name):
+        """The checkpoint called `name`, or None if disabled or held by another process."""
+        if not settings.getbool('CHECKPOINT_ENABLED'):
+            return None
+        directory = settings.get('CHECKPOINT_DIR') or os.path.join(
+            os.path.dirname(settings.get('SQLITE_DB_PATH', 'careerjet_jobs.db')), 'checkpoints'
+        )
+        try:
+            return cls(os.path.join(directory, f'{name}.db'))
+        except CheckpointLocked:
+            logger.warning(f"Checkpoint {name} is in use by another process; running without one")
+            return None
+
+    @staticmethod
+    def _acquire_lock(path):
+        lock = open(path, 'a')
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock.close()
+                raise CheckpointLocked(path)
+        return lock
+
+    def get(self, key, default=None):
+        row = self.connection.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set(self, key, value):
+        self.connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def push(self, fingerprint, priority, request):
+        """Queue a serialized request; False if its fingerprint was already seen."""
+        return self.connection.execute(
+            "INSERT OR IGNORE INTO frontier (fingerprint, priority, state, request) VALUES (?, ?, ?, ?)",
+            (fingerprint, priority, QUEUED, request),
+        ).rowcount == 1
+
+    def requeue(self, row_id, priority, request):
+        """
+        Queue a serialized retry of the IN_FLIGHT request in row `row_id`
+        in its place; False if that row is not in flight any more.
+        """
+        return self.connection.execute(
+            "UPDATE frontier SET state = ?, priority = ?, request = ? WHERE id = ? AND state = ?",
+            (QUEUED, priority, request, row_id, IN_FLIGHT),
+        ).rowcount == 1
+
+    def pop(self):
+        """(id, serialized request) of the next queued request, now IN_FLIGHT, or None."""
+        return self.connection.execute('''
+            UPDATE frontier SET state = ?
+            WHERE id = (SELECT id FROM frontier WHERE state = ? ORDER BY priority DESC, id LIMIT 1)
+            RETURNING id, request
+        ''', (IN_FLIGHT, QUEUED)).fetchone()
+
+    def mark_done(self, ids, state=DONE):
+        """Finish the IN_FLIGHT requests `ids` as DONE or FAILED; finished ones keep their state."""
+        if not ids:
+            return
+        self.connection.execute('BEGIN IMMEDIATE')
+        self.connection.executemany(
+            "UPDATE frontier SET state = ?, request = NULL WHERE id = ? AND state = ?",
+            [(state, i, IN_FLIGHT) for i in ids]
+        )
+        self.connection.execute('COMMIT')
+
+    def requeue_in_flight(self):
+        """Queue the requests a killed run had handed to the downloader again."""
+        return self.connection.execute(
+            "UPDATE frontier SET state = ? WHERE state = ?", (QUEUED, IN_FLIGHT)
+        ).rowcount
+
+    def counts(self):
+        counts = dict(self.connection.execute("SELECT state, COUNT(*) FROM frontier GROUP BY state"))
+        return {name: counts.get(state, 0) for name, state in (
+            ('queued', QUEUED), ('in_flight', IN_FLIGHT), ('done', DONE), ('failed', FAILED),
+        )}
+
+    def close(self):
+        self.connection.close()
+        self.lock.close()
+
+    def discard(self):
+        """Close and delete the checkpoint, e.g. after a finished run."""
+        self.connection.close()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(self.path + suffix):
+                os.remove(self.path + suffix)
+        os.remove(f'{self.path}.lock')
+        self.lock.close()
+
+
+class CheckpointScheduler(Scheduler):
+    """
+    Scrapy's scheduler, except that spiders with `checkpoint_frontier = True`
+    queue their requests in their Checkpoint instead of memory. Requests that
+    cannot be serialized (callbacks that are not spider methods) still go
+    through the memory queue and are not checkpointed.
+    """
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        scheduler = super().from_crawler(crawler)
+        scheduler.checkpoint = None
+        scheduler.processed = []
+        scheduler.queued = 0
+        crawler.signals.connect(scheduler.request_processed, signal=request_processed)
+        crawler.signals.connect(scheduler.items_committed, signal=items_committed)
+        return scheduler
+
+    def open(self, spider):
+        result = super().open(spider)
+        if getattr(spider, 'checkpoint_frontier', False):
+            self.checkpoint = Checkpoint.from_settings(self.crawler.settings, spider.checkpoint_name)
+        if self.checkpoint is not None:
+            requeued = self.checkpoint.requeue_in_flight()
+            counts = self.checkpoint.counts()
+            self.queued = counts['queued']
+            if counts['queued'] or counts['done']:
+                spider.logger.info(
+                    f"Resuming from checkpoint {self.checkpoint.path}: {counts['done']} requests done, "
+                    f"{counts['failed']} failed, {counts['queued']} queued ({requeued} were in flight)"
+                )
+                self.stats.set_value('checkpoint/resumed_done', counts['done'])
+                self.stats.set_value('checkpoint/resumed_queued', counts['queued'])
+        return result
+
+    def close(self, reason):
+        result = super().close(reason)
+        if self.checkpoint is not None:
+            self.items_committed()  # Pipelines are closed, and flushed, before the scheduler
+            if reason == 'finished':
+                self.checkpoint.discard()
+            else:
+                counts = self.checkpoint.counts()
+                self.spider.logger.info(
+                    f"Checkpoint kept at {self.checkpoint.path} ({reason}): {counts['done']} requests done, "
+                    f"{counts['queued'] + counts['in_flight']} left"
+                )
+                self.checkpoint.close()
+        return result
+
+    def __len__(self):
+        return super().__len__() + self.queued
+
+    def enqueue_request(self, request):
+        if self.checkpoint is None:
+            return super().enqueue_request(request)
+        try:
+            data = pickle.dumps(request.to_dict(spider=self.spider), protocol=4)
+        except (ValueError, TypeError, AttributeError, pickle.PicklingError):
+            self.stats.inc_value('scheduler/unserializable')
+            return super().enqueue_request(request)
+        checkpoint_id = request.meta.get('checkpoint_id')
+        if checkpoint_id is not None and self.checkpoint.requeue(checkpoint_id, request.priority, data):
+            # A retry (dont_filter) or redirect of a checkpointed request: keep its row
+            self.queued += 1
+            self.stats.inc_value('scheduler/enqueued/checkpoint')
+            self.stats.inc_value('scheduler/enqueued')
+            return True
+        fingerprint = None
+        if not request.dont_filter:
+            fingerprint = self.crawler.request_fingerprinter.fingerprint(request).hex()
+        if not self.checkpoint.push(fingerprint, request.priority, data):
+            self.df.log(request, self.spider)
+            return False
+        self.queued += 1
+        self.stats.inc_value('scheduler/enqueued/checkpoint')
+        self.stats.inc_value('scheduler/enqueued')
+        return True
+
+    def next_request(self):
+        request = super().next_request()
+        if request is not None or self.checkpoint is None:
+            return request
+        row = self.checkpoint.pop()
+        if row is None:
+            self.queued = 0
+            return None
+        self.queued -= 1
+        request = request_from_dict(pickle.loads(row[1]), spider=self.spider)
+        request.meta['checkpoint_id'] = row[0]
+        self.stats.inc_value('scheduler/dequeued/checkpoint')
+        self.stats.inc_value('scheduler/dequeued')
+        return request
+
+    def request_processed(self, request, failed=False):
+        checkpoint_id = request.meta.get('checkpoint_id') if request is not None else None
+        if self.checkpoint is None or checkpoint_id is None:
+            return
+        if failed:  # No items to wait for
+            self.checkpoint.mark_done([checkpoint_id], FAILED)
+            self.stats.inc_value('checkpoint/failed')
+        else:
+            self.processed.append(checkpoint_id)
+
+    def items_committed(self):
+        """Everything processed so far has its items in the database now."""
+        if self.checkpoint is not None and self.processed:
+            self.checkpoint.mark_done(self.processed)
+            self.stats.inc_value('checkpoint/done', len(self.processed))
+            self.processed = []
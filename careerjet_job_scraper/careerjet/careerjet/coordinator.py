@@ -0,0 +1,149 @@
+"""
+Coordinating SQLite writer shared by sharded crawl workers.
+
+SQLite allows a single writer at a time, so N worker processes committing to
+careerjet_jobs.db spend their time waiting on the database lock. Instead the
+launcher (sharded_crawl.py) runs a WriterServer that owns the only write
+connection; workers reach it through a RemoteConnection, selected by the
+SQLITE_WRITER_ADDRESS setting. Each worker still batches rows locally in its
+BufferedSQLiteWriter and ships whole batches, which the server commits one
+transaction at a time.
+
+The authentication key is passed in the CAREERJET_WRITER_AUTHKEY environment
+variable (hex) rather than on the command line.
+"""
+import os
+import threading
+import time
+from multiprocessing.connection import Client, Listener
+
+from careerjet.db import connect, write_batch
+from careerjet.instrumentation import StageMetrics
+
+AUTHKEY_ENV = 'CAREERJET_WRITER_AUTHKEY'
+
+
+class WriterServer:
+    """
+    Serve `execute` and `batch` requests against one SQLite connection. Each
+    client gets a handler thread; a lock serialises access to the connection,
+    so every batch is committed whole and never interleaves with another.
+    """
+
+    def __init__(self, db_path, authkey, host='127.0.0.1', port=0, pragmas=None, metrics=None):
+        self.connection = connect(db_path, pragmas, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.listener = Listener((host, port), authkey=authkey)
+        self.metrics = metrics if metrics is not None else StageMetrics()
+        self.batches = 0
+        self.rows_written = 0
+        self.clients = 0
+
+    @property
+    def address(self):
+        host, port = self.listener.address
+        return f'{host}:{port}'
+
+    def serve_in_background(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def serve_forever(self):
+        while True:
+            try:
+                client = self.listener.accept()
+            except OSError:
+                return  # Listener closed
+            self.clients += 1
+            threading.Thread(target=self.handle, args=(client,), daemon=True).start()
+
+    def handle(self, client):
+        with client:
+            while True:
+                try:
+                    op, payload = client.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    client.send(('ok', self.dispatch(op, payload)))
+                except Exception as e:
+                    client.send(('error', e))
+
+    def dispatch(self, op, payload):
+        if op == 'execute':
+            sql, params = payload
+            with self.lock:
+                cursor = self.connection.execute(sql, params)
+                return cursor.fetchall(), cursor.rowcount
+        if op == 'batch':
+            written = sum(len(rows) for rows in payload.values())
+            started = time.perf_counter()
+            with self.lock:
+                write_batch(self.connection, payload)
+                self.batches += 1
+                self.rows_written += written
+            self.metrics.observe('db_commit/coordinator', time.perf_counter() - started)
+            return written
+        raise ValueError(f'Unknown writer operation: {op!r}')
+
+    def stats(self):
+        return {
+            'coordinator/clients': self.clients,
+            'coordinator/batches': self.batches,
+            'coordinator/rows_written': self.rows_written,
+        }
+
+    def close(self):
+        self.listener.close()
+        with self.lock:
+            self.connection.close()
+
+
+class RemoteCursor:
+    """The part of sqlite3.Cursor the pipelines and claim helpers use."""
+
+    def __init__(self, rows, rowcount):
+        self.rows = rows
+        self.rowcount = rowcount
+
+    def fetchall(self):
+        return self.rows
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def __iter__(self):
+        return iter(self.rows)
+
+
+class RemoteConnection:
+    """
+    Stand-in for a sqlite3 connection that forwards statements to a
+    WriterServer. `execute` runs immediately on the server (DDL, claims,
+    status updates); `write_batch` commits a BufferedSQLiteWriter buffer.
+    """
+
+    def __init__(self, address, authkey):
+        self.client = Client(address, authkey=authkey)
+
+    @classmethod
+    def from_address(cls, address):
+        host, port = address.rsplit(':', 1)
+        authkey = bytes.fromhex(os.environ.get(AUTHKEY_ENV, ''))
+        return cls((host, int(port)), authkey)
+
+    def call(self, op, payload):
+        self.client.send((op, payload))
+        status, result = self.client.recv()
+        if status == 'error':
+            raise result
+        return result
+
+    def execute(self, sql, params=()):
+        return RemoteCursor(*self.call('execute', (sql, tuple(params))))
+
+    def write_batch(self, buffer):
+        return self.call('batch', buffer)
+
+    def close(self):
+        self.client.close()
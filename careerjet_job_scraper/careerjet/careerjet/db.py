@@ -0,0 +1,326 @@
+import os
+import socket
+import sqlite3
+import time
+import uuid
+import zlib
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',      # readers never block the writer
+    'synchronous': 'NORMAL',    # fsync on checkpoint only; safe with WAL
+    'busy_timeout': 30000,      # wait up to 30s for another writer
+    'temp_store': 'MEMORY',
+    'cache_size': -20000,       # ~20 MB page cache
+}
+
+
+def shard_of(key, shards):
+    """Stable shard number in [0, shards) for `key` (crc32, same in every process)."""
+    if not key or shards <= 1:
+        return 0
+    return zlib.crc32(key.encode('utf-8')) % shards
+
+
+def connect(db_path, pragmas=None, check_same_thread=True):
+    """
+    Open a SQLite connection in autocommit mode with the project pragmas applied.
+    Transactions are managed explicitly by the caller.
+
+    The `shard_of(key, shards)` SQL function is registered on every connection.
+    """
+    connection = sqlite3.connect(
+        db_path, isolation_level=None, check_same_thread=check_same_thread
+    )
+    for name, value in {**DEFAULT_PRAGMAS, **(pragmas or {})}.items():
+        connection.execute(f"PRAGMA {name} = {value}")
+    connection.create_function('shard_of', 2, shard_of, deterministic=True)
+    return connection
+
+
+LEASE_COLUMNS = {
+    'claim_owner': 'TEXT',
+    'lease_expires_at': 'REAL',  # Unix timestamp
+}
+
+
+def ensure_columns(connection, table, columns):
+    """Add any of `columns` ({name: declaration}) missing from `table`."""
+    existing = {row[1] for row in connection.execute(f"PRAGMA table_info({table})")}
+    for name, declaration in columns.items():
+        if name not in existing:
+            connection.execute(f"ALTER TABLE {table} ADD COLUMN {name} {declaration}")
+
+
+# Advance the change sequence, and its current value as an SQL expression. A bulk
+# writer can run the first once per transaction and set change_seq to the second
+# itself; the update trigger then leaves its rows alone (see ensure_change_tracking)
+NEXT_CHANGE_SQL = "UPDATE change_sequence SET value = value + 1 WHERE id = 1"
+CURRENT_CHANGE = "(SELECT value FROM change_sequence WHERE id = 1)"
+# Columns whose updates advance change_seq. Claims, leases, statuses, attempts and
+# visit times are left out: they churn on every pass over the queue, and readers of
+# the sequence only care about what a row says. Unlisted tables track every column
+CONTENT_COLUMNS = {
+    'jobs': ('title', 'company', 'job_link', 'location', 'salary', 'page', 'scraped_at', 'salary_min',
+             'salary_max', 'salary_period', 'salary_currency', 'location_canonical', 'duplicate_of'),
+    'job_description': ('job_link', 'job_description', 'duplicate_of', 'content_hash'),
+}
+
+
+def ensure_change_tracking(connection, table):
+    """
+    Stamp every row inserted into `table`, or updated with a new value in
+    one of its CONTENT_COLUMNS, with the next value of the database-wide
+    change sequence, in its `change_seq` column.
+
+    Triggers keep it up to date for every writer: upserts, INSERT OR REPLACE
+    and backfills alike, while claims, releases and status changes leave it
+    alone. Writers are serialized, so sequence values become visible in
+    commit order and a reader that remembers the highest value it has seen
+    (export_parquet.py, careerjet.search) finds everything changed since
+    with an indexed `change_seq > ?`. Rows that predate tracking get 0.
+    Call it where `table` is created; safe to call on every start, by
+    every process that creates one of the tables.
+    """
+    # Concurrent starts must not both add the column. A coordinator RemoteConnection
+    # (no in_transaction) runs one statement at a time and is not wrapped
+    own_transaction = getattr(connection, 'in_transaction', None) is False
+    if own_transaction:
+        connection.execute('BEGIN IMMEDIATE')
+    try:
+        connection.execute('''
+            CREATE TABLE IF NOT EXISTS change_sequence (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                value INTEGER NOT NULL
+            )
+        ''')
+        connection.execute("INSERT OR IGNORE INTO change_sequence (id, value) VALUES (1, 0)")
+        existing = {row[1] for row in connection.execute(f"PRAGMA table_info({table})")}
+        if 'change_seq' not in existing:
+            connection.execute(f"ALTER TABLE {table} ADD COLUMN change_seq INTEGER")
+        # Rows written before tracking; changing change_seq itself does not fire the update trigger
+        connection.execute(f"UPDATE {table} SET change_seq = 0 WHERE change_seq IS NULL")
+        connection.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_change_seq ON {table} (change_seq)")
+        stamp = f"{NEXT_CHANGE_SQL}; UPDATE {table} SET change_seq = {CURRENT_CHANGE} WHERE rowid = NEW.rowid;"
+        connection.execute(f"CREATE TRIGGER IF NOT EXISTS {table}_change_insert AFTER INSERT ON {table} "
+                           f"BEGIN {stamp} END")
+        # UPDATE OF fires whenever a column is assigned, so the WHEN clause also checks
+        # that a value changed; it skips the trigger's own update of change_seq too
+        columns = [name for name in CONTENT_COLUMNS.get(table, sorted(existing - {'id', 'change_seq'}))
+                   if name in existing]
+        changed = " OR ".join(f"NEW.{name} IS NOT OLD.{name}" for name in columns)
+        # Replaced on every start: older versions fired on any column
+        connection.execute(f"DROP TRIGGER IF EXISTS {table}_change_update")
+        connection.execute(f"CREATE TRIGGER {table}_change_update AFTER UPDATE OF {', '.join(columns)} "
+                           f"ON {table} WHEN NEW.change_seq IS OLD.change_seq AND ({changed}) BEGIN {stamp} END")
+    except Exception:
+        if own_transaction:
+            connection.execute('ROLLBACK')
+        raise
+    if own_transaction:
+        connection.execute('COMMIT')
+
+
+def untracked_tables(connection, tables):
+    """
+    Those of `tables` that exist without a `change_seq` column: last written
+    by a version before change tracking and not opened by a writer since.
+    """
+    untracked = []
+    for table in tables:
+        columns = {row[1] for row in connection.execute(f"PRAGMA table_info({table})")}
+        if columns and 'change_seq' not in columns:
+            untracked.append(table)
+    return untracked
+
+
+def change_sequence(connection):
+    """Latest value of the change sequence (0 before ensure_change_tracking)."""
+    try:
+        row = connection.execute("SELECT value FROM change_sequence WHERE id = 1").fetchone()
+    except sqlite3.OperationalError:
+        return 0
+    return row[0] if row else 0
+
+
+# Failed extraction attempts of a description (see job_store.fail_job)
+ATTEMPT_COLUMNS = {'attempts': 'INTEGER'}
+# Statuses that take a description out of the extractor's queue: DUPLICATE rows get
+# their components from their canonical row, ERROR rows failed too many times
+DESCRIPTION_FINISHED = ('DONE', 'DUPLICATE', 'ERROR')
+
+
+def new_claim_owner():
+    """Identify this process in lease columns: host, pid and a random suffix."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def claimable_clause(status_column, now, claimable=('NEW',), finished=None, placeholder='?'):
+    """
+    SQL condition, and its parameters, for the rows a queue hands out: those
+    whose status is in `claimable` (or, given `finished`, any status but
+    IN_PROGRESS and those) and those IN_PROGRESS under a lease expired at `now`.
+    """
+    if finished is None:
+        test, statuses = 'IN', tuple(claimable)
+    else:
+        test, statuses = 'NOT IN', ('IN_PROGRESS', *finished)
+    placeholders = ", ".join(placeholder for _ in statuses)
+    return (
+        f"({status_column} {test} ({placeholders})"
+        f" OR ({status_column} = 'IN_PROGRESS' AND COALESCE(lease_expires_at, 0) < {placeholder}))",
+        (*statuses, now),
+    )
+
+
+def claim_rows(connection, table, status_column, owner, limit, lease_seconds,
+               returning='job_link', claimable=('NEW',), finished=None, where=None, where_params=()):
+    """
+    Atomically claim up to `limit` rows matched by claimable_clause() and
+    return the `returning` columns.
+
+    Claiming is a single UPDATE ... RETURNING, so concurrent processes never
+    receive the same row. Rows left IN_PROGRESS by a crashed process become
+    claimable again once their lease runs out. `where` further restricts the
+    candidates, e.g. to one shard: `"shard_of(job_link, ?) = ?"`.
+    """
+    now = time.time()
+    condition, params = claimable_clause(status_column, now, claimable, finished)
+    restrict = f"AND ({where})" if where else ""
+    return connection.execute(f"""
+        UPDATE {table}
+        SET {status_column} = 'IN_PROGRESS', claim_owner = ?, lease_expires_at = ?
+        WHERE id IN (
+            SELECT id FROM {table}
+            WHERE {condition}
+              {restrict}
+            LIMIT ?
+        )
+        RETURNING {returning}
+    """, (owner, now + lease_seconds, *params, *where_params, limit)).fetchall()
+
+
+def release_claims(connection, table, status_column, owner, status='NEW'):
+    """Hand every row still IN_PROGRESS under `owner` back to the queue."""
+    return connection.execute(f"""
+        UPDATE {table}
+        SET {status_column} = ?, claim_owner = NULL, lease_expires_at = NULL
+        WHERE claim_owner = ? AND {status_column} = 'IN_PROGRESS'
+    """, (status, owner)).rowcount
+
+
+def write_batch(connection, buffer):
+    """
+    Run every `{sql: [params, ...]}` entry of `buffer` with executemany inside
+    one IMMEDIATE transaction, rolling the whole batch back on error.
+    """
+    connection.execute('BEGIN IMMEDIATE')
+    try:
+        for sql, rows in buffer.items():
+            connection.executemany(sql, rows)
+    except Exception:
+        connection.execute('ROLLBACK')
+        raise
+    connection.execute('COMMIT')
+
+
+class BufferedSQLiteWriter:
+    """
+    Collect parameterised statements and write them with executemany in a
+    single transaction once `batch_size` rows are buffered or
+    `flush_interval` seconds have passed since the last flush.
+
+    Statements are flushed in the order they were first added, so a batch
+    that inserts a row and then updates another table stays consistent.
+    A failed flush is rolled back as a whole and the buffer is kept.
+
+    `connection` may be a careerjet.coordinator.RemoteConnection, in which
+    case batches are committed by the coordinating writer process instead.
+    """
+
+    def __init__(self, db_path, batch_size=500, flush_interval=5.0, pragmas=None,
+                 metrics=None, name='sqlite', connection=None):
+        self.connection = connection if connection is not None else connect(db_path, pragmas)
+        self.metrics = metrics
+        self.name = name
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.buffer = {}
+        self.pending = 0
+        self.last_flush = time.monotonic()
+        self.flushes = 0
+        self.rows_written = 0
+        self.flush_seconds = 0.0
+
+    @classmethod
+    def from_settings(cls, settings, metrics=None, name='sqlite'):
+        return cls(
+            settings.get('SQLITE_DB_PATH', 'careerjet_jobs.db'),
+            batch_size=settings.getint('SQLITE_BATCH_SIZE', 500),
+            flush_interval=settings.getfloat('SQLITE_FLUSH_INTERVAL', 5.0),
+            pragmas=settings.getdict('SQLITE_PRAGMAS'),
+            metrics=metrics,
+            name=name,
+            connection=open_connection(settings, local=False),
+        )
+
+    def execute(self, sql, params=()):
+        """Run a statement immediately, outside the buffer (DDL, reads)."""
+        return self.connection.execute(sql, params)
+
+    def add(self, sql, params):
+        self.buffer.setdefault(sql, []).append(params)
+        self.pending += 1
+        if (self.pending >= self.batch_size
+                or time.monotonic() - self.last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            self.last_flush = time.monotonic()
+            return 0
+        written = self.pending
+        started = time.perf_counter()
+        if hasattr(self.connection, 'write_batch'):
+            self.connection.write_batch(self.buffer)
+        else:
+            write_batch(self.connection, self.buffer)
+        elapsed = time.perf_counter() - started
+        self.flush_seconds += elapsed
+        if self.metrics is not None:
+            self.metrics.observe(f'db_commit/{self.name}', elapsed)
+        self.flushes += 1
+        self.rows_written += written
+        self.buffer = {}
+        self.pending = 0
+        self.last_flush = time.monotonic()
+        return written
+
+    def record_stats(self, stats, prefix):
+        """Copy flush counters into a Scrapy stats collector under `prefix`."""
+        if stats is None:
+            return
+        stats.set_value(f'{prefix}/flushes', self.flushes)
+        stats.set_value(f'{prefix}/rows_written', self.rows_written)
+        stats.set_value(f'{prefix}/flush_seconds', round(self.flush_seconds, 4))
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self.connection.close()
+
+
+def open_connection(settings, local=True):
+    """
+    Connection for SQLITE_DB_PATH, or a RemoteConnection to the coordinating
+    writer when SQLITE_WRITER_ADDRESS is set (see sharded_crawl.py). With
+    `local=False` None is returned instead of opening a local connection.
+    """
+    address = settings.get('SQLITE_WRITER_ADDRESS')
+    if address:
+        from careerjet.coordinator import RemoteConnection
+        return RemoteConnection.from_address(address)
+    if not local:
+        return None
+    return connect(settings.get('SQLITE_DB_PATH', 'careerjet_jobs.db'),
+                   settings.getdict('SQLITE_PRAGMAS'))
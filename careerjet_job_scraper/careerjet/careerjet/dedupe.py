@@ -0,0 +1,199 @@
+"""
+Near-duplicate detection with MinHash signatures and an LSH band index.
+
+The same ad is often listed under several links with slightly different
+titles. Every listing (title + company + location, as character 4-grams) and
+every description (word 3-grams) gets a MinHash signature; signatures are
+split into bands and each band is hashed into a bucket, so a lookup only
+compares against rows sharing at least one bucket. A candidate whose
+estimated Jaccard similarity reaches the threshold is a duplicate, and the
+new row is linked to the candidate's canonical row.
+
+The index lives in its own SQLite file (DEDUPE_INDEX_PATH) and is updated as
+rows arrive, so it works with either storage backend and across runs. A
+key seen again with different content (a revisited description) is hashed
+and banded again, so it is judged on what it says now.
+"""
+import hashlib
+import re
+import zlib
+
+import numpy as np
+
+from careerjet.db import connect, ensure_columns
+from careerjet.revisit import content_fingerprint
+
+# (a * h + b) mod P with a, b < 2**31 and 32-bit shingle hashes stays below 2**64
+_PRIME = (1 << 32) + 15
+_TOKEN = re.compile(r'\w+')
+
+KINDS = {
+    # kind: (shingle type, shingle size)
+    'listing': ('chars', 4),
+    'description': ('words', 3),
+}
+# Short listing keys need a stricter cut-off than full descriptions
+DEFAULT_THRESHOLDS = {'listing': 0.9, 'description': 0.8}
+
+
+def shingles(text, kind):
+    """Set of shingles for `text`: character n-grams or word n-grams per KINDS."""
+    tokens = _TOKEN.findall((text or '').lower())
+    unit, size = KINDS[kind]
+    if unit == 'chars':
+        joined = ' '.join(tokens)
+        return {joined[i:i + size] for i in range(max(1, len(joined) - size + 1))} if joined else set()
+    return {' '.join(tokens[i:i + size]) for i in range(max(1, len(tokens) - size + 1))} if tokens else set()
+
+
+class MinHasher:
+    def __init__(self, num_perm=64, seed=1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.a = rng.integers(1, 1 << 31, size=(num_perm, 1), dtype=np.uint64)
+        self.b = rng.integers(0, 1 << 31, size=(num_perm, 1), dtype=np.uint64)
+
+    def signature(self, shingle_set):
+        """uint64 array of `num_perm` minimum hashes of a non-empty shingle set."""
+        hashes = np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingle_set),
+                             dtype=np.uint64, count=len(shingle_set))
+        return ((self.a * hashes + self.b) % _PRIME).min(axis=1)
+
+
+class LSHIndex:
+    """
+    Persistent MinHash LSH index, one namespace per kind. `bands` must divide
+    `num_perm`; with 16 bands of 4 rows, pairs at 0.8 similarity share a
+    bucket with probability > 0.999. `thresholds` maps kind to the minimum
+    estimated Jaccard similarity of a duplicate.
+    """
+
+    def __init__(self, path, num_perm=64, bands=16, thresholds=None, seed=1):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.connection = connect(path)
+        self.hasher = MinHasher(num_perm, seed)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.thresholds = {**DEFAULT_THRESHOLDS, **(thresholds or {})}
+        self.connection.executescript('''
+            CREATE TABLE IF NOT EXISTS minhash_signatures (
+                kind TEXT,
+                key TEXT,
+                canonical TEXT,
+                signature BLOB,
+                PRIMARY KEY (kind, key)
+            );
+            CREATE TABLE IF NOT EXISTS minhash_buckets (
+                kind TEXT,
+                band INTEGER,
+                bucket INTEGER,
+                key TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_minhash_buckets ON minhash_buckets (kind, band, bucket);
+        ''')
+        # Fingerprint of the indexed text (careerjet.revisit.content_fingerprint); NULL before revisits
+        ensure_columns(self.connection, 'minhash_signatures', {'content_hash': 'TEXT'})
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_minhash_buckets_key ON minhash_buckets (kind, key)"
+        )
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(
+            settings.get('DEDUPE_INDEX_PATH', 'dedupe.db'),
+            num_perm=settings.getint('DEDUPE_NUM_PERM', 64),
+            bands=settings.getint('DEDUPE_BANDS', 16),
+            thresholds=settings.getdict('DEDUPE_THRESHOLDS'),
+        )
+
+    def buckets(self, signature):
+        for band in range(self.bands):
+            chunk = signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            yield band, int.from_bytes(hashlib.blake2b(chunk, digest_size=8).digest(), 'big', signed=True)
+
+    def find(self, kind, signature, exclude=None):
+        """(canonical, similarity) of the most similar indexed row at or above the threshold."""
+        candidates = set()
+        for band, bucket in self.buckets(signature):
+            candidates.update(key for (key,) in self.connection.execute(
+                "SELECT key FROM minhash_buckets WHERE kind = ? AND band = ? AND bucket = ?",
+                (kind, band, bucket)
+            ))
+        candidates.discard(exclude)
+        threshold = self.thresholds[kind]
+        best = None
+        for key in candidates:
+            row = self.connection.execute(
+                "SELECT canonical, signature FROM minhash_signatures WHERE kind = ? AND key = ?",
+                (kind, key)
+            ).fetchone()
+            if row is None:
+                continue
+            similarity = float(np.mean(np.frombuffer(row[1], dtype=np.uint64) == signature))
+            if similarity >= threshold and (best is None or similarity > best[1]):
+                best = (row[0], similarity)
+        return best
+
+    def check(self, kind, key, text, content_hash=None):
+        """
+        Index `key` and return the canonical key it duplicates, or None when
+        it is new. A key already indexed with the same `content_hash`
+        (default: content_fingerprint(text)) keeps its earlier verdict; one
+        whose content changed is hashed and banded again.
+
+        The lookup and the insert share one IMMEDIATE transaction, so two
+        processes indexing near-duplicates at once cannot both miss each
+        other and both become canonical.
+        """
+        if content_hash is None:
+            content_hash = content_fingerprint(text)
+        self.connection.execute('BEGIN IMMEDIATE')
+        try:
+            existing = self.connection.execute(
+                "SELECT canonical, content_hash FROM minhash_signatures WHERE kind = ? AND key = ?", (kind, key)
+            ).fetchone()
+            if existing is not None and existing[1] == content_hash:
+                self.connection.execute('COMMIT')
+                return existing[0] if existing[0] != key else None
+            if existing is not None:  # Changed since it was indexed: drop the old signature
+                self.connection.execute("DELETE FROM minhash_signatures WHERE kind = ? AND key = ?", (kind, key))
+                self.connection.execute("DELETE FROM minhash_buckets WHERE kind = ? AND key = ?", (kind, key))
+            shingle_set = shingles(text, kind)
+            if not shingle_set:
+                self.connection.execute('COMMIT')
+                return None  # Nothing to compare; empty texts would all look identical
+            signature = self.hasher.signature(shingle_set)
+            match = self.find(kind, signature, exclude=key)
+            canonical = match[0] if match else key
+            self.connection.execute(
+                "INSERT INTO minhash_signatures (kind, key, canonical, signature, content_hash) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (kind, key, canonical, signature.tobytes(), content_hash)
+            )
+            self.connection.executemany(
+                "INSERT INTO minhash_buckets (kind, band, bucket, key) VALUES (?, ?, ?, ?)",
+                [(kind, band, bucket, key) for band, bucket in self.buckets(signature)]
+            )
+        except Exception:
+            self.connection.execute('ROLLBACK')
+            raise
+        self.connection.execute('COMMIT')
+        # A re-indexed key can match rows that are duplicates of itself
+        return canonical if canonical != key else None
+
+    def stats(self):
+        """{kind: {'indexed': n, 'duplicates': n, 'duplicate_ratio': r}}"""
+        result = {}
+        for kind, indexed, duplicates in self.connection.execute(
+            "SELECT kind, COUNT(*), SUM(canonical != key) FROM minhash_signatures GROUP BY kind"
+        ):
+            result[kind] = {
+                'indexed': indexed,
+                'duplicates': duplicates,
+                'duplicate_ratio': round(duplicates / indexed, 4) if indexed else 0.0,
+            }
+        return result
+
+    def close(self):
+        self.connection.close()
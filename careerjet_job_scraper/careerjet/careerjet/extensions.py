@@ -0,0 +1,56 @@
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from twisted.internet import task
+
+from careerjet.instrumentation import metrics_for
+
+
+class StageMetricsExtension:
+    """
+    Record download latency per response and export every stage histogram
+    (download, parse callbacks, pipelines, DB commits) to
+    STAGE_METRICS_PATH.json / .prom every STAGE_METRICS_INTERVAL seconds and
+    when the spider closes. The final export also carries the crawl stats.
+    """
+
+    def __init__(self, crawler, path, interval):
+        self.crawler = crawler
+        self.metrics = metrics_for(crawler)
+        self.path = path
+        self.interval = interval
+        self.task = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool('STAGE_METRICS_ENABLED'):
+            raise NotConfigured
+        extension = cls(
+            crawler,
+            settings.get('STAGE_METRICS_PATH', 'metrics/%(name)s'),
+            settings.getfloat('STAGE_METRICS_INTERVAL', 30.0),
+        )
+        crawler.signals.connect(extension.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(extension.spider_closed, signal=signals.spider_closed)
+        crawler.signals.connect(extension.response_received, signal=signals.response_received)
+        return extension
+
+    def spider_opened(self, spider):
+        self.path = self.path % {'name': spider.name}
+        if self.interval > 0:
+            self.task = task.LoopingCall(self.export)
+            self.task.start(self.interval, now=False)
+
+    def spider_closed(self, spider, reason):
+        if self.task and self.task.running:
+            self.task.stop()
+        self.export(final=True)
+
+    def response_received(self, response, request, spider):
+        latency = request.meta.get('download_latency')
+        if latency is not None:
+            self.metrics.observe('download', latency)
+
+    def export(self, final=False):
+        extra = {'stats': self.crawler.stats.get_stats()} if final else None
+        self.metrics.export(self.path, extra)
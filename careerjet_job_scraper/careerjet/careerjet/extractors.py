@@ -0,0 +1,51 @@
+"""
+Precompiled lxml extraction for Careerjet pages.
+
+Spiders pass the already-parsed document (`response.selector.root`), so pages
+are parsed once and each field is a single compiled XPath evaluated directly
+on lxml elements, without building parsel Selector objects per node. Values
+come back as normalized strings ready for CleaningPipeline.
+"""
+from urllib.parse import urljoin
+
+from lxml import etree
+
+_articles = etree.XPath("//ul[@class='jobs']//li/article")
+_title = etree.XPath(".//header/h2/a/text()", smart_strings=False)
+_link = etree.XPath(".//header/h2/a/@href", smart_strings=False)
+_company = etree.XPath(".//p[@class='company']//text()", smart_strings=False)
+_location = etree.XPath(".//ul[@class='location']//text()", smart_strings=False)
+_salary = etree.XPath(".//ul[@class='salary']//text()", smart_strings=False)
+_description = etree.XPath("//section[@class='content']//text()", smart_strings=False)
+
+
+def join_text(parts):
+    """Strip each text node and join the non-empty ones with single spaces."""
+    return " ".join(part.strip() for part in parts if part.strip()) or None
+
+
+def extract_listing(root, base_url):
+    """
+    Extract every job on a listing page.
+
+    :param root: Parsed lxml document, e.g. `response.selector.root`
+    :param base_url: URL the page was fetched from, used to absolutize links
+    :return: List of dicts with title, company, job_link, location and salary
+    """
+    jobs = []
+    for article in _articles(root):
+        titles = _title(article)
+        links = _link(article)
+        jobs.append({
+            'title': titles[0].strip() if titles else None,
+            'company': join_text(_company(article)),
+            'job_link': urljoin(base_url, links[0].strip()) if links else None,
+            'location': join_text(_location(article)),
+            'salary': join_text(_salary(article)),
+        })
+    return jobs
+
+
+def extract_description(root):
+    """Return the job ad text under `section.content`, or '' if there is none."""
+    return join_text(_description(root)) or ""
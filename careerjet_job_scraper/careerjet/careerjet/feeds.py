@@ -0,0 +1,255 @@
+"""
+Rotated, compressed NDJSON feeds of scraped items.
+
+FeedExportPipeline appends every item to a stream (`jobs`, `job_descriptions`)
+under FEED_STREAM_DIR, one JSON object per line:
+
+    feeds/jobs/manifest.jsonl
+    feeds/jobs/jobs-000000000000.ndjson.zst
+    feeds/jobs/jobs-000000004210.ndjson.zst
+    feeds/jobs/jobs-000000007733.ndjson.zst.part   <- still being written
+
+Records are numbered with a per-stream offset that keeps counting across
+runs, and segments are named after the offset of their first record. A
+segment is sealed once it holds FEED_STREAM_MAX_BYTES of uncompressed JSON,
+has been open for FEED_STREAM_MAX_SECONDS, or the spider closes: the
+compressor is finished, the file fsynced and renamed without `.part`, and
+only then is a line appended to manifest.jsonl:
+
+    {"file": "jobs-000000004210.ndjson.zst", "first_offset": 4210, "records": 3523, ...}
+
+Consumers only read segments listed in the manifest, so they never see a
+half-written file and never touch the SQLite database. They keep their own
+offset checkpoint (see read_feed and tail_feed.py) and resume from it.
+
+A `.part` segment left behind by a crash is renamed to `.abandoned` on the
+next start and its offsets are reused; those items are still in the
+database. A sealed segment missing from the manifest (a crash between the
+rename and the manifest append) is counted and listed again, and a torn
+last manifest line is cut off.
+"""
+import gzip
+import io
+import json
+import logging
+import os
+import re
+import time
+
+logger = logging.getLogger(__name__)
+
+COMPRESSION_SUFFIXES = {'zstd': '.zst', 'gzip': '.gz', 'none': ''}
+DEFAULT_LEVELS = {'zstd': 3, 'gzip': 6, 'none': None}
+MANIFEST = 'manifest.jsonl'
+
+_segment_name = re.compile(r'-(\d{12})\.ndjson(\.zst|\.gz)?$')
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError("FEED_STREAM_COMPRESSION = 'zstd' requires zstandard") from e
+    return zstandard
+
+
+def _fsync_directory(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def open_segment(path):
+    """Text stream over the records of a (sealed) segment, by file suffix."""
+    if path.endswith('.zst'):
+        reader = _zstandard().ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+        return io.TextIOWrapper(reader, encoding='utf-8')
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    return open(path, encoding='utf-8')
+
+
+def read_manifest(stream_dir):
+    """Sealed segments of a stream in offset order. A torn last line is ignored."""
+    path = os.path.join(stream_dir, MANIFEST)
+    if not os.path.exists(path):
+        return []
+    segments = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.endswith('\n'):
+                segments.append(json.loads(line))
+    return segments
+
+
+def read_feed(directory, stream, offset=0):
+    """
+    Yield (offset, record) for every sealed record of `stream` at or after
+    `offset`. Resume by passing the last yielded offset + 1.
+    """
+    stream_dir = os.path.join(directory, stream)
+    for segment in read_manifest(stream_dir):
+        first, records = segment['first_offset'], segment['records']
+        if first + records <= offset:
+            continue
+        with open_segment(os.path.join(stream_dir, segment['file'])) as f:
+            for position, line in enumerate(f, first):
+                if position >= offset:
+                    yield position, json.loads(line)
+
+
+class RotatingFeedWriter:
+    """
+    Append records of one stream to size- and time-rotated NDJSON segments,
+    compressed with zstd, gzip or not at all.
+
+    Rotation is checked on every write; call rotate_if_due() periodically so
+    an idle stream is still sealed after `max_seconds`.
+    """
+
+    def __init__(self, directory, stream, compression='zstd', max_bytes=64 * 1024 * 1024,
+                 max_seconds=60.0, level=None):
+        if compression not in COMPRESSION_SUFFIXES:
+            raise ValueError(f"Unknown feed compression {compression!r}; use one of {sorted(COMPRESSION_SUFFIXES)}")
+        if compression == 'zstd':
+            _zstandard()
+        self.stream = stream
+        self.stream_dir = os.path.join(directory, stream)
+        self.compression = compression
+        self.suffix = '.ndjson' + COMPRESSION_SUFFIXES[compression]
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.level = DEFAULT_LEVELS[compression] if level is None else level
+        self.file = None
+        self.writer = None
+        self.records_written = 0
+        self.segments_sealed = 0
+        self.seal_seconds = 0.0
+        os.makedirs(self.stream_dir, exist_ok=True)
+        self.next_offset = self._recover()
+
+    @classmethod
+    def from_settings(cls, settings, stream):
+        level = settings.get('FEED_STREAM_LEVEL')
+        return cls(
+            settings.get('FEED_STREAM_DIR', 'feeds'),
+            stream,
+            compression=settings.get('FEED_STREAM_COMPRESSION', 'zstd'),
+            max_bytes=settings.getint('FEED_STREAM_MAX_BYTES', 64 * 1024 * 1024),
+            max_seconds=settings.getfloat('FEED_STREAM_MAX_SECONDS', 60.0),
+            level=int(level) if level not in (None, '') else None,
+        )
+
+    def _recover(self):
+        """Next offset from the manifest, after cleaning up a crashed run."""
+        manifest = os.path.join(self.stream_dir, MANIFEST)
+        if os.path.exists(manifest):
+            with open(manifest, 'rb+') as f:
+                content = f.read()
+                if not content.endswith(b'\n'):  # Torn append: the next one would extend it
+                    f.truncate(content.rfind(b'\n') + 1)
+        segments = read_manifest(self.stream_dir)
+        listed = {segment['file'] for segment in segments}
+        next_offset = max((s['first_offset'] + s['records'] for s in segments), default=0)
+        for name in sorted(os.listdir(self.stream_dir)):
+            path = os.path.join(self.stream_dir, name)
+            if name.endswith('.part'):
+                os.replace(path, f"{path[:-len('.part')]}.{int(time.time())}.abandoned")
+                logger.warning(f"Feed {self.stream}: abandoned unsealed segment {name}")
+                continue
+            match = _segment_name.search(name)
+            if match is None or name in listed or int(match.group(1)) != next_offset:
+                continue
+            with open_segment(path) as f:
+                records = sum(1 for _ in f)
+            self._append_manifest(name, next_offset, records, None, None, None)
+            logger.warning(f"Feed {self.stream}: listed sealed segment {name} missing from the manifest")
+            next_offset += records
+        return next_offset
+
+    def _open_segment(self):
+        self.first_offset = self.next_offset
+        self.name = f'{self.stream}-{self.first_offset:012d}{self.suffix}'
+        self.path = os.path.join(self.stream_dir, self.name + '.part')
+        self.file = open(self.path, 'wb')
+        if self.compression == 'zstd':
+            compressor = _zstandard().ZstdCompressor(level=self.level)
+            self.writer = compressor.stream_writer(self.file, closefd=False)
+        elif self.compression == 'gzip':
+            self.writer = gzip.GzipFile(fileobj=self.file, mode='wb', compresslevel=self.level)
+        else:
+            self.writer = self.file
+        self.segment_records = 0
+        self.segment_bytes = 0
+        self.started_at = time.time()
+        self.opened = time.monotonic()
+
+    def write(self, record):
+        """Append one JSON-serializable record and return its offset."""
+        if self.file is None:
+            self._open_segment()
+        line = json.dumps(record, ensure_ascii=False, default=str).encode('utf-8') + b'\n'
+        self.writer.write(line)
+        offset = self.next_offset
+        self.next_offset += 1
+        self.segment_records += 1
+        self.segment_bytes += len(line)
+        self.records_written += 1
+        if self.segment_bytes >= self.max_bytes:
+            self.seal()
+        else:
+            self.rotate_if_due()
+        return offset
+
+    def rotate_if_due(self):
+        if self.file is not None and time.monotonic() - self.opened >= self.max_seconds:
+            self.seal()
+
+    def seal(self):
+        """Finish the open segment and publish it in the manifest."""
+        if self.file is None:
+            return
+        started = time.perf_counter()
+        if self.writer is not self.file:
+            self.writer.close()
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        size = self.file.tell()
+        self.file.close()
+        self.file = self.writer = None
+        final = os.path.join(self.stream_dir, self.name)
+        os.replace(self.path, final)
+        _fsync_directory(self.stream_dir)
+        self._append_manifest(self.name, self.first_offset, self.segment_records, size,
+                              self.segment_bytes, self.started_at)
+        self.segments_sealed += 1
+        self.seal_seconds += time.perf_counter() - started
+
+    def _append_manifest(self, name, first_offset, records, size, raw_bytes, started_at):
+        entry = {
+            'file': name,
+            'first_offset': first_offset,
+            'records': records,
+            'bytes': size,
+            'raw_bytes': raw_bytes,
+            'started_at': started_at,
+            'sealed_at': time.time(),
+        }
+        with open(os.path.join(self.stream_dir, MANIFEST), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def record_stats(self, stats, prefix):
+        """Copy write counters into a Scrapy stats collector under `prefix`."""
+        if stats is None:
+            return
+        stats.set_value(f'{prefix}/records', self.records_written)
+        stats.set_value(f'{prefix}/segments', self.segments_sealed)
+        stats.set_value(f'{prefix}/seal_seconds', round(self.seal_seconds, 4))
+        stats.set_value(f'{prefix}/next_offset', self.next_offset)
+
+    def close(self):
+        self.seal()
@@ -0,0 +1,154 @@
+import json
+import os
+import time
+import zlib
+from email.utils import formatdate
+
+from scrapy.downloadermiddlewares.httpcache import HttpCacheMiddleware
+from scrapy.http import Headers
+from scrapy.responsetypes import responsetypes
+from scrapy.utils.project import data_path
+
+from careerjet.db import BufferedSQLiteWriter
+
+
+def is_job_ad(url):
+    return '/jobad/' in url
+
+
+class CareerjetCachePolicy:
+    """
+    Cache policy for Careerjet pages.
+
+    Cached pages are served without a request while they are younger than
+    HTTPCACHE_LISTING_EXPIRATION_SECS (listing pages) or
+    HTTPCACHE_JOBAD_EXPIRATION_SECS (job ads). Older pages are revalidated with
+    If-None-Match / If-Modified-Since, and a 304 reuses the cached body.
+    """
+
+    def __init__(self, settings):
+        self.listing_expiration = settings.getint('HTTPCACHE_LISTING_EXPIRATION_SECS', 600)
+        self.jobad_expiration = settings.getint('HTTPCACHE_JOBAD_EXPIRATION_SECS', 86400)
+        self.ignore_http_codes = {int(code) for code in settings.getlist('HTTPCACHE_IGNORE_HTTP_CODES')}
+
+    def should_cache_request(self, request):
+        return request.method == 'GET' and request.url.startswith('http')
+
+    def should_cache_response(self, response, request):
+        return response.status not in self.ignore_http_codes and response.status != 304
+
+    def is_cached_response_fresh(self, cachedresponse, request):
+        expiration = self.jobad_expiration if is_job_ad(request.url) else self.listing_expiration
+        stored_at = request.meta.get('cached_at', 0)
+        if time.time() - stored_at < expiration:
+            return True
+
+        etag = cachedresponse.headers.get(b'ETag')
+        last_modified = cachedresponse.headers.get(b'Last-Modified')
+        if etag:
+            request.headers[b'If-None-Match'] = etag
+        if last_modified:
+            request.headers[b'If-Modified-Since'] = last_modified
+        elif not etag and stored_at:
+            request.headers[b'If-Modified-Since'] = formatdate(stored_at, usegmt=True)
+        return False
+
+    def is_cached_response_valid(self, cachedresponse, response, request):
+        return response.status == 304
+
+
+class CareerjetHttpCacheMiddleware(HttpCacheMiddleware):
+    """
+    Scrapy's HTTP cache middleware, except that a 304 restarts the cached
+    page's freshness window (SQLiteCacheStorage.touch_response). Otherwise
+    a page past its expiration stays stale and is revalidated on every later
+    request: older Scrapy versions return a revalidated page without storing
+    it again.
+    """
+
+    def process_response(self, request, response, spider=None):
+        cachedresponse = request.meta.get('cached_response')
+        # Newer Scrapy versions no longer pass the spider and warn if it is passed on
+        result = super().process_response(request, response, *((spider,) if spider is not None else ()))
+        if response.status == 304 and cachedresponse is not None and result is cachedresponse:
+            self.storage.touch_response(request, response)
+        return result
+
+
+class SQLiteCacheStorage:
+    """
+    HTTP cache storage keyed by URL in HTTPCACHE_DIR/httpcache.db.
+
+    Bodies and headers are zlib-compressed; ETag and Last-Modified are kept in
+    their own indexed columns. Writes go through the buffered writer, so a
+    crawl commits the cache in batches rather than once per response. The
+    time a page was stored reaches the cache policy as
+    `request.meta['cached_at']`, not as a response header.
+    """
+
+    def __init__(self, settings):
+        self.cachedir = data_path(settings['HTTPCACHE_DIR'], createdir=True)
+        self.settings = settings
+
+    def open_spider(self, spider):
+        self.writer = BufferedSQLiteWriter(
+            os.path.join(self.cachedir, 'httpcache.db'),
+            batch_size=self.settings.getint('SQLITE_BATCH_SIZE', 500),
+            flush_interval=self.settings.getfloat('SQLITE_FLUSH_INTERVAL', 5.0),
+        )
+        self.writer.execute('''
+            CREATE TABLE IF NOT EXISTS http_cache (
+                url TEXT PRIMARY KEY,
+                status INTEGER,
+                headers BLOB,
+                body BLOB,
+                etag TEXT,
+                last_modified TEXT,
+                stored_at REAL
+            )
+        ''')
+        self.writer.execute('CREATE INDEX IF NOT EXISTS idx_http_cache_etag ON http_cache (etag)')
+
+    def close_spider(self, spider):
+        self.writer.close()
+
+    def retrieve_response(self, spider, request):
+        row = self.writer.execute(
+            'SELECT status, headers, body, stored_at FROM http_cache WHERE url = ?',
+            (request.url,)
+        ).fetchone()
+        if row is None:
+            return None
+        status, headers, body, stored_at = row
+        request.meta['cached_at'] = stored_at
+        headers = Headers(json.loads(zlib.decompress(headers)))
+        body = zlib.decompress(body)
+        respcls = responsetypes.from_args(headers=headers, url=request.url, body=body)
+        return respcls(url=request.url, headers=headers, status=status, body=body)
+
+    def store_response(self, spider, request, response):
+        if 'cached' in response.flags:
+            return  # A revalidated page stored again by Scrapy: touch_response refreshes it
+        headers = {
+            key.decode('latin1'): [value.decode('latin1') for value in values]
+            for key, values in response.headers.items()
+        }
+        etag = response.headers.get(b'ETag')
+        last_modified = response.headers.get(b'Last-Modified')
+        self.writer.add('''
+            INSERT OR REPLACE INTO http_cache
+            (url, status, headers, body, etag, last_modified, stored_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            request.url,
+            response.status,
+            zlib.compress(json.dumps(headers).encode('utf-8')),
+            zlib.compress(response.body),
+            etag.decode('latin1') if etag else None,
+            last_modified.decode('latin1') if last_modified else None,
+            time.time(),
+        ))
+
+    def touch_response(self, request, response):
+        """A 304 revalidated the cached page: it is fresh again, with the same body."""
+        self.writer.add('UPDATE http_cache SET stored_at = ? WHERE url = ?', (time.time(), request.url))
@@ -0,0 +1,146 @@
+"""
+Latency histograms for crawl and extraction stages, exportable as JSON and
+Prometheus text.
+
+Crawl stage names are slash-separated, e.g. `download`, `parse/parse_job`,
+`pipeline/SQLitePipeline` or `db_commit/jobs`. The extractor scripts in
+job_info_extractor_ai import this module too (through careerjet_path.py) and
+record `llm_call`, `cache_lookup`, `db_commit` and so on under their own
+Prometheus metric name.
+"""
+import functools
+import json
+import os
+import time
+from contextlib import contextmanager
+
+# Upper bounds in seconds, Prometheus-style (cumulative, +Inf implied)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+# Prometheus metric names of the spiders and of the extractor
+CRAWL_PREFIX = 'careerjet_stage_seconds'
+EXTRACTOR_PREFIX = 'careerjet_extractor_stage_seconds'
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+        for index, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.counts[index] += 1
+                return
+        self.counts[-1] += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th observation (max for the last bucket)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, bound in enumerate(self.buckets):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'mean': round(self.sum / self.count, 6) if self.count else None,
+            'p50': self.quantile(0.5),
+            'p90': self.quantile(0.9),
+            'p99': self.quantile(0.99),
+            'max': round(self.max, 6),
+        }
+
+
+class StageMetrics:
+    """Registry of per-stage histograms."""
+
+    def __init__(self, prefix=CRAWL_PREFIX):
+        self.histograms = {}
+        self.started = time.time()
+        self.prefix = prefix
+
+    def observe(self, stage, seconds):
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            histogram = self.histograms[stage] = Histogram()
+        histogram.observe(seconds)
+
+    @contextmanager
+    def time(self, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+
+    def to_dict(self):
+        return {
+            'started': self.started,
+            'exported': time.time(),
+            'stages': {stage: h.to_dict() for stage, h in sorted(self.histograms.items())},
+        }
+
+    def to_prometheus(self, prefix=None):
+        prefix = prefix or self.prefix
+        lines = [f'# TYPE {prefix} histogram']
+        for stage, histogram in sorted(self.histograms.items()):
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                lines.append(f'{prefix}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{prefix}_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+            lines.append(f'{prefix}_sum{{stage="{stage}"}} {histogram.sum:.6f}')
+            lines.append(f'{prefix}_count{{stage="{stage}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+    def export(self, path, extra=None):
+        """
+        Write `<path>.json` and `<path>.prom` atomically; the .prom file can be
+        picked up by the node_exporter textfile collector.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        payload = self.to_dict()
+        if extra:
+            payload.update(extra)
+        for suffix, content in (('.json', json.dumps(payload, indent=2, default=str)),
+                                ('.prom', self.to_prometheus())):
+            tmp = f'{path}{suffix}.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.write(content)
+            os.replace(tmp, f'{path}{suffix}')
+
+
+def metrics_for(crawler):
+    """The StageMetrics shared by every component of `crawler`."""
+    metrics = getattr(crawler, 'stage_metrics', None)
+    if metrics is None:
+        metrics = crawler.stage_metrics = StageMetrics()
+    return metrics
+
+
+def timed(stage):
+    """Record a method's duration under `stage` in `self.metrics`, if set."""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            metrics = getattr(self, 'metrics', None)
+            if metrics is None:
+                return method(self, *args, **kwargs)
+            with metrics.time(stage):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -8,6 +8,7 @@ import scrapy
 class JobDescriptionItem(scrapy.Item):
     job_link = scrapy.Field()
     job_description = scrapy.Field()
+    duplicate_of = scrapy.Field()  # Canonical job_link of a near-duplicate description
 
 
 class CareerjetItem(scrapy.Item):
@@ -16,5 +17,12 @@ class CareerjetItem(scrapy.Item):
     job_link = scrapy.Field()
     location = scrapy.Field()
     salary = scrapy.Field()
+    salary_min = scrapy.Field()
+    salary_max = scrapy.Field()
+    salary_period = scrapy.Field()
+    salary_currency = scrapy.Field()
+    location_canonical = scrapy.Field()
     page = scrapy.Field()  # Track which page the job was found on
-    scraped_at = scrapy.Field()  # Timestamp when scraped
\ No newline at end of file
+    scraped_at = scrapy.Field()  # Timestamp when scraped
+    duplicate_of = scrapy.Field()  # Canonical job_link of a near-duplicate listing
+    crawl_status = scrapy.Field()  # NEW, or DUPLICATE so the description spider skips it
@@ -1,5 +1,12 @@
-from scrapy import signals
+import json
+import os
 import random
+import time
+from email.utils import parsedate_to_datetime
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from careerjet.checkpoint import request_processed
+from careerjet.instrumentation import metrics_for
 
 class RotateUserAgentMiddleware:
     """
@@ -12,6 +19,212 @@ class RotateUserAgentMiddleware:
     def from_crawler(cls, crawler):
         return cls(crawler.settings.get('USER_AGENT_LIST', []))
 
-    def process_request(self, request, spider):
+    def process_request(self, request):
         if self.user_agents:
-            request.headers.setdefault('User-Agent', random.choice(self.user_agents))
\ No newline at end of file
+            request.headers.setdefault('User-Agent', random.choice(self.user_agents))
+
+
+class CallbackTimingMiddleware:
+    """
+    Spider middleware that times each callback, recorded as `parse/<callback>`.
+
+    Callbacks are generators, so the time measured is the time spent producing
+    their output. Install it closest to the spider (highest order) so other
+    middlewares are not included.
+    """
+    def __init__(self, metrics):
+        self.metrics = metrics
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(metrics_for(crawler))
+
+    def _stage(self, response):
+        callback = response.request.callback if response.request else None
+        return f"parse/{getattr(callback, '__name__', 'parse')}"
+
+    def process_spider_output(self, response, result):
+        stage = self._stage(response)
+        elapsed = 0.0
+        iterator = iter(result)
+        while True:
+            started = time.perf_counter()
+            try:
+                output = next(iterator)
+            except StopIteration:
+                break
+            finally:
+                elapsed += time.perf_counter() - started
+            yield output
+        self.metrics.observe(stage, elapsed)
+
+    async def process_spider_output_async(self, response, result):
+        stage = self._stage(response)
+        elapsed = 0.0
+        iterator = result.__aiter__()
+        while True:
+            started = time.perf_counter()
+            try:
+                output = await iterator.__anext__()
+            except StopAsyncIteration:
+                break
+            finally:
+                elapsed += time.perf_counter() - started
+            yield output
+        self.metrics.observe(stage, elapsed)
+
+
+class CheckpointMiddleware:
+    """
+    Spider middleware that sends `careerjet.checkpoint.request_processed`
+    once a callback's output has been consumed completely, i.e. every item it
+    yielded has been handed to the pipelines. CheckpointScheduler marks the
+    request DONE after the next pipeline commit.
+    """
+    def __init__(self, signals):
+        self.signals = signals
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool('CHECKPOINT_ENABLED'):
+            raise NotConfigured
+        return cls(crawler.signals)
+
+    def process_spider_output(self, response, result):
+        yield from result
+        self.signals.send_catch_log(request_processed, request=response.request)
+
+    async def process_spider_output_async(self, response, result):
+        async for output in result:
+            yield output
+        self.signals.send_catch_log(request_processed, request=response.request)
+
+
+class AdaptiveConcurrencyMiddleware:
+    """
+    AIMD controller for per-domain download slots.
+
+    Every ADAPTIVE_INCREASE_EVERY healthy responses (status < 400 and latency
+    under ADAPTIVE_TARGET_LATENCY) add one to the slot's concurrency and trim
+    its delay by 10%. A 429/503, a Retry-After header or a download error
+    multiplies concurrency by ADAPTIVE_DECREASE_FACTOR and doubles the delay
+    (or waits out Retry-After). The learned rate per slot is saved to
+    ADAPTIVE_STATE_PATH on close and applied to new slots on the next run.
+
+    Runs before RetryMiddleware so it sees 429/503 responses before they are retried.
+    """
+    backoff_codes = {429, 503}
+
+    def __init__(self, crawler):
+        settings = crawler.settings
+        if not settings.getbool('ADAPTIVE_CONCURRENCY_ENABLED'):
+            raise NotConfigured
+        self.crawler = crawler
+        self.min_concurrency = settings.getint('ADAPTIVE_MIN_CONCURRENCY', 1)
+        self.max_concurrency = settings.getint('ADAPTIVE_MAX_CONCURRENCY', 8)
+        self.min_delay = settings.getfloat('ADAPTIVE_MIN_DELAY', 0.25)
+        self.max_delay = settings.getfloat('ADAPTIVE_MAX_DELAY', 60.0)
+        self.target_latency = settings.getfloat('ADAPTIVE_TARGET_LATENCY', 2.0)
+        self.increase_every = settings.getint('ADAPTIVE_INCREASE_EVERY', 20)
+        self.decrease_factor = settings.getfloat('ADAPTIVE_DECREASE_FACTOR', 0.5)
+        self.state_path = settings.get('ADAPTIVE_STATE_PATH', 'adaptive_concurrency.json')
+        self.state = self.load_state()
+        self.healthy = {}
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        middleware = cls(crawler)
+        crawler.signals.connect(middleware.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(middleware.spider_closed, signal=signals.spider_closed)
+        return middleware
+
+    def load_state(self):
+        if not os.path.exists(self.state_path):
+            return {}
+        with open(self.state_path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def spider_opened(self, spider):
+        # Slots are created lazily from per_slot_settings, so seeding it makes
+        # the very first requests run at the last known safe rate
+        per_slot_settings = self.crawler.engine.downloader.per_slot_settings
+        for key, saved in self.state.items():
+            per_slot_settings.setdefault(key, {}).update(
+                concurrency=saved['concurrency'], delay=saved['delay']
+            )
+            spider.logger.info(
+                f"Adaptive concurrency: {key} resumes at {saved['concurrency']} "
+                f"concurrent requests, {saved['delay']:.2f}s delay"
+            )
+
+    def spider_closed(self, spider):
+        for key, slot in self.crawler.engine.downloader.slots.items():
+            self.state[key] = {
+                'concurrency': slot.concurrency,
+                'delay': round(slot.delay, 3),
+                'updated': time.time(),
+            }
+        tmp = f'{self.state_path}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp, self.state_path)
+
+    def get_slot(self, request):
+        key = request.meta.get('download_slot')
+        return key, self.crawler.engine.downloader.slots.get(key)
+
+    def process_response(self, request, response):
+        if 'cached' in response.flags:
+            return response
+        key, slot = self.get_slot(request)
+        if slot is None:
+            return response
+
+        retry_after = self.parse_retry_after(response.headers.get(b'Retry-After'))
+        if response.status in self.backoff_codes or retry_after is not None:
+            self.back_off(key, slot, f'HTTP {response.status}', retry_after)
+        elif response.status < 400 and request.meta.get('download_latency', 0) <= self.target_latency:
+            self.speed_up(key, slot)
+        return response
+
+    def process_exception(self, request, exception):
+        key, slot = self.get_slot(request)
+        if slot is not None:
+            self.back_off(key, slot, type(exception).__name__)
+
+    def speed_up(self, key, slot):
+        self.healthy[key] = self.healthy.get(key, 0) + 1
+        if self.healthy[key] < self.increase_every:
+            return
+        self.healthy[key] = 0
+        slot.concurrency = min(self.max_concurrency, slot.concurrency + 1)
+        slot.delay = max(self.min_delay, slot.delay * 0.9)
+        self.record(key, slot)
+
+    def back_off(self, key, slot, reason, retry_after=None):
+        self.healthy[key] = 0
+        slot.concurrency = max(self.min_concurrency, int(slot.concurrency * self.decrease_factor))
+        slot.delay = min(self.max_delay, max(slot.delay * 2, self.min_delay, retry_after or 0))
+        self.crawler.stats.inc_value(f'adaptive/{key}/backoffs')
+        self.record(key, slot)
+        self.crawler.spider.logger.info(
+            f"Adaptive concurrency: {reason} from {key}, backing off to "
+            f"{slot.concurrency} concurrent requests, {slot.delay:.2f}s delay"
+        )
+
+    def record(self, key, slot):
+        self.crawler.stats.set_value(f'adaptive/{key}/concurrency', slot.concurrency)
+        self.crawler.stats.set_value(f'adaptive/{key}/delay', round(slot.delay, 3))
+
+    @staticmethod
+    def parse_retry_after(value):
+        """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date), or None."""
+        if not value:
+            return None
+        value = value.decode('latin1').strip()
+        if value.isdigit():
+            return float(value)
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
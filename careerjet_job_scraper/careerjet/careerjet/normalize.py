@@ -0,0 +1,153 @@
+"""
+Salary and location normalization.
+
+parse_salary() / canonical_location() handle one item in CleaningPipeline;
+normalize_frame() applies the same patterns to whole pandas columns with
+vectorized string operations for backfill_normalized.py. Both paths share the
+regular expressions and lookup tables below, so they agree row for row.
+"""
+import re
+
+NORMALIZED_COLUMNS = {
+    'salary_min': 'REAL',
+    'salary_max': 'REAL',
+    'salary_period': 'TEXT',    # hour, day, week, month or year
+    'salary_currency': 'TEXT',  # ISO 4217 code
+    'location_canonical': 'TEXT',
+}
+
+_NUMBER = r'\d[\d,]*(?:\.\d+)?'
+_CURRENCY = r'৳|tk\.?|bdt|taka|\$|usd|€|eur'
+SALARY_PATTERN = re.compile(
+    rf'(?P<low>{_NUMBER})\s*(?P<low_k>k\b)?'
+    rf'(?:\s*(?:-|–|to)\s*(?:{_CURRENCY})?\s*(?P<high>{_NUMBER})\s*(?P<high_k>k\b)?)?',
+    re.IGNORECASE,
+)
+PERIOD_PATTERN = re.compile(
+    r'(?:\bper\s*|/\s*|\ba\s+|\b)'
+    r'(?P<period>hourly|daily|weekly|monthly|yearly|annually|annual|annum|hour|hr|day|week|month|mo|year|yr)\b',
+    re.IGNORECASE,
+)
+CURRENCY_PATTERN = re.compile(rf'(?P<currency>{_CURRENCY})', re.IGNORECASE)
+
+PERIODS = {
+    'hourly': 'hour', 'hour': 'hour', 'hr': 'hour',
+    'daily': 'day', 'day': 'day',
+    'weekly': 'week', 'week': 'week',
+    'monthly': 'month', 'month': 'month', 'mo': 'month',
+    'yearly': 'year', 'annually': 'year', 'annual': 'year', 'annum': 'year', 'year': 'year', 'yr': 'year',
+}
+CURRENCIES = {
+    '৳': 'BDT', 'tk': 'BDT', 'tk.': 'BDT', 'bdt': 'BDT', 'taka': 'BDT',
+    '$': 'USD', 'usd': 'USD',
+    '€': 'EUR', 'eur': 'EUR',
+}
+# Old romanized spellings still common in listings
+LOCATION_ALIASES = {
+    'dacca': 'Dhaka',
+    'chittagong': 'Chattogram',
+    'comilla': 'Cumilla',
+    'barisal': 'Barishal',
+    'jessore': 'Jashore',
+    'bogra': 'Bogura',
+    'chapai nawabganj': 'Chapainawabganj',
+}
+
+
+def _amount(number, thousands):
+    value = float(number.replace(',', ''))
+    return value * 1000 if thousands else value
+
+
+def parse_salary(text, default_currency=None):
+    """
+    Split a salary string such as "৳ 22,000 - 26,000 per month" into
+    salary_min, salary_max, salary_period and salary_currency (None when
+    absent). A single figure sets both bounds.
+    """
+    result = dict.fromkeys(('salary_min', 'salary_max', 'salary_period', 'salary_currency'))
+    if not text:
+        return result
+    match = SALARY_PATTERN.search(text)
+    if not match:
+        return result
+    low = _amount(match['low'], match['low_k'])
+    high = _amount(match['high'], match['high_k']) if match['high'] else low
+    result['salary_min'], result['salary_max'] = low, high
+    period = PERIOD_PATTERN.search(text)
+    if period:
+        result['salary_period'] = PERIODS[period['period'].lower()]
+    currency = CURRENCY_PATTERN.search(text)
+    result['salary_currency'] = CURRENCIES[currency['currency'].lower()] if currency else default_currency
+    return result
+
+
+def canonical_location(text):
+    """
+    The most specific place in a location string, with spacing and case
+    normalized and old spellings mapped: "  jamalpur,  Mymensingh" -> "Jamalpur".
+    """
+    if not text:
+        return None
+    place = ' '.join(text.split(',')[0].split()).lower()
+    if not place:
+        return None
+    return LOCATION_ALIASES.get(place) or place.title()
+
+
+def normalize_frame(frame, default_currency=None):
+    """
+    Vectorized parse_salary/canonical_location over the `salary` and
+    `location` columns of a pandas DataFrame; returns the NORMALIZED_COLUMNS.
+
+    Both columns repeat heavily ("৳ 20,000 - 30,000", "Dhaka"), so each is
+    factorized first and the string operations run on distinct values only;
+    results are broadcast back to every row by code.
+    """
+    import pandas as pd
+
+    salaries = _by_distinct_value(frame['salary'], lambda values: _salary_columns(values, default_currency))
+    locations = _by_distinct_value(frame['location'], _location_column)
+    result = pd.concat([salaries, locations], axis=1)
+    result.index = frame.index
+    return result
+
+
+def _by_distinct_value(column, normalize):
+    import pandas as pd
+
+    codes, uniques = pd.factorize(column)
+    # A trailing all-NA row: missing values (code -1) select it
+    values = pd.Series(list(uniques) + [None], dtype='string')
+    return normalize(values).iloc[codes].reset_index(drop=True)
+
+
+def _salary_columns(salary, default_currency):
+    import pandas as pd
+
+    parts = salary.str.extract(SALARY_PATTERN)
+    low = pd.to_numeric(parts['low'].str.replace(',', '', regex=False), errors='coerce')
+    high = pd.to_numeric(parts['high'].str.replace(',', '', regex=False), errors='coerce')
+    low = low.where(parts['low_k'].isna(), low * 1000)
+    high = high.where(parts['high_k'].isna(), high * 1000).fillna(low)
+
+    period = salary.str.extract(PERIOD_PATTERN)['period'].str.lower().map(PERIODS)
+    currency = salary.str.extract(CURRENCY_PATTERN)['currency'].str.lower().map(CURRENCIES)
+    currency = currency.where(low.isna() | currency.notna(), default_currency)
+
+    return pd.DataFrame({
+        'salary_min': low,
+        'salary_max': high,
+        'salary_period': period.where(low.notna()),
+        'salary_currency': currency.where(low.notna()),
+    })
+
+
+def _location_column(location):
+    place = (
+        location.str.split(',', n=1).str[0]
+        .str.split().str.join(' ')
+        .str.lower()
+    )
+    place = place.where(place != '')
+    return place.map(LOCATION_ALIASES).fillna(place.str.title()).rename('location_canonical')
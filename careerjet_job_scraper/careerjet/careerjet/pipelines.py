@@ -1,7 +1,13 @@
 import re
-from scrapy.exceptions import DropItem
+from scrapy.exceptions import DropItem, NotConfigured
+from twisted.internet import task
 from datetime import datetime
-import sqlite3
+from careerjet.checkpoint import items_committed
+from careerjet.feeds import RotatingFeedWriter
+from careerjet.instrumentation import metrics_for, timed
+from careerjet.items import JobDescriptionItem
+from careerjet.normalize import canonical_location, parse_salary
+from careerjet.storage import JOB_COLUMNS, open_storage
 
 class CleaningPipeline:
     """
@@ -9,26 +15,42 @@ class CleaningPipeline:
     """
     salary_pattern = re.compile(r'([\d,]+)(?:\s*-\s*([\d,]+))?')
 
-    def process_item(self, item, spider):
+    def __init__(self, base_url="https://www.careerjet.com.bd", metrics=None, default_currency=None, crawler=None):
+        self.base_url = base_url.rstrip('/')
+        self.metrics = metrics
+        self.default_currency = default_currency
+        self.crawler = crawler
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(
+            crawler.settings.get('CAREERJET_BASE_URL', 'https://www.careerjet.com.bd'),
+            metrics_for(crawler),
+            crawler.settings.get('SALARY_DEFAULT_CURRENCY'),
+            crawler,
+        )
+
+    @timed('pipeline/CleaningPipeline')
+    def process_item(self, item):
         #  Add timestamp
         item['scraped_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         # Title must exist
         if not item.get('title'):
-            spider.logger.warning('Missing title for item: %r', item)
+            self.crawler.spider.logger.warning('Missing title for item: %r', item)
             raise DropItem('Missing title')
         item['title'] = item['title'].strip()
 
         # Company can be empty, but log if missing
+        # (company, location and salary arrive as normalized strings from careerjet.extractors)
         if not item.get('company'):
-            spider.logger.info('Company missing for "%s"', item['title'])
-        else:
-            company = " ".join([part.strip() for part in item['company'] if part.strip()])
-            item['company'] = company if company else None
+            self.crawler.spider.logger.info('Company missing for "%s"', item['title'])
+            item['company'] = None
+
+        # Numeric salary bounds, period and currency from the raw text
+        item.update(parse_salary(item.get('salary'), self.default_currency))
 
         # Normalize salary
-        raw = item.get('salary') or ''
-        raw = "".join([part.strip() for part in raw if part.strip()])
-        m = self.salary_pattern.search(raw)
+        m = self.salary_pattern.search(item.get('salary') or '')
         if m:
             low = m.group(1).replace(',', '')
             high = m.group(2).replace(',', '') if m.group(2) else None
@@ -36,100 +58,204 @@ class CleaningPipeline:
         else:
             item['salary'] = None
 
-        # Normalize job_link to absolute
         # Normalize job_link to absolute
         link = item.get('job_link')
         if link and not link.startswith('http'):
-            base_url = "https://www.careerjet.com.bd"
-            item['job_link'] = base_url + link
+            item['job_link'] = self.base_url + link
         elif not link:
             item['job_link'] = None
         
         # Normalize location
-        location = item.get('location') or []
-        location_str = " ".join([part.strip() for part in location if part.strip()])
-        item['location'] = location_str if location_str else None
-        
+        item['location'] = item.get('location') or None
+        item['location_canonical'] = canonical_location(item['location'])
+
         return item
     
-class SQLitePipeline:
-    def open_spider(self, spider):
-        self.connection = sqlite3.connect("careerjet_jobs.db")
-        self.cursor = self.connection.cursor()
-        self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS jobs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT,
-                company TEXT,
-                job_link TEXT UNIQUE,
-                location TEXT,
-                salary TEXT,
-                page INTEGER,
-                scraped_at DATETIME,
-                crawl_status TEXT DEFAULT 'NEW'
-            )
-        ''')
-        self.connection.commit()
+class DeduplicationPipeline:
+    """
+    Link near-duplicate listings and descriptions to their canonical row
+    (see careerjet.dedupe). Duplicate listings are stored as DUPLICATE, so
+    careerjet_description never claims them; duplicate descriptions are
+    stored as DUPLICATE, so get_job_components.py skips the LLM call and
+    copies the canonical row's components instead.
+    """
+
+    def __init__(self, index, stats=None, metrics=None, crawler=None):
+        self.index = index
+        self.stats = stats
+        self.metrics = metrics
+        self.crawler = crawler
+        self.kinds = set()
 
-    def close_spider(self, spider):
-        self.connection.commit()
-        self.connection.close()
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool('DEDUPE_ENABLED'):
+            raise NotConfigured
+        # Imported here: careerjet.dedupe needs numpy, which the other pipelines do not
+        from careerjet.dedupe import LSHIndex
+        return cls(LSHIndex.from_settings(crawler.settings), crawler.stats, metrics_for(crawler), crawler)
 
-    def process_item(self, item, spider):
-        self.cursor.execute('''
-            INSERT OR IGNORE INTO jobs (
-                title, company, job_link, location, salary, page, scraped_at, crawl_status
+    def close_spider(self):
+        for kind, counts in self.index.stats().items():
+            if kind not in self.kinds:
+                continue
+            self.crawler.spider.logger.info(
+                f"Dedupe index [{kind}]: {counts['duplicates']}/{counts['indexed']} duplicates "
+                f"(ratio {counts['duplicate_ratio']})"
             )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            item.get('title'),
-            item.get('company'),
-            item.get('job_link'),
-            item.get('location'),
-            item.get('salary'),
-            item.get('page'),
-            item.get('scraped_at'),
-            'NEW'
-        ))
+            if self.stats is not None:
+                self.stats.set_value(f'dedupe/{kind}/duplicate_ratio', counts['duplicate_ratio'])
+        self.index.close()
+
+    @timed('pipeline/DeduplicationPipeline')
+    def process_item(self, item):
+        if isinstance(item, JobDescriptionItem):
+            kind, text = 'description', item.get('job_description')
+        else:
+            kind = 'listing'
+            text = " ".join(filter(None, (item.get('title'), item.get('company'), item.get('location'))))
+        self.kinds.add(kind)
+        canonical = self.index.check(kind, item.get('job_link'), text)
+        if self.stats is not None:
+            self.stats.inc_value(f'dedupe/{kind}/checked')
+        if canonical:
+            item['duplicate_of'] = canonical
+            if kind == 'listing':
+                item['crawl_status'] = 'DUPLICATE'
+            if self.stats is not None:
+                self.stats.inc_value(f'dedupe/{kind}/duplicates')
+        return item
+
+class SQLitePipeline:
+    """
+    Store listing items in the `jobs` table through the STORAGE_BACKEND
+    storage (SQLite by default, see careerjet.storage).
+
+    Sends `careerjet.checkpoint.items_committed` after every flush, so the
+    crawl checkpoint only marks pages done once their items are stored.
+    """
+
+    def __init__(self, settings, stats=None, metrics=None, signals=None):
+        self.settings = settings
+        self.stats = stats
+        self.metrics = metrics
+        self.signals = signals
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler.settings, crawler.stats, metrics_for(crawler), crawler.signals)
+
+    def open_spider(self):
+        self.storage = open_storage(self.settings, self.metrics, 'jobs')
+        self.storage.ensure_jobs_table()
+
+    def close_spider(self):
+        self.storage.close()
+        self.storage.record_stats(self.stats, f'{self.storage.backend}/jobs')
+        self.notify_committed()
+
+    def notify_committed(self):
+        if self.signals is not None:
+            self.signals.send_catch_log(items_committed)
+
+    @timed('pipeline/SQLitePipeline')
+    def process_item(self, item):
+        item.setdefault('crawl_status', 'NEW')
+        flushes = self.storage.flushes
+        self.storage.add_job(tuple(item.get(column) for column in JOB_COLUMNS))
+        if self.storage.flushes != flushes:
+            self.notify_committed()
         return item
     
 class JobDescriptionPipeline:
-    def open_spider(self, spider):
-        if spider.name != 'careerjet_description':
+    """
+    Store descriptions and mark their jobs DONE. The insert and the status
+    update for a batch of items are committed together, so a crash never
+    leaves a DONE job without its description.
+    """
+
+    def __init__(self, settings, stats=None, metrics=None, crawler=None):
+        self.settings = settings
+        self.stats = stats
+        self.metrics = metrics
+        self.crawler = crawler
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler.settings, crawler.stats, metrics_for(crawler), crawler)
+
+    def open_spider(self):
+        if self.crawler.spider.name != 'careerjet_description':
             return
-        self.connection = sqlite3.connect("careerjet_jobs.db")
-        self.cursor = self.connection.cursor()
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS job_description (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                job_link TEXT UNIQUE,
-                job_description TEXT,
-                status TEXT DEFAULT 'NEW'
-            )
-        ''')
-        self.connection.commit()
+        self.storage = open_storage(self.settings, self.metrics, 'job_description')
+        self.storage.ensure_description_table()
 
-    def close_spider(self, spider):
-        if spider.name != 'careerjet_description':
+    def close_spider(self):
+        if self.crawler.spider.name != 'careerjet_description':
             return
-        self.connection.commit()
-        self.connection.close()
+        self.storage.close()
+        self.storage.record_stats(self.stats, f'{self.storage.backend}/job_description')
 
-    def process_item(self, item, spider):
-        if spider.name != 'careerjet_description':
+    @timed('pipeline/JobDescriptionPipeline')
+    def process_item(self, item):
+        if self.crawler.spider.name != 'careerjet_description':
             return item
-        
-        self.cursor.execute('''
-            INSERT OR REPLACE INTO job_description (job_link, job_description, status)
-            VALUES (?, ?, 'NEW')
-        ''', (
-            item.get('job_link'),
-            item.get('job_description'),
-        ))
-        self.cursor.execute('''
-            UPDATE jobs
-            SET crawl_status = 'DONE'
-            WHERE job_link = ?
-        ''', (item.get('job_link'),))
-        self.connection.commit()
+
+        self.storage.add_description(
+            item.get('job_link'), item.get('job_description'), item.get('duplicate_of')
+        )
+        return item
+
+
+class FeedExportPipeline:
+    """
+    Stream items to rotated, compressed NDJSON feeds (see careerjet.feeds):
+    listings to the `jobs` stream, descriptions to `job_descriptions`.
+    Consumers tail sealed segments through the manifest instead of polling
+    the database while the crawl runs.
+    """
+
+    def __init__(self, settings, stats=None, metrics=None, crawler=None):
+        self.settings = settings
+        self.stats = stats
+        self.metrics = metrics
+        self.crawler = crawler
+        self.writers = {}
+        self.task = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool('FEED_STREAM_ENABLED'):
+            raise NotConfigured
+        return cls(crawler.settings, crawler.stats, metrics_for(crawler), crawler)
+
+    def open_spider(self):
+        interval = self.settings.getfloat('FEED_STREAM_MAX_SECONDS', 60.0)
+        if interval > 0:
+            self.task = task.LoopingCall(self.rotate_idle)
+            self.task.start(min(interval, 5.0), now=False)
+
+    def close_spider(self):
+        if self.task and self.task.running:
+            self.task.stop()
+        for stream, writer in self.writers.items():
+            writer.close()
+            writer.record_stats(self.stats, f'feeds/{stream}')
+            self.crawler.spider.logger.info(
+                f"Feed {stream}: {writer.records_written} records in "
+                f"{writer.segments_sealed} segments, next offset {writer.next_offset}"
+            )
+
+    def rotate_idle(self):
+        """Seal segments that stayed open past FEED_STREAM_MAX_SECONDS without new items."""
+        for writer in self.writers.values():
+            writer.rotate_if_due()
+
+    @timed('pipeline/FeedExportPipeline')
+    def process_item(self, item):
+        stream = 'job_descriptions' if isinstance(item, JobDescriptionItem) else 'jobs'
+        writer = self.writers.get(stream)
+        if writer is None:
+            writer = self.writers[stream] = RotatingFeedWriter.from_settings(self.settings, stream)
+        writer.write(dict(item))
         return item
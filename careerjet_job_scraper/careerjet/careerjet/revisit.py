@@ -0,0 +1,64 @@
+"""
+Change detection and revisit scheduling for job descriptions.
+
+Every stored description keeps a fingerprint of its normalized text and when
+it was first seen, last seen and last changed. When careerjet_description
+fetches an ad again, an unchanged fingerprint only refreshes those times: the
+description is not rewritten and its extraction status is kept, so it is not
+sent to the LLM again. A changed one replaces the row with status NEW and
+bumps change_count.
+
+Each visit also sets next_visit_at. The interval is the posting's average
+time between observed changes,
+
+    (now - first_seen_at + min_interval) / (change_count + 1)
+
+clamped to [REVISIT_MIN_INTERVAL, REVISIT_MAX_INTERVAL]. Postings that change
+often are revisited sooner, and old postings that never change drift towards
+the maximum. Postings first seen more than REVISIT_MAX_AGE ago are not
+revisited at all. At start-up the spider requeues up to REVISIT_BATCH_SIZE
+DONE jobs that are due (see storage.schedule_revisits), oldest due first.
+"""
+import hashlib
+import re
+
+REVISIT_COLUMNS = {
+    'content_hash': 'TEXT',
+    'first_seen_at': 'REAL',    # Unix timestamps
+    'last_seen_at': 'REAL',
+    'last_changed_at': 'REAL',
+    'change_count': 'INTEGER',
+    'next_visit_at': 'REAL',
+}
+
+_whitespace = re.compile(r'\s+')
+
+
+def content_fingerprint(text):
+    """Hash of the whitespace- and case-normalized text, so layout-only edits do not count."""
+    normalized = _whitespace.sub(' ', text or '').strip().casefold()
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+
+
+class RevisitPolicy:
+    def __init__(self, enabled=True, min_interval=86400.0, max_interval=14 * 86400.0,
+                 max_age=60 * 86400.0, batch_size=1000):
+        self.enabled = enabled
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.max_age = max_age        # Postings first seen longer ago are not revisited
+        self.batch_size = batch_size  # Jobs requeued per spider run
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(
+            enabled=settings.getbool('REVISIT_ENABLED', True),
+            min_interval=settings.getfloat('REVISIT_MIN_INTERVAL', 86400.0),
+            max_interval=settings.getfloat('REVISIT_MAX_INTERVAL', 14 * 86400.0),
+            max_age=settings.getfloat('REVISIT_MAX_AGE', 60 * 86400.0),
+            batch_size=settings.getint('REVISIT_BATCH_SIZE', 1000),
+        )
+
+    def next_interval(self, age, change_count):
+        """Seconds until the next visit of a posting `age` seconds old that changed `change_count` times."""
+        return min(self.max_interval, max(self.min_interval, (age + self.min_interval) / (change_count + 1)))
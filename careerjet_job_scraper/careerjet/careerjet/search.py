@@ -0,0 +1,206 @@
+"""
+Full-text search over jobs, descriptions and extracted components.
+
+`jobs_fts` is an SQLite FTS5 table with one row per job (rowid = jobs.id)
+holding its title, company, description, responsibilities and requirements.
+Ranking is bm25 with title and company weighted above the body text, and
+location/salary filters are applied by joining back to `jobs`.
+
+The index is synced incrementally, like export_parquet.py, from the change
+sequence (careerjet.db.ensure_change_tracking): triggers stamp every insert
+into, and content change of, jobs, job_description and job_components with a
+new `change_seq`, and every job with a row above the sequence value recorded in
+`search_state.last_change_seq` is re-indexed. Syncing is cheap when little has changed.
+Tracking is installed by the writers that create the tables; while one of
+them still lacks `change_seq`, every sync rebuilds the whole index.
+"""
+import re
+import sqlite3
+
+from careerjet.db import change_sequence, untracked_tables
+from careerjet.normalize import canonical_location
+
+SOURCE_TABLES = ('jobs', 'job_description', 'job_components')
+FTS_COLUMNS = ('title', 'company', 'description', 'responsibilities', 'requirements')
+# bm25 weights, in FTS_COLUMNS order
+WEIGHTS = (10.0, 5.0, 1.0, 2.0, 2.0)
+SNIPPET_TOKENS = 16
+# Matches ranked per query (None: all of them); see search()
+DEFAULT_MAX_CANDIDATES = None
+
+_term = re.compile(r'\w+')
+
+
+class InvalidQueryError(ValueError):
+    """A raw query that FTS5 cannot parse (unbalanced quotes, unknown column, ...)."""
+
+
+def ensure_index(conn):
+    conn.execute(f'''
+        CREATE VIRTUAL TABLE IF NOT EXISTS jobs_fts USING fts5(
+            {", ".join(FTS_COLUMNS)},
+            tokenize = 'porter unicode61 remove_diacritics 2'
+        )
+    ''')
+    # last_change_seq is a change sequence value (careerjet.db.change_sequence), not a jobs.id
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS search_state (
+            source TEXT PRIMARY KEY,
+            last_change_seq INTEGER NOT NULL
+        )
+    ''')
+    if 'last_id' in _columns(conn, 'search_state'):  # Named before it held sequence values
+        conn.execute("ALTER TABLE search_state RENAME COLUMN last_id TO last_change_seq")
+
+
+def _tables(conn):
+    return {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+
+def _columns(conn, table):
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def sync_index(conn, full=False):
+    """
+    Re-index every job changed since the last sync (or all of them with
+    `full`) in one transaction; return the number of jobs indexed.
+    """
+    ensure_index(conn)
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        present = _tables(conn) & set(SOURCE_TABLES)
+        if 'jobs' not in present:
+            conn.execute('ROLLBACK')
+            return 0
+        row = conn.execute("SELECT last_change_seq FROM search_state WHERE source = 'change_seq'").fetchone()
+        # Without that row, search_state held per-table id watermarks from before change
+        # tracking: rebuild once. Tables last written before tracking: rebuild every time
+        untracked = untracked_tables(conn, sorted(present))
+        full = full or row is None or bool(untracked)
+        sequence = change_sequence(conn)
+        changed = "SELECT id FROM jobs"
+        if not full:
+            stamped = " UNION ".join(f"SELECT job_link FROM {table} WHERE change_seq > :since" for table in present)
+            changed += f" WHERE job_link IN ({stamped})"
+        conn.execute("DROP TABLE IF EXISTS temp.search_changed")
+        conn.execute(f"CREATE TEMP TABLE search_changed AS {changed}", {'since': row and row[0]})
+        if full:
+            conn.execute("DELETE FROM jobs_fts")
+        else:
+            # jobs rows are only ever inserted (INSERT OR IGNORE), so their ids are stable
+            conn.execute("DELETE FROM jobs_fts WHERE rowid IN (SELECT id FROM temp.search_changed)")
+
+        description = "d.job_description" if 'job_description' in present else "NULL"
+        responsibilities, requirements = (
+            ("c.job_responsibilities", "c.job_requirements") if 'job_components' in present else ("NULL", "NULL")
+        )
+        joins = []
+        if 'job_description' in present:
+            joins.append("LEFT JOIN job_description d ON d.job_link = j.job_link")
+        if 'job_components' in present:
+            joins.append("LEFT JOIN job_components c ON c.job_link = j.job_link")
+        indexed = conn.execute(f'''
+            INSERT INTO jobs_fts (rowid, {", ".join(FTS_COLUMNS)})
+            SELECT j.id, j.title, j.company, {description}, {responsibilities}, {requirements}
+            FROM temp.search_changed changed
+            JOIN jobs j ON j.id = changed.id
+            {" ".join(joins)}
+        ''').rowcount
+        conn.execute("DELETE FROM search_state")
+        if not untracked:
+            conn.execute("INSERT INTO search_state (source, last_change_seq) VALUES ('change_seq', ?)", (sequence,))
+        conn.execute("DROP TABLE temp.search_changed")
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+    conn.execute('COMMIT')
+    return indexed
+
+
+def _newest_match(conn, expression, n):
+    """
+    Rowid of the n-th newest job matching `expression`, or None when fewer
+    match. FTS5 walks matches in rowid order, so this stops after n rows.
+    """
+    row = conn.execute(
+        "SELECT rowid FROM jobs_fts WHERE jobs_fts MATCH ? ORDER BY rowid DESC LIMIT 1 OFFSET ?",
+        (expression, n - 1)
+    ).fetchone()
+    return row[0] if row else None
+
+
+def _ranked(conn, where, params, normalized):
+    salary = "j.salary_min, j.salary_max, j.salary_currency" if normalized else "NULL, NULL, NULL"
+    rows = conn.execute(f'''
+        SELECT j.title, j.company, j.location, j.job_link, {salary},
+               snippet(jobs_fts, -1, '[', ']', '…', {SNIPPET_TOKENS}),
+               bm25(jobs_fts, {", ".join(map(str, WEIGHTS))}) AS score
+        FROM jobs_fts
+        JOIN jobs j ON j.id = jobs_fts.rowid
+        WHERE {where}
+        ORDER BY score
+        LIMIT :limit
+    ''', params).fetchall()
+    fields = ('title', 'company', 'location', 'job_link', 'salary_min', 'salary_max', 'salary_currency',
+              'snippet', 'score')
+    return [dict(zip(fields, row)) for row in rows]
+
+
+def match_expression(query):
+    """FTS5 MATCH expression requiring every word of a plain-text query."""
+    return " ".join(f'"{term}"' for term in _term.findall(query))
+
+
+def search(conn, query, location=None, min_salary=None, max_salary=None, limit=20, raw=False,
+           max_candidates=DEFAULT_MAX_CANDIDATES):
+    """
+    Best-ranked jobs matching `query`, as dicts with a `snippet` of the best
+    matching column ([matches] in brackets).
+
+    Every match is ranked by default. bm25 costs a couple of microseconds
+    per matching row, so a very common term ranks tens of thousands of jobs;
+    `max_candidates` trades exactness for speed by ranking only the newest
+    that many matches (highest jobs.id, i.e. most recently listed), unless
+    the filters leave fewer than `limit` of them. Better-scoring older jobs
+    are then left out.
+
+    :param query: Words that must all appear; with `raw`, an FTS5 query
+        (phrases, OR, NEAR, column filters such as `title: engineer`)
+    :param location: Canonical location, e.g. "Dhaka" or "Chittagong"
+    :param min_salary: Keep jobs whose salary range reaches at least this much
+    :param max_salary: Keep jobs whose salary range starts at or below this
+    :raises InvalidQueryError: `raw` and FTS5 rejects the query
+    """
+    expression = query if raw else match_expression(query)
+    if not expression:
+        return []
+    normalized = 'location_canonical' in _columns(conn, 'jobs')
+    filters, params = ["jobs_fts MATCH :query"], {'query': expression, 'limit': limit}
+    if location:
+        if normalized:
+            filters.append("j.location_canonical = :location")
+            params['location'] = canonical_location(location)
+        else:
+            filters.append("j.location LIKE :location")
+            params['location'] = f"%{location}%"
+    if min_salary is not None and normalized:
+        filters.append("j.salary_max >= :min_salary")
+        params['min_salary'] = min_salary
+    if max_salary is not None and normalized:
+        filters.append("j.salary_min <= :max_salary")
+        params['max_salary'] = max_salary
+    where = " AND ".join(filters)
+
+    try:
+        cutoff = _newest_match(conn, expression, max_candidates) if max_candidates else None
+        if cutoff is not None:
+            rows = _ranked(conn, f"{where} AND jobs_fts.rowid >= :cutoff", {**params, 'cutoff': cutoff}, normalized)
+            if len(rows) == limit:
+                return rows
+        # Few matches, or filters that leave too few of the newest ones: rank them all
+        return _ranked(conn, where, params, normalized)
+    except sqlite3.OperationalError as e:
+        if not raw:  # Plain-text queries are always valid MATCH expressions
+            raise
+        raise InvalidQueryError(f"Invalid search query {query!r}: {e}") from e
@@ -5,6 +5,9 @@ BOT_NAME = "careerjet"
 SPIDER_MODULES = ["careerjet.spiders"]
 NEWSPIDER_MODULE = "careerjet.spiders"
 
+# Site root; point at a local stand-in (benchmarks/fake_careerjet.py) for offline runs
+CAREERJET_BASE_URL = "https://www.careerjet.com.bd"
+
 # Logging settings
 LOG_ENABLED = True
 LOG_ENCODING = 'utf-8'
@@ -15,8 +18,8 @@ LOG_FILE = 'careerjet.log'
 # Politeness and throttling
 ROBOTSTXT_OBEY = True
 DOWNLOAD_DELAY = 1.2
-RANDOMIZE_DOWNLOAD_DELAY = 0.3  # Add randomization to delays
-AUTOTHROTTLE_ENABLED = True
+DOWNLOAD_DELAY_JITTER = 0.5  # Randomize delays by ±50%
+AUTOTHROTTLE_ENABLED = False  # Superseded by AdaptiveConcurrencyMiddleware below
 AUTOTHROTTLE_START_DELAY = 1
 AUTOTHROTTLE_TARGET_CONCURRENCY = 2
 AUTOTHROTTLE_MAX_DELAY = 10
@@ -26,6 +29,17 @@ CONCURRENT_REQUESTS = 32
 CONCURRENT_REQUESTS_PER_DOMAIN = 3
 DOWNLOAD_TIMEOUT = 15
 
+# careerjet_crawler pagination; with -a incremental=1 stop after this many
+# consecutive pages that contain only known job links
+LISTING_MAX_PAGES = 100
+LISTING_INCREMENTAL_STOP_PAGES = 2
+
+# careerjet_description work queue: refill to QUEUE_SIZE when in-flight
+# requests drop below LOW_WATERMARK (0 = derive from CONCURRENT_REQUESTS)
+DESCRIPTION_QUEUE_SIZE = 0
+DESCRIPTION_QUEUE_LOW_WATERMARK = 0
+DESCRIPTION_LEASE_SECONDS = 900  # Claimed links return to the queue after this
+
 # Retry settings
 RETRY_ENABLED = True
 RETRY_TIMES = 3
@@ -35,23 +49,111 @@ RETRY_HTTP_CODES = [500, 502, 503, 504, 408, 429]
 DOWNLOADER_MIDDLEWARES = {
     'careerjet.middlewares.RotateUserAgentMiddleware': 400,
     'scrapy.downloadermiddlewares.useragent.UserAgentMiddleware': None,
-    'scrapy.downloadermiddlewares.httpcache.HttpCacheMiddleware': 900,
+    'scrapy.downloadermiddlewares.httpcache.HttpCacheMiddleware': None,
+    'careerjet.httpcache.CareerjetHttpCacheMiddleware': 900,  # Refreshes a page revalidated by a 304
     'scrapy.downloadermiddlewares.retry.RetryMiddleware': 550,
+    'careerjet.middlewares.AdaptiveConcurrencyMiddleware': 560,  # Sees 429/503 before retry
+}
+
+# Adaptive (AIMD) per-domain concurrency: +1 concurrent request every
+# INCREASE_EVERY healthy responses, halve on 429/503/Retry-After/errors.
+# The learned rate is persisted in ADAPTIVE_STATE_PATH between runs.
+ADAPTIVE_CONCURRENCY_ENABLED = True
+ADAPTIVE_MIN_CONCURRENCY = 1
+ADAPTIVE_MAX_CONCURRENCY = 8
+ADAPTIVE_MIN_DELAY = 0.25
+ADAPTIVE_MAX_DELAY = 60.0
+ADAPTIVE_TARGET_LATENCY = 2.0  # Seconds; slower responses do not earn an increase
+ADAPTIVE_INCREASE_EVERY = 20
+ADAPTIVE_DECREASE_FACTOR = 0.5
+ADAPTIVE_STATE_PATH = 'adaptive_concurrency.json'
+
+# Spider middlewares
+SPIDER_MIDDLEWARES = {
+    'careerjet.middlewares.CheckpointMiddleware': 50,
+    'careerjet.middlewares.CallbackTimingMiddleware': 950,  # Closest to the spider
+}
+
+# Stage latency histograms (download, parse, pipelines, DB commits), exported
+# as <path>.json and <path>.prom; %(name)s is the spider name
+EXTENSIONS = {
+    'careerjet.extensions.StageMetricsExtension': 500,
 }
+STAGE_METRICS_ENABLED = True
+STAGE_METRICS_PATH = 'metrics/%(name)s'
+STAGE_METRICS_INTERVAL = 30.0  # Seconds between exports
 
-# HTTP caching for local development
-# HTTPCACHE_ENABLED = True
-# HTTPCACHE_EXPIRATION_SECS = 3600  # 1 hour
-# HTTPCACHE_DIR = 'httpcache'
-# HTTPCACHE_IGNORE_HTTP_CODES = [404, 403, 500, 503]
+# HTTP caching: pages are served from cache while fresh, then revalidated
+# with If-None-Match / If-Modified-Since so unchanged pages come back as 304
+HTTPCACHE_ENABLED = True
+HTTPCACHE_DIR = 'httpcache'
+HTTPCACHE_POLICY = 'careerjet.httpcache.CareerjetCachePolicy'
+HTTPCACHE_STORAGE = 'careerjet.httpcache.SQLiteCacheStorage'
+HTTPCACHE_IGNORE_HTTP_CODES = [404, 403, 429, 500, 502, 503, 504]
+HTTPCACHE_LISTING_EXPIRATION_SECS = 600  # 10 minutes
+HTTPCACHE_JOBAD_EXPIRATION_SECS = 86400  # 1 day
 
 
+# Currency assumed for salaries without a symbol (careerjet.com.bd lists in taka)
+SALARY_DEFAULT_CURRENCY = 'BDT'
+
 # Item Pipelines
 ITEM_PIPELINES = {
     'careerjet.pipelines.CleaningPipeline': 300,
+    'careerjet.pipelines.DeduplicationPipeline': 350,
     'careerjet.pipelines.SQLitePipeline': 400,
+    'careerjet.pipelines.FeedExportPipeline': 500,
 }
 
+# Near-duplicate detection (careerjet/dedupe.py). Listings and descriptions are
+# MinHashed into an LSH index kept in its own SQLite file across runs.
+DEDUPE_ENABLED = True
+DEDUPE_INDEX_PATH = 'dedupe.db'
+DEDUPE_NUM_PERM = 64  # MinHash signature length; must be a multiple of DEDUPE_BANDS
+DEDUPE_BANDS = 16
+DEDUPE_THRESHOLDS = {}  # Overrides for careerjet.dedupe.DEFAULT_THRESHOLDS, e.g. {'description': 0.85}
+
+# Revisits of already crawled job ads (careerjet/revisit.py). Each ad is due again
+# after its average time between changes, clamped to these bounds.
+REVISIT_ENABLED = True
+REVISIT_MIN_INTERVAL = 86400  # 1 day
+REVISIT_MAX_INTERVAL = 14 * 86400
+REVISIT_MAX_AGE = 60 * 86400  # Ads first seen longer ago are not revisited
+REVISIT_BATCH_SIZE = 1000  # Jobs requeued per careerjet_description run
+
+# Crash-resumable checkpoints (careerjet/checkpoint.py): the listing crawl keeps its
+# request frontier on disk and the description spider its claim owner, so a killed
+# run resumes where it stopped. Deleted when a spider finishes.
+CHECKPOINT_ENABLED = True
+CHECKPOINT_DIR = ''  # Default: checkpoints/ next to SQLITE_DB_PATH
+SCHEDULER = 'careerjet.checkpoint.CheckpointScheduler'
+
+# Storage backend for pipelines and spiders: 'sqlite' or 'postgres' (see careerjet/storage.py)
+STORAGE_BACKEND = 'sqlite'
+
+# PostgreSQL storage (STORAGE_BACKEND = 'postgres'; needs psycopg[pool])
+POSTGRES_DSN = 'postgresql://localhost/careerjet'
+POSTGRES_POOL_SIZE = 4
+POSTGRES_BATCH_SIZE = 1000  # Rows buffered before a COPY/upsert flush
+POSTGRES_FLUSH_INTERVAL = 5.0
+
+# SQLite storage (shared by all pipelines)
+SQLITE_DB_PATH = 'careerjet_jobs.db'
+SQLITE_BATCH_SIZE = 500  # Rows buffered before an executemany flush
+SQLITE_FLUSH_INTERVAL = 5.0  # Seconds between flushes on a slow crawl
+SQLITE_PRAGMAS = {}  # Overrides for careerjet.db.DEFAULT_PRAGMAS
+SQLITE_WRITER_ADDRESS = ''  # host:port of a careerjet.coordinator.WriterServer; set by sharded_crawl.py
+
+# Streaming NDJSON feeds (careerjet/feeds.py): items are appended to rotated,
+# compressed segments under FEED_STREAM_DIR/<stream>/ that consumers can tail
+# through manifest.jsonl while the crawl runs (see tail_feed.py).
+FEED_STREAM_ENABLED = False
+FEED_STREAM_DIR = 'feeds'
+FEED_STREAM_COMPRESSION = 'zstd'  # 'zstd' (zstandard, in requirements.txt), 'gzip' or 'none'
+FEED_STREAM_LEVEL = None  # Compression level; None for the codec default
+FEED_STREAM_MAX_BYTES = 64 * 1024 * 1024  # Uncompressed bytes per segment
+FEED_STREAM_MAX_SECONDS = 60.0  # Seal a segment after this long, even when idle
+
 # Feed export
 # FEEDS = {
 #     'output/jobs.csv': {
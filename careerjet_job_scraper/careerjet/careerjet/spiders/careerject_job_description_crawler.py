@@ -1,67 +1,143 @@
 import scrapy
-import sqlite3
+from urllib.parse import urlparse
+from scrapy import signals
+from scrapy.exceptions import DontCloseSpider
+from careerjet.checkpoint import Checkpoint
+from careerjet.db import new_claim_owner
+from careerjet.extractors import extract_description
 from careerjet.items import JobDescriptionItem
+from careerjet.storage import open_storage
 
 class CareerjetDescriptionSpider(scrapy.Spider):
+    """
+    Crawl job ads for links in the `jobs` table.
+
+    Work is streamed from the database: whenever the number of in-flight
+    requests drops below DESCRIPTION_QUEUE_LOW_WATERMARK, the queue is topped
+    back up to DESCRIPTION_QUEUE_SIZE, so the downloader never drains between
+    batches. Use CLOSESPIDER_ITEMCOUNT to cap a test run.
+
+    Links are claimed under a lease (DESCRIPTION_LEASE_SECONDS), so several
+    spiders can share one database and links held by a crashed run are
+    picked up again once the lease expires. With CHECKPOINT_ENABLED the
+    claim owner is kept in a checkpoint (see careerjet.checkpoint), so a
+    restarted spider releases the links its killed predecessor held at once.
+
+    With `-a shard=I -a shards=N` only links where shard_of(job_link, N) == I
+    are claimed, so N workers started by sharded_crawl.py never compete for
+    the same rows.
+
+    With REVISIT_ENABLED, DONE jobs whose description is due for a revisit
+    (see careerjet.revisit) are requeued before streaming starts. Unchanged
+    descriptions only get new visit times.
+    """
     name = "careerjet_description"
     allowed_domains = ["careerjet.com.bd"]
 
     custom_settings = {
         'LOG_FILE': 'careerjet_description.log',
         'ITEM_PIPELINES': {
+            'careerjet.pipelines.DeduplicationPipeline': 250,
             'careerjet.pipelines.JobDescriptionPipeline': 300,
+            'careerjet.pipelines.FeedExportPipeline': 400,
         }
     }
 
-    def __init__(self, *args, **kwargs):
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        settings = crawler.settings
+        spider.allowed_domains = [
+            urlparse(settings.get('CAREERJET_BASE_URL', 'https://www.careerjet.com.bd')).hostname
+        ]
+        concurrency = settings.getint('CONCURRENT_REQUESTS', 16)
+        spider.queue_size = settings.getint('DESCRIPTION_QUEUE_SIZE') or concurrency * 2
+        spider.low_watermark = settings.getint('DESCRIPTION_QUEUE_LOW_WATERMARK') or concurrency
+        spider.lease_seconds = settings.getint('DESCRIPTION_LEASE_SECONDS', 900)
+        spider.storage = open_storage(settings, name='claims')
+        spider.storage.ensure_jobs_table()
+        spider.checkpoint = Checkpoint.from_settings(settings, spider.checkpoint_name)
+        crawler.signals.connect(spider.spider_idle, signal=signals.spider_idle)
+        return spider
+
+    def __init__(self, shard=0, shards=1, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.conn = sqlite3.connect("careerjet_jobs.db")
-        self.cursor = self.conn.cursor()
-        self.batch_size = 50
-        self.batch_count = 0
-        self.max_batches = 10  # Stop after 2 batches (for testing)
-        self.testing = True
+        self.shard = int(shard)
+        self.shards = int(shards)
         self.in_progress = 0
+        self.claimed = 0
+        self.owner = new_claim_owner()
+
+    @property
+    def checkpoint_name(self):
+        return f"{self.name}-shard{self.shard}" if self.shards > 1 else self.name
+
+    def resume_claims(self):
+        """Release links left IN_PROGRESS by an interrupted run and record our own claim owner."""
+        previous = self.checkpoint.get('claim_owner')
+        if previous:
+            released = self.storage.release_claims(previous)
+            self.logger.info(f"Released {released} job links left in progress by {previous}.")
+            self.crawler.stats.set_value('checkpoint/released_claims', released)
+        self.checkpoint.set('claim_owner', self.owner)
+
+    async def start(self):
+        # Scrapy >= 2.13 entry point; start_requests() keeps older versions working
+        for request in self.start_requests():
+            yield request
 
     def start_requests(self):
-        self.logger.info("Starting with first batch of job links")
-        yield from self.get_next_batch()
+        if self.checkpoint is not None:
+            self.resume_claims()
+        if self.storage.revisit.enabled:
+            requeued = self.storage.schedule_revisits(self.shard, self.shards)
+            self.crawler.stats.set_value('revisit/requeued', requeued)
+            if requeued:
+                self.logger.info(f"Requeued {requeued} job links due for a revisit.")
+        self.logger.info(
+            f"Streaming job links (queue size {self.queue_size}, "
+            f"low watermark {self.low_watermark}, shard {self.shard + 1}/{self.shards})"
+        )
+        yield from self.top_up()
 
-    def get_next_batch(self):
-        if self.testing and self.batch_count >= self.max_batches:
-            self.logger.info(f"Reached max_batches={self.max_batches}. Stopping spider.")
+    def top_up(self):
+        """Claim enough NEW links to refill the queue and yield their requests."""
+        if self.in_progress >= self.low_watermark:
             return
-
-        self.cursor.execute("SELECT job_link FROM jobs WHERE crawl_status = 'NEW' LIMIT ?", (self.batch_size,))
-        rows = self.cursor.fetchall()
-
+        wanted = self.queue_size - self.in_progress
+        rows = self.claim_links(wanted)
         if not rows:
-            self.logger.info("No more job links to process.")
             return
 
-        self.batch_count += 1
-        self.logger.info(f"[Batch {self.batch_count}] Fetched {len(rows)} job links.")
-
-        # Mark them IN_PROGRESS
-        self.cursor.executemany(
-            "UPDATE jobs SET crawl_status = 'IN_PROGRESS' WHERE job_link = ?",
-            [(job_link,) for (job_link,) in rows]
-        )
-        self.conn.commit()
-
-        for (job_link,) in rows:
+        self.claimed += len(rows)
+        self.logger.debug(f"Claimed {len(rows)} job links ({self.claimed} total).")
+        for job_link in rows:
             self.in_progress += 1
             yield scrapy.Request(
                 url=job_link,
                 callback=self.parse_job,
                 errback=self.handle_error,
-                meta={'job_link': job_link}
+                meta={'job_link': job_link},
+                dont_filter=True,  # Links are unique in the DB; keep in_progress exact
             )
 
+    def claim_links(self, limit):
+        return self.storage.claim_jobs(
+            self.owner, limit, self.lease_seconds, self.shard, self.shards
+        )
+
+    def spider_idle(self, spider):
+        scheduled = False
+        for request in self.top_up():
+            self.crawler.engine.crawl(request)
+            scheduled = True
+        if scheduled:
+            raise DontCloseSpider
+        self.logger.info("No more job links to process.")
+
     def parse_job(self, response):
         job_link = response.meta['job_link']
-        description = response.xpath("//section[@class='content']//text()").getall()
-        cleaned_description = " ".join(part.strip() for part in description if part.strip())
+        cleaned_description = extract_description(response.selector.root)
 
         self.in_progress -= 1
 
@@ -74,8 +150,7 @@ class CareerjetDescriptionSpider(scrapy.Spider):
                 job_description=cleaned_description
             )
 
-        if self.in_progress == 0:
-            yield from self.get_next_batch()
+        yield from self.top_up()
 
     def handle_error(self, failure):
         job_link = failure.request.meta.get('job_link')
@@ -83,17 +158,16 @@ class CareerjetDescriptionSpider(scrapy.Spider):
         self.update_job_status(job_link, f"ERROR: {str(failure.value)}")
         self.in_progress -= 1
 
-        if self.in_progress == 0:
-            yield from self.get_next_batch()
+        yield from self.top_up()
 
     def update_job_status(self, job_link, status):
-        self.cursor.execute(
-            "UPDATE jobs SET crawl_status = ? WHERE job_link = ?",
-            (status, job_link)
-        )
-        self.conn.commit()
+        self.storage.set_job_status(job_link, status)
 
     def closed(self, reason):
-        self.conn.commit()
-        self.conn.close()
+        released = self.storage.release_claims(self.owner)
+        if released:
+            self.logger.info(f"Released {released} unfinished job links back to NEW.")
+        if self.checkpoint is not None:
+            self.checkpoint.discard()  # Nothing is held any more
+        self.storage.close()
         self.logger.info(f"Spider closed: {reason}")
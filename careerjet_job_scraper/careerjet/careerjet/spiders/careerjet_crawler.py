@@ -1,60 +1,132 @@
 import scrapy
+from urllib.parse import urlparse
+from careerjet.checkpoint import request_processed
+from careerjet.extractors import extract_listing
 from careerjet.items import CareerjetItem
+from careerjet.storage import open_storage
 from datetime import datetime
 
 class CareerjetCrawlerSpider(scrapy.Spider):
+    """
+    Crawl Careerjet listing pages.
+
+    By default every page up to LISTING_MAX_PAGES is requested at once. With
+    `-a incremental=1` pages are walked in order instead, and pagination stops
+    once LISTING_INCREMENTAL_STOP_PAGES consecutive pages hold only job links
+    already in the `jobs` table.
+
+    `-a start_page=A -a end_page=B` limits the crawl to pages A..B, which is
+    how sharded_crawl.py splits listing pages between worker processes.
+
+    With CHECKPOINT_ENABLED the request frontier is kept on disk (see
+    careerjet.checkpoint), so a killed crawl resumes with the pages it had
+    not finished instead of starting again from page 1.
+    """
     name = "careerjet_crawler"
     allowed_domains = ["careerjet.com.bd"]
+    base_url = "https://www.careerjet.com.bd/jobs?s=&l=Bangladesh"
+    checkpoint_frontier = True
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        site = crawler.settings.get('CAREERJET_BASE_URL', 'https://www.careerjet.com.bd')
+        spider.base_url = f"{site.rstrip('/')}/jobs?s=&l=Bangladesh"
+        spider.allowed_domains = [urlparse(site).hostname]
+        return spider
+
+    def __init__(self, incremental=False, start_page=1, end_page=None, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.incremental = str(incremental).lower() in ('1', 'true', 'yes')
+        self.start_page = int(start_page)
+        self.end_page = int(end_page) if end_page else None
+        self.known_links = set()
+        self.known_streak = 0
+
+    @property
+    def checkpoint_name(self):
+        if self.start_page == 1 and self.end_page is None:
+            return self.name
+        return f"{self.name}-pages{self.start_page}-{self.end_page or 'max'}"
+
+    async def start(self):
+        # Scrapy >= 2.13 entry point; start_requests() keeps older versions working
+        for request in self.start_requests():
+            yield request
 
     def start_requests(self):
-        """Generate requests for all pages"""
-        base_url = "https://www.careerjet.com.bd/jobs?s=&l=Bangladesh"
-        
-        # First page (no page parameter needed)
-        yield scrapy.Request(
-            url=base_url,
+        """Generate requests for all pages, or only the first in incremental mode"""
+        self.max_pages = self.end_page or self.settings.getint('LISTING_MAX_PAGES', 100)
+
+        if self.incremental:
+            self.stop_pages = self.settings.getint('LISTING_INCREMENTAL_STOP_PAGES', 2)
+            self.known_links = self.load_known_links()
+            self.logger.info(
+                f"Incremental crawl: {len(self.known_links)} known links, "
+                f"stopping after {self.stop_pages} known-only pages"
+            )
+            yield self.page_request(self.start_page)
+            return
+
+        for page in range(self.start_page, self.max_pages + 1):
+            yield self.page_request(page)
+
+    def page_request(self, page):
+        # First page has no page parameter
+        url = self.base_url if page == 1 else f"{self.base_url}&p={page}"
+        return scrapy.Request(
+            url=url,
             callback=self.parse,
-            meta={'page': 1}
+            errback=self.page_failed,
+            meta={'page': page}
         )
-        
-        # Pages 2-100
-        for page in range(2, 101):
-            url = f"{base_url}&p={page}"
-            yield scrapy.Request(
-                url=url,
-                callback=self.parse,
-                meta={'page': page}
-            )
+
+    def load_known_links(self):
+        storage = open_storage(self.settings, name='known_links')
+        try:
+            return storage.known_links()
+        except Exception as e:
+            self.logger.info(f"No known links loaded ({e}); crawling as a first run")
+            return set()
+        finally:
+            storage.close()
 
     def parse(self, response):
         """Parse job listings from each page"""
         current_page = response.meta.get('page', 1)
         self.logger.info(f"Parsing page {current_page}: {response.url}")
-        
+
         # Check if page has jobs
-        jobs = response.xpath("//ul[@class='jobs']//li/article")
-        
+        jobs = extract_listing(response.selector.root, response.url)
+
         if not jobs:
             self.logger.warning(f"No jobs found on page {current_page}")
             return
-        
+
+        new_links = 0
         for job in jobs:
-            # Raw extraction only
-            title = job.xpath(".//header/h2/a/text()").get()
-            company = job.xpath(".//p[@class='company']//text()").getall() or None
-            job_link = job.xpath(".//header/h2/a/@href").get()
-            location = job.xpath(".//ul[@class='location']//text()").getall() or None
-            salary = job.xpath(".//ul[@class='salary']//text()").getall() or None
-
-            item = CareerjetItem(
-                title=title,
-                company=company,
-                job_link=job_link,
-                location=location,
-                salary=salary,
-                page=current_page,
-            )
-            yield item
+            if job['job_link'] and job['job_link'] not in self.known_links:
+                new_links += 1
+            yield CareerjetItem(page=current_page, **job)
 
         # Log completion of page
-        self.logger.info(f"Completed parsing page {current_page}")
+        self.logger.info(f"Completed parsing page {current_page} ({new_links} new links)")
+
+        if self.incremental:
+            yield from self.next_page(current_page, new_links)
+
+    def page_failed(self, failure):
+        """Log a page that failed after its retries; its checkpoint row becomes FAILED."""
+        self.logger.error(f"Failed to fetch page {failure.request.meta.get('page')}: {failure.value}")
+        self.crawler.signals.send_catch_log(request_processed, request=failure.request, failed=True)
+
+    def next_page(self, current_page, new_links):
+        self.known_streak = 0 if new_links else self.known_streak + 1
+        if self.known_streak >= self.stop_pages:
+            self.logger.info(
+                f"Stopping at page {current_page}: {self.known_streak} pages with no new links"
+            )
+        elif current_page >= self.max_pages:
+            self.logger.info(f"Reached LISTING_MAX_PAGES={self.max_pages}")
+        else:
+            yield self.page_request(current_page + 1)
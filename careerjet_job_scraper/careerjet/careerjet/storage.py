@@ -0,0 +1,493 @@
+"""
+Storage backends for the `jobs` and `job_description` tables.
+
+Pipelines and spiders talk to a storage object returned by open_storage()
+instead of opening sqlite3 connections themselves. STORAGE_BACKEND selects
+the implementation:
+
+* `sqlite` (default): careerjet_jobs.db through BufferedSQLiteWriter, or the
+  coordinating writer when SQLITE_WRITER_ADDRESS is set.
+* `postgres`: POSTGRES_DSN through a psycopg connection pool. Listing rows
+  are loaded with COPY into a staging table, descriptions with multi-row
+  upserts, and work is claimed with FOR UPDATE SKIP LOCKED, so any number of
+  crawler and extractor processes can write at once.
+"""
+import time
+
+from careerjet.db import (
+    ATTEMPT_COLUMNS, LEASE_COLUMNS, BufferedSQLiteWriter, claim_rows, claimable_clause, ensure_change_tracking,
+    ensure_columns, release_claims,
+)
+from careerjet.normalize import NORMALIZED_COLUMNS
+from careerjet.revisit import REVISIT_COLUMNS, RevisitPolicy, content_fingerprint
+
+JOB_COLUMNS = (
+    'title', 'company', 'job_link', 'location', 'salary', 'page', 'scraped_at',
+    *NORMALIZED_COLUMNS, 'duplicate_of', 'crawl_status',
+)
+# Canonical job_link of a near-duplicate row (see careerjet.dedupe)
+DUPLICATE_COLUMNS = {'duplicate_of': 'TEXT'}
+POSTGRES_TYPES = {'REAL': 'DOUBLE PRECISION', 'TEXT': 'TEXT', 'INTEGER': 'INTEGER'}
+
+
+def postgres_shard_of(column):
+    """
+    PostgreSQL expression for the shard of `column`; the shard count is its
+    %s parameter. hashtext() is a signed int4 and abs() of its minimum
+    overflows, so the sign bit is masked off instead.
+    """
+    return f"(hashtext({column})::bigint & 2147483647) %% %s"
+
+
+class SQLiteStorage:
+    backend = 'sqlite'
+
+    insert_job_sql = f'''
+        INSERT OR IGNORE INTO jobs ({", ".join(JOB_COLUMNS)})
+        VALUES ({", ".join("?" * len(JOB_COLUMNS))})
+    '''
+    # New or changed descriptions only; an unchanged one keeps its row and status
+    upsert_description_sql = '''
+        INSERT OR REPLACE INTO job_description (
+            job_link, job_description, status, duplicate_of, content_hash,
+            first_seen_at, last_seen_at, last_changed_at, change_count
+        )
+        SELECT :job_link, :description, :status, :duplicate_of, :content_hash,
+               COALESCE(old.first_seen_at, :now), :now, :now,
+               CASE WHEN old.id IS NULL THEN 0 ELSE COALESCE(old.change_count, 0) + 1 END
+        FROM (SELECT 1)
+        LEFT JOIN job_description old ON old.job_link = :job_link
+        WHERE old.id IS NULL
+           OR NOT COALESCE(old.content_hash = :content_hash, old.job_description = :description, 0)
+    '''
+    # Every visit: refresh last_seen_at and schedule the next one (see careerjet.revisit)
+    seen_description_sql = '''
+        UPDATE job_description
+        SET content_hash = :content_hash,
+            first_seen_at = COALESCE(first_seen_at, :now),
+            last_seen_at = :now,
+            next_visit_at = :now + MIN(:max_interval, MAX(:min_interval,
+                (:now - COALESCE(first_seen_at, :now) + :min_interval) / (COALESCE(change_count, 0) + 1)))
+        WHERE job_link = :job_link
+    '''
+    mark_done_sql = '''
+        UPDATE jobs
+        SET crawl_status = 'DONE', claim_owner = NULL, lease_expires_at = NULL
+        WHERE job_link = ?
+    '''
+
+    def __init__(self, writer, revisit=None):
+        self.writer = writer
+        self.revisit = revisit or RevisitPolicy()
+
+    @classmethod
+    def from_settings(cls, settings, metrics=None, name='sqlite'):
+        return cls(BufferedSQLiteWriter.from_settings(settings, metrics, name),
+                   RevisitPolicy.from_settings(settings))
+
+    def ensure_jobs_table(self):
+        self.writer.execute('''
+                CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                title TEXT,
+                company TEXT,
+                job_link TEXT UNIQUE,
+                location TEXT,
+                salary TEXT,
+                page INTEGER,
+                scraped_at DATETIME,
+                crawl_status TEXT DEFAULT 'NEW',
+                claim_owner TEXT,
+                lease_expires_at REAL,
+                salary_min REAL,
+                salary_max REAL,
+                salary_period TEXT,
+                salary_currency TEXT,
+                location_canonical TEXT,
+                duplicate_of TEXT
+            )
+        ''')
+        ensure_columns(self.writer.connection, 'jobs',
+                       {**LEASE_COLUMNS, **NORMALIZED_COLUMNS, **DUPLICATE_COLUMNS})
+        ensure_change_tracking(self.writer.connection, 'jobs')
+        self.writer.execute(
+            "CREATE INDEX IF NOT EXISTS idx_jobs_crawl_status ON jobs (crawl_status)"
+        )
+
+    def ensure_description_table(self):
+        self.writer.execute('''
+            CREATE TABLE IF NOT EXISTS job_description (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_link TEXT UNIQUE,
+                job_description TEXT,
+                status TEXT DEFAULT 'NEW',
+                duplicate_of TEXT,
+                content_hash TEXT,
+                first_seen_at REAL,
+                last_seen_at REAL,
+                last_changed_at REAL,
+                change_count INTEGER,
+                next_visit_at REAL
+            )
+        ''')
+        ensure_columns(self.writer.connection, 'job_description',
+                       {**DUPLICATE_COLUMNS, **REVISIT_COLUMNS, **ATTEMPT_COLUMNS})
+        ensure_change_tracking(self.writer.connection, 'job_description')
+        self.writer.execute(
+            "CREATE INDEX IF NOT EXISTS idx_job_description_next_visit ON job_description (next_visit_at)"
+        )
+
+    def add_job(self, row):
+        """Buffer one listing row, a tuple in JOB_COLUMNS order."""
+        self.writer.add(self.insert_job_sql, row)
+
+    def add_description(self, job_link, description, duplicate_of=None):
+        """
+        Buffer a description and mark its job DONE in the same commit. A
+        description that duplicates `duplicate_of` is stored as DUPLICATE.
+        Revisits whose fingerprint is unchanged only update the visit times.
+        """
+        params = self.description_params(job_link, description, duplicate_of)
+        self.writer.add(self.upsert_description_sql, params)
+        self.writer.add(self.seen_description_sql, params)
+        self.writer.add(self.mark_done_sql, (job_link,))
+
+    def description_params(self, job_link, description, duplicate_of):
+        return {
+            'job_link': job_link,
+            'description': description,
+            'status': 'DUPLICATE' if duplicate_of else 'NEW',
+            'duplicate_of': duplicate_of,
+            'content_hash': content_fingerprint(description),
+            'now': time.time(),
+            'min_interval': self.revisit.min_interval,
+            'max_interval': self.revisit.max_interval,
+        }
+
+    def schedule_revisits(self, shard=0, shards=1):
+        """
+        Requeue up to `revisit.batch_size` DONE jobs whose description is due
+        for a revisit, oldest due first; return how many were requeued.
+        """
+        now = time.time()
+        shard_filter, params = "", ()
+        if shards > 1:
+            shard_filter, params = "AND shard_of(d.job_link, ?) = ?", (shards, shard)
+        return self.writer.execute(f'''
+            UPDATE jobs SET crawl_status = 'NEW', claim_owner = NULL, lease_expires_at = NULL
+            WHERE job_link IN (
+                SELECT d.job_link FROM job_description d
+                JOIN jobs j ON j.job_link = d.job_link
+                WHERE j.crawl_status = 'DONE' AND d.next_visit_at <= ? AND d.first_seen_at >= ?
+                  {shard_filter}
+                ORDER BY d.next_visit_at
+                LIMIT ?
+            )
+        ''', (now, now - self.revisit.max_age, *params, self.revisit.batch_size)).rowcount
+
+    def claim_jobs(self, owner, limit, lease_seconds, shard=0, shards=1):
+        shard_filter = {}
+        if shards > 1:
+            shard_filter = {'where': "shard_of(job_link, ?) = ?", 'where_params': (shards, shard)}
+        rows = claim_rows(
+            self.writer.connection, 'jobs', 'crawl_status', owner, limit, lease_seconds,
+            **shard_filter
+        )
+        return [job_link for (job_link,) in rows]
+
+    def set_job_status(self, job_link, status):
+        self.writer.execute(
+            "UPDATE jobs SET crawl_status = ?, claim_owner = NULL, lease_expires_at = NULL "
+            "WHERE job_link = ?",
+            (status, job_link)
+        )
+
+    def release_claims(self, owner):
+        return release_claims(self.writer.connection, 'jobs', 'crawl_status', owner)
+
+    def known_links(self):
+        return {link for (link,) in self.writer.execute("SELECT job_link FROM jobs")}
+
+    @property
+    def flushes(self):
+        return self.writer.flushes
+
+    def flush(self):
+        return self.writer.flush()
+
+    def record_stats(self, stats, prefix):
+        self.writer.record_stats(stats, prefix)
+
+    def close(self):
+        self.writer.close()
+
+
+class PostgresStorage:
+    """
+    Same interface as SQLiteStorage on PostgreSQL. Writes are buffered like
+    BufferedSQLiteWriter does and flushed in one transaction per batch.
+    Requires `psycopg[pool]` (psycopg 3).
+    """
+    backend = 'postgres'
+
+    def __init__(self, dsn, pool_size=4, batch_size=1000, flush_interval=5.0,
+                 metrics=None, name='postgres', revisit=None):
+        try:
+            from psycopg_pool import ConnectionPool
+        except ImportError as e:
+            raise ImportError("STORAGE_BACKEND = 'postgres' requires psycopg[pool]") from e
+        self.pool = ConnectionPool(dsn, min_size=1, max_size=pool_size, open=True)
+        self.revisit = revisit or RevisitPolicy()
+        self.metrics = metrics
+        self.name = name
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.jobs = []
+        self.descriptions = {}
+        self.last_flush = time.monotonic()
+        self.flushes = 0
+        self.rows_written = 0
+        self.flush_seconds = 0.0
+
+    @classmethod
+    def from_settings(cls, settings, metrics=None, name='postgres'):
+        return cls(
+            settings.get('POSTGRES_DSN'),
+            pool_size=settings.getint('POSTGRES_POOL_SIZE', 4),
+            batch_size=settings.getint('POSTGRES_BATCH_SIZE', 1000),
+            flush_interval=settings.getfloat('POSTGRES_FLUSH_INTERVAL', 5.0),
+            metrics=metrics,
+            name=name,
+            revisit=RevisitPolicy.from_settings(settings),
+        )
+
+    def ensure_jobs_table(self):
+        with self.pool.connection() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id BIGSERIAL PRIMARY KEY,
+                    title TEXT,
+                    company TEXT,
+                    job_link TEXT UNIQUE,
+                    location TEXT,
+                    salary TEXT,
+                    page INTEGER,
+                    scraped_at TIMESTAMP,
+                    crawl_status TEXT DEFAULT 'NEW',
+                    claim_owner TEXT,
+                    lease_expires_at DOUBLE PRECISION
+                )
+            ''')
+            conn.execute("ALTER TABLE jobs " + ", ".join(
+                f"ADD COLUMN IF NOT EXISTS {name} {POSTGRES_TYPES[declaration]}"
+                for name, declaration in {**NORMALIZED_COLUMNS, **DUPLICATE_COLUMNS}.items()
+            ))
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_crawl_status ON jobs (crawl_status)")
+
+    def ensure_description_table(self):
+        with self.pool.connection() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS job_description (
+                    id BIGSERIAL PRIMARY KEY,
+                    job_link TEXT UNIQUE,
+                    job_description TEXT,
+                    status TEXT DEFAULT 'NEW',
+                    claim_owner TEXT,
+                    lease_expires_at DOUBLE PRECISION
+                )
+            ''')
+            conn.execute("ALTER TABLE job_description " + ", ".join(
+                f"ADD COLUMN IF NOT EXISTS {name} {POSTGRES_TYPES[declaration]}"
+                for name, declaration in {**DUPLICATE_COLUMNS, **REVISIT_COLUMNS, **ATTEMPT_COLUMNS}.items()
+            ))
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_job_description_next_visit ON job_description (next_visit_at)"
+            )
+
+    def add_job(self, row):
+        self.jobs.append(row)
+        self.maybe_flush()
+
+    def add_description(self, job_link, description, duplicate_of=None):
+        # Keyed by link: an upsert may not touch the same row twice in one statement
+        self.descriptions[job_link] = (description, duplicate_of)
+        self.maybe_flush()
+
+    def maybe_flush(self):
+        if (len(self.jobs) + len(self.descriptions) >= self.batch_size
+                or time.monotonic() - self.last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        written = len(self.jobs) + len(self.descriptions)
+        if not written:
+            self.last_flush = time.monotonic()
+            return 0
+        started = time.perf_counter()
+        with self.pool.connection() as conn, conn.transaction():
+            if self.jobs:
+                self.copy_jobs(conn)
+            if self.descriptions:
+                links = list(self.descriptions)
+                self.upsert_descriptions(conn)
+                conn.execute('''
+                    UPDATE jobs
+                    SET crawl_status = 'DONE', claim_owner = NULL, lease_expires_at = NULL
+                    WHERE job_link = ANY(%s)
+                ''', (links,))
+        elapsed = time.perf_counter() - started
+        self.flush_seconds += elapsed
+        if self.metrics is not None:
+            self.metrics.observe(f'db_commit/{self.name}', elapsed)
+        self.flushes += 1
+        self.rows_written += written
+        self.jobs = []
+        self.descriptions = {}
+        self.last_flush = time.monotonic()
+        return written
+
+    def upsert_descriptions(self, conn):
+        """Same change detection and revisit scheduling as SQLiteStorage, for the whole buffer."""
+        links = list(self.descriptions)
+        descriptions, duplicates = zip(*self.descriptions.values())
+        hashes = [content_fingerprint(description) for description in descriptions]
+        now = time.time()
+        conn.execute('''
+            INSERT INTO job_description AS old (
+                job_link, job_description, status, duplicate_of, content_hash,
+                first_seen_at, last_seen_at, last_changed_at, change_count
+            )
+            SELECT link, description, CASE WHEN duplicate_of IS NULL THEN 'NEW' ELSE 'DUPLICATE' END,
+                   duplicate_of, content_hash, %(now)s, %(now)s, %(now)s, 0
+            FROM unnest(%(links)s::text[], %(descriptions)s::text[], %(duplicates)s::text[], %(hashes)s::text[])
+                AS t(link, description, duplicate_of, content_hash)
+            ON CONFLICT (job_link) DO UPDATE
+            SET job_description = EXCLUDED.job_description, status = EXCLUDED.status,
+                duplicate_of = EXCLUDED.duplicate_of, content_hash = EXCLUDED.content_hash,
+                last_changed_at = EXCLUDED.last_changed_at,
+                change_count = COALESCE(old.change_count, 0) + 1, attempts = NULL
+            WHERE NOT COALESCE(old.content_hash = EXCLUDED.content_hash,
+                               old.job_description = EXCLUDED.job_description, false)
+        ''', {'now': now, 'links': links, 'descriptions': list(descriptions),
+              'duplicates': list(duplicates), 'hashes': hashes})
+        conn.execute('''
+            UPDATE job_description d
+            SET content_hash = t.content_hash,
+                first_seen_at = COALESCE(d.first_seen_at, %(now)s),
+                last_seen_at = %(now)s,
+                next_visit_at = %(now)s + LEAST(%(max_interval)s, GREATEST(%(min_interval)s,
+                    (%(now)s - COALESCE(d.first_seen_at, %(now)s) + %(min_interval)s)
+                    / (COALESCE(d.change_count, 0) + 1)))
+            FROM unnest(%(links)s::text[], %(hashes)s::text[]) AS t(link, content_hash)
+            WHERE d.job_link = t.link
+        ''', {'now': now, 'links': links, 'hashes': hashes,
+              'min_interval': self.revisit.min_interval, 'max_interval': self.revisit.max_interval})
+
+    def schedule_revisits(self, shard=0, shards=1):
+        now = time.time()
+        shard_filter, params = "", ()
+        if shards > 1:
+            shard_filter, params = f"AND {postgres_shard_of('d.job_link')} = %s", (shards, shard)
+        with self.pool.connection() as conn:
+            return conn.execute(f'''
+                UPDATE jobs SET crawl_status = 'NEW', claim_owner = NULL, lease_expires_at = NULL
+                WHERE job_link IN (
+                    SELECT d.job_link FROM job_description d
+                    JOIN jobs j ON j.job_link = d.job_link
+                    WHERE j.crawl_status = 'DONE' AND d.next_visit_at <= %s AND d.first_seen_at >= %s
+                      {shard_filter}
+                    ORDER BY d.next_visit_at
+                    LIMIT %s
+                )
+            ''', (now, now - self.revisit.max_age, *params, self.revisit.batch_size)).rowcount
+
+    def copy_jobs(self, conn):
+        columns = ", ".join(JOB_COLUMNS)
+        conn.execute(f'''
+            CREATE TEMP TABLE IF NOT EXISTS jobs_staging (
+                title TEXT, company TEXT, job_link TEXT, location TEXT,
+                salary TEXT, page INTEGER, scraped_at TIMESTAMP,
+                salary_min DOUBLE PRECISION, salary_max DOUBLE PRECISION,
+                salary_period TEXT, salary_currency TEXT, location_canonical TEXT,
+                duplicate_of TEXT, crawl_status TEXT
+            ) ON COMMIT DELETE ROWS
+        ''')
+        with conn.cursor() as cursor:
+            with cursor.copy(f"COPY jobs_staging ({columns}) FROM STDIN") as copy:
+                for row in self.jobs:
+                    copy.write_row(row)
+        conn.execute(f'''
+            INSERT INTO jobs ({columns})
+            SELECT {columns} FROM jobs_staging
+            ON CONFLICT (job_link) DO NOTHING
+        ''')
+
+    def claim_jobs(self, owner, limit, lease_seconds, shard=0, shards=1):
+        now = time.time()
+        shard_filter, params = "", ()
+        if shards > 1:
+            shard_filter, params = f"AND {postgres_shard_of('job_link')} = %s", (shards, shard)
+        condition, claim_params = claimable_clause('crawl_status', now, placeholder='%s')
+        with self.pool.connection() as conn:
+            rows = conn.execute(f'''
+                UPDATE jobs
+                SET crawl_status = 'IN_PROGRESS', claim_owner = %s, lease_expires_at = %s
+                WHERE id IN (
+                    SELECT id FROM jobs
+                    WHERE {condition}
+                      {shard_filter}
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING job_link
+            ''', (owner, now + lease_seconds, *claim_params, *params, limit)).fetchall()
+        return [job_link for (job_link,) in rows]
+
+    def set_job_status(self, job_link, status):
+        with self.pool.connection() as conn:
+            conn.execute(
+                "UPDATE jobs SET crawl_status = %s, claim_owner = NULL, lease_expires_at = NULL "
+                "WHERE job_link = %s",
+                (status, job_link)
+            )
+
+    def release_claims(self, owner):
+        with self.pool.connection() as conn:
+            return conn.execute('''
+                UPDATE jobs
+                SET crawl_status = 'NEW', claim_owner = NULL, lease_expires_at = NULL
+                WHERE claim_owner = %s AND crawl_status = 'IN_PROGRESS'
+            ''', (owner,)).rowcount
+
+    def known_links(self):
+        with self.pool.connection() as conn:
+            return {link for (link,) in conn.execute("SELECT job_link FROM jobs")}
+
+    def record_stats(self, stats, prefix):
+        if stats is None:
+            return
+        stats.set_value(f'{prefix}/flushes', self.flushes)
+        stats.set_value(f'{prefix}/rows_written', self.rows_written)
+        stats.set_value(f'{prefix}/flush_seconds', round(self.flush_seconds, 4))
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self.pool.close()
+
+
+BACKENDS = {
+    'sqlite': SQLiteStorage,
+    'postgres': PostgresStorage,
+}
+
+
+def open_storage(settings, metrics=None, name='jobs'):
+    """The STORAGE_BACKEND storage; `name` labels its db_commit/<name> metrics."""
+    backend = settings.get('STORAGE_BACKEND', 'sqlite')
+    try:
+        storage_class = BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown STORAGE_BACKEND {backend!r}; choose from {sorted(BACKENDS)}")
+    return storage_class.from_settings(settings, metrics, name)
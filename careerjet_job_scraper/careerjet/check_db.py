@@ -1,9 +1,119 @@
+"""
+Report queue depth for every stage of the pipeline.
+
+    python check_db.py                         # careerjet_jobs.db in this directory
+    python check_db.py --db postgresql://localhost/careerjet --json
+
+Counts `jobs` by crawl_status (the careerjet_description queue),
+`job_description` by status (the extractor queue) and `job_components`,
+and shows how many claims are held under a live or an expired lease.
+Pending rows are counted with the condition the spiders and the extractor
+claim with (careerjet.db.claimable_clause). Only the standard library is
+imported for SQLite (psycopg for a postgresql:// URL), so it is cheap to run
+from cron or a health check.
+"""
+import argparse
+import json
 import sqlite3
+import sys
+import time
+
+from careerjet.db import DESCRIPTION_FINISHED, claimable_clause
+
+POSTGRES_SCHEMES = ('postgresql://', 'postgres://')
+
+# (table, status column, claimable_clause() arguments of the stage that claims from it);
+# job_components has no status and is only counted
+QUEUES = (
+    ('jobs', 'crawl_status', {}),
+    ('job_description', 'status', {'finished': DESCRIPTION_FINISHED}),
+)
+
+
+def open_connection(db):
+    """DB-API connection and its parameter placeholder."""
+    if db.startswith(POSTGRES_SCHEMES):
+        try:
+            import psycopg
+        except ImportError as e:
+            raise ImportError("Reading PostgreSQL requires psycopg") from e
+        return psycopg.connect(db), '%s'
+    return sqlite3.connect(f'file:{db}?mode=ro', uri=True), '?'
+
+
+def table_exists(conn, table):
+    try:
+        conn.execute(f'SELECT 1 FROM {table} LIMIT 1')
+        return True
+    except Exception:
+        if hasattr(conn, 'rollback'):
+            conn.rollback()
+        return False
+
+
+def queue_depth(conn, placeholder):
+    """{table: {'total', 'statuses': {status: count}, 'leased', 'expired', 'pending'}}."""
+    now = time.time()
+    report = {}
+    for table, column, claim in QUEUES:
+        if not table_exists(conn, table):
+            continue
+        # Error statuses carry the message ("ERROR: 404 ..."), so they are grouped
+        statuses = dict(conn.execute(f'''
+            SELECT CASE WHEN {column} LIKE 'ERROR%' THEN 'ERROR' ELSE COALESCE({column}, 'NULL') END, COUNT(*)
+            FROM {table} GROUP BY 1 ORDER BY 2 DESC
+        ''').fetchall())
+        leased, expired = 0, 0
+        if statuses.get('IN_PROGRESS'):
+            leased, expired = conn.execute(f'''
+                SELECT COALESCE(SUM(CASE WHEN lease_expires_at >= {placeholder} THEN 1 ELSE 0 END), 0),
+                       COALESCE(SUM(CASE WHEN COALESCE(lease_expires_at, 0) < {placeholder} THEN 1 ELSE 0 END), 0)
+                FROM {table} WHERE {column} = 'IN_PROGRESS'
+            ''', (now, now)).fetchone()
+        condition, params = claimable_clause(column, now, placeholder=placeholder, **claim)
+        (pending,) = conn.execute(f'SELECT COUNT(*) FROM {table} WHERE {condition}', params).fetchone()
+        report[table] = {
+            'total': sum(statuses.values()),
+            'statuses': statuses,
+            'leased': leased,
+            'expired': expired,
+            'pending': pending,
+        }
+    if table_exists(conn, 'job_components'):
+        (components,) = conn.execute('SELECT COUNT(*) FROM job_components').fetchone()
+        report['job_components'] = {'total': components}
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Queue depth of jobs, job_description and job_components.")
+    parser.add_argument('--db', default='careerjet_jobs.db', help="SQLite path or postgresql:// URL")
+    parser.add_argument('--json', action='store_true', help="Print the report as one JSON object")
+    args = parser.parse_args()
+
+    conn, placeholder = open_connection(args.db)
+    try:
+        report = queue_depth(conn, placeholder)
+    finally:
+        conn.close()
+
+    if args.json:
+        print(json.dumps(report))
+        return
+    if not report:
+        print(f"No pipeline tables in {args.db}", file=sys.stderr)
+        sys.exit(1)
+    for table, counts in report.items():
+        print(f"{table:<18}{counts['total']:>9}")
+        for status, count in counts.get('statuses', {}).items():
+            print(f"  {status:<16}{count:>9}")
+        if counts.get('expired'):
+            print(f"  {'(lease expired)':<16}{counts['expired']:>9}")
+    waiting = [f"{report[table]['pending']} {label}" for table, label in
+               (('jobs', 'job ads to crawl'), ('job_description', 'descriptions to extract')) if table in report]
+    if waiting:
+        print("Pending: " + ", ".join(waiting))
 
-conn = sqlite3.connect("careerjet_jobs.db")
-cursor = conn.cursor()
 
-cursor.execute("SELECT COUNT(job_link) FROM jobs WHERE crawl_status = 'NEW'")
-rows = cursor.fetchall()
-for row in rows:
-    print(row)
\ No newline at end of file
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,222 @@
+"""
+Export jobs, descriptions and extracted components to partitioned Parquet.
+
+    python export_parquet.py                      # rows changed since the last run
+    python export_parquet.py --full --out exports # everything, as a new run
+
+The three tables are joined on job_link and streamed in batches into
+Hive-style partitions by scrape date:
+
+    exports/jobs/scraped_date=2026-10-18/part-<run>.parquet
+
+Each run appends one file per partition it touches. A job that changes after
+it was exported (its description or components arrive, or are re-written)
+is exported again in a later run, so readers should keep the row with the
+highest `export_run` per job_link, e.g. in DuckDB:
+
+    SELECT * FROM read_parquet('exports/jobs/*/*.parquet', hive_partitioning = true)
+    QUALIFY row_number() OVER (PARTITION BY job_link ORDER BY export_run DESC) = 1
+
+Changes are found with the change sequence (careerjet.db.ensure_change_tracking):
+triggers stamp every row of the three tables that is inserted or replaced,
+or whose content is rewritten (a revisit, backfill_normalized.py), with a
+new `change_seq`. Claims, leases and status changes do not, so the exported
+statuses are as of a job's last content change. Each run exports
+the jobs with a row above the sequence value recorded in exports/_state.json.
+A state file from before change tracking (per-table id watermarks) triggers
+one full export. The exporter only reads: tracking is installed by the
+crawler, extractor and backfill that create the tables, and while a table
+still lacks `change_seq` every run is a full export.
+"""
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from careerjet.db import change_sequence, connect, untracked_tables
+
+TABLES = ('jobs', 'job_description', 'job_components')
+
+JOB_FIELDS = (
+    'job_link', 'title', 'company', 'location', 'salary', 'page', 'scraped_at', 'crawl_status',
+    'salary_min', 'salary_max', 'salary_period', 'salary_currency', 'location_canonical',
+    'duplicate_of',
+)
+DESCRIPTION_FIELDS = ('job_description', 'description_status')
+COMPONENT_FIELDS = (
+    'job_responsibilities', 'job_requirements', 'company_name', 'company_address',
+    'application_email', 'benefits', 'compensation', 'extracted_at',
+)
+
+SCHEMA = pa.schema(
+    [(name, pa.int32() if name == 'page' else pa.string()) for name in JOB_FIELDS[:6]]
+    + [('scraped_at', pa.timestamp('s')), ('crawl_status', pa.string())]
+    + [('salary_min', pa.float64()), ('salary_max', pa.float64())]
+    + [(name, pa.string()) for name in ('salary_period', 'salary_currency', 'location_canonical', 'duplicate_of')]
+    + [(name, pa.string()) for name in DESCRIPTION_FIELDS]
+    + [(name, pa.string()) for name in COMPONENT_FIELDS[:-1]]
+    + [('extracted_at', pa.timestamp('s')), ('export_run', pa.string())]
+)
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def load_state(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {'runs': []}
+
+
+def save_state(path, state):
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, path)
+
+
+def changed_rows_query(present, job_columns, tracked=True):
+    """
+    SELECT for every job whose jobs, job_description or job_components row
+    changed after sequence value :since (every job, without `tracked`). Each
+    check is a range scan of the change_seq index; missing tables (e.g.
+    before the extractor has run) and jobs columns (e.g. before
+    backfill_normalized.py) contribute NULLs.
+    """
+    changed = ["SELECT job_link FROM jobs WHERE change_seq > :since"]
+    columns = [f"j.{name}" if name in job_columns else f"NULL AS {name}" for name in JOB_FIELDS]
+    joins = []
+    if 'job_description' in present:
+        changed.append("SELECT job_link FROM job_description WHERE change_seq > :since")
+        columns += ["d.job_description", "d.status AS description_status"]
+        joins.append("LEFT JOIN job_description d ON d.job_link = j.job_link")
+    else:
+        columns += [f"NULL AS {name}" for name in DESCRIPTION_FIELDS]
+    if 'job_components' in present:
+        changed.append("SELECT job_link FROM job_components WHERE change_seq > :since")
+        columns += [f"c.{name}" for name in COMPONENT_FIELDS]
+        joins.append("LEFT JOIN job_components c ON c.job_link = j.job_link")
+    else:
+        columns += [f"NULL AS {name}" for name in COMPONENT_FIELDS]
+    if not tracked:
+        changed = ["SELECT job_link FROM jobs"]
+    return f"""
+        WITH changed(job_link) AS ({" UNION ".join(changed)})
+        SELECT {", ".join(columns)}
+        FROM changed
+        JOIN jobs j ON j.job_link = changed.job_link
+        {" ".join(joins)}
+    """
+
+
+def to_record_batch(rows, run_id):
+    """Column-wise conversion of fetched rows; timestamps are parsed by Arrow."""
+    columns = list(zip(*rows))
+    names = JOB_FIELDS + DESCRIPTION_FIELDS + COMPONENT_FIELDS
+    arrays = []
+    for name, values in zip(names, columns):
+        field = SCHEMA.field(name)
+        if pa.types.is_timestamp(field.type):
+            arrays.append(pc.strptime(pa.array(values, pa.string()), format=TIMESTAMP_FORMAT,
+                                      unit='s', error_is_null=True))
+        else:
+            arrays.append(pa.array(values, field.type))
+    arrays.append(pa.array([run_id] * len(rows), pa.string()))
+    return pa.RecordBatch.from_arrays(arrays, schema=SCHEMA)
+
+
+def export(db_path, out_dir, full=False, batch_size=50000, compression='zstd'):
+    """Write one export run and return its summary (rows and files per partition)."""
+    state_path = os.path.join(out_dir, '_state.json')
+    os.makedirs(out_dir, exist_ok=True)
+    state = load_state(state_path)
+    # -1: rows that predate change tracking have change_seq 0
+    since = -1 if full or 'sequence' not in state else state['sequence']
+    run_id = datetime.now().strftime('%Y%m%dT%H%M%S%f')[:-3]
+    started = time.perf_counter()
+
+    conn = connect(db_path)
+    writers = {}
+    rows_written = 0
+    try:
+        present = {name for (name,) in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'"
+        ) if name in TABLES}
+        if 'jobs' not in present:
+            raise SystemExit(f"No jobs table in {db_path}")
+        conn.execute('BEGIN')  # One WAL snapshot for the sequence value and the rows
+        # A database last written before change tracking: export everything, remember nothing
+        untracked = untracked_tables(conn, sorted(present))
+        if untracked:
+            full, since = True, -1
+        sequence = change_sequence(conn)
+        job_columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+        cursor = conn.execute(changed_rows_query(present, job_columns, tracked=not untracked), {'since': since})
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            batch = to_record_batch(rows, run_id)
+            dates = pc.fill_null(pc.utf8_slice_codeunits(pc.cast(batch['scraped_at'], pa.string()), 0, 10),
+                                 'unknown')
+            table = pa.Table.from_batches([batch])
+            for date in pc.unique(dates).to_pylist():
+                part = table.filter(pc.equal(dates, date))
+                writer = writers.get(date)
+                if writer is None:
+                    directory = os.path.join(out_dir, 'jobs', f'scraped_date={date}')
+                    os.makedirs(directory, exist_ok=True)
+                    writer = writers[date] = pq.ParquetWriter(
+                        os.path.join(directory, f'part-{run_id}.parquet'), SCHEMA,
+                        compression=compression,
+                    )
+                writer.write_table(part)
+            rows_written += len(rows)
+        conn.execute('COMMIT')
+    finally:
+        for writer in writers.values():
+            writer.close()
+        conn.close()
+
+    summary = {
+        'run': run_id,
+        'rows': rows_written,
+        'partitions': sorted(writers),
+        'seconds': round(time.perf_counter() - started, 3),
+        'full': full,
+        'untracked': untracked,
+    }
+    state.pop('watermarks', None)
+    if untracked:
+        state.pop('sequence', None)
+    else:
+        state['sequence'] = sequence
+    state['runs'] = (state['runs'] + [summary])[-100:]
+    save_state(state_path, state)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the job tables to partitioned Parquet.")
+    parser.add_argument('--db', default='careerjet_jobs.db', help="SQLite database to export")
+    parser.add_argument('--out', default='exports', help="Output directory")
+    parser.add_argument('--full', action='store_true', help="Ignore the last run's sequence value and export every row")
+    parser.add_argument('--batch-size', type=int, default=50000, help="Rows fetched per Arrow batch")
+    parser.add_argument('--compression', default='zstd', choices=('zstd', 'snappy', 'gzip', 'none'))
+    args = parser.parse_args()
+
+    summary = export(args.db, args.out, args.full, args.batch_size, args.compression)
+    print(f"Exported {summary['rows']} rows into {len(summary['partitions'])} partitions "
+          f"in {summary['seconds']}s (run {summary['run']})")
+    if summary['untracked']:
+        print(f"Full export: {', '.join(summary['untracked'])} not change-tracked yet; "
+              f"run the crawler or extractor once to enable incremental exports")
+
+
+if __name__ == '__main__':
+    main()
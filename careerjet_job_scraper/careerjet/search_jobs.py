@@ -0,0 +1,71 @@
+"""
+Search stored jobs by keyword.
+
+    python search_jobs.py "python developer" --location dhaka --min-salary 50000
+    python search_jobs.py 'title: "data analyst" OR title: "data scientist"' --raw
+
+The full-text index (careerjet.search) is brought up to date before every
+search, which only re-indexes jobs changed since the last one; pass
+--no-sync to search the index as it is, or --rebuild to re-index everything.
+"""
+import argparse
+import json
+import time
+
+from careerjet.db import connect
+from careerjet.search import DEFAULT_MAX_CANDIDATES, InvalidQueryError, search, sync_index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Full-text search over jobs, descriptions and components.")
+    parser.add_argument('query', nargs='?', default='', help="Words that must all appear")
+    parser.add_argument('--db', default='careerjet_jobs.db')
+    parser.add_argument('--location', help="Canonical location, e.g. Dhaka")
+    parser.add_argument('--min-salary', type=float, help="Salary range reaches at least this much")
+    parser.add_argument('--max-salary', type=float, help="Salary range starts at or below this")
+    parser.add_argument('--limit', type=int, default=20)
+    parser.add_argument('--raw', action='store_true', help="Pass the query to FTS5 as-is (OR, NEAR, phrases)")
+    parser.add_argument('--max-candidates', type=int, default=DEFAULT_MAX_CANDIDATES, metavar='N',
+                        help="Approximate: rank only the N newest matches (faster for very common terms; "
+                             "better-scoring older jobs can be missed). Default: rank every match")
+    parser.add_argument('--rebuild', action='store_true', help="Re-index every job before searching")
+    parser.add_argument('--no-sync', action='store_true', help="Do not update the index first")
+    parser.add_argument('--json', action='store_true', help="Print results as JSON lines")
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+    try:
+        if args.rebuild or not args.no_sync:
+            started = time.perf_counter()
+            indexed = sync_index(conn, full=args.rebuild)
+            if indexed:
+                print(f"Indexed {indexed} jobs in {time.perf_counter() - started:.2f}s")
+        if not args.query:
+            return
+        started = time.perf_counter()
+        try:
+            results = search(conn, args.query, args.location, args.min_salary, args.max_salary,
+                             args.limit, args.raw, args.max_candidates)
+        except InvalidQueryError as e:
+            parser.error(str(e))
+        elapsed = (time.perf_counter() - started) * 1000
+    finally:
+        conn.close()
+
+    for result in results:
+        if args.json:
+            print(json.dumps(result, ensure_ascii=False))
+            continue
+        salary = ''
+        if result['salary_min'] is not None:
+            high = result['salary_max'] if result['salary_max'] is not None else result['salary_min']
+            salary = f" | {result['salary_min']:,.0f}-{high:,.0f} {result['salary_currency'] or ''}"
+        print(f"{result['title']} — {result['company']} ({result['location']}){salary}")
+        print(f"    {result['snippet']}")
+        print(f"    {result['job_link']}")
+    if not args.json:
+        print(f"{len(results)} results in {elapsed:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
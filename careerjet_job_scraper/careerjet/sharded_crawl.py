@@ -0,0 +1,164 @@
+"""
+Run a spider as N worker processes that share one job store.
+
+    python sharded_crawl.py careerjet_crawler --workers 4
+    python sharded_crawl.py careerjet_description --workers 4 -s CONCURRENT_REQUESTS=32
+
+careerjet_crawler workers get disjoint listing-page ranges (start_page/end_page);
+careerjet_description workers each claim only their shard of `jobs`
+(shard_of(job_link, N) == i). All database writes go through one
+careerjet.coordinator.WriterServer run by this launcher, so workers never
+contend for the SQLite lock. With STORAGE_BACKEND = 'postgres' no writer is
+started and workers write to the server directly. When every worker has
+exited, the per-worker stage metrics and crawl stats are merged into
+STAGE_METRICS_PATH for the spider.
+"""
+import argparse
+import json
+import os
+import secrets
+import subprocess
+import sys
+
+from scrapy.utils.project import get_project_settings
+
+from careerjet.coordinator import AUTHKEY_ENV, WriterServer
+from careerjet.instrumentation import StageMetrics
+
+SHARDED_SPIDERS = ('careerjet_crawler', 'careerjet_description')
+
+
+def page_ranges(max_pages, workers):
+    """Split pages 1..max_pages into at most `workers` contiguous (start, end) ranges."""
+    workers = max(1, min(workers, max_pages))
+    size, extra = divmod(max_pages, workers)
+    ranges, start = [], 1
+    for index in range(workers):
+        end = start + size - 1 + (1 if index < extra else 0)
+        ranges.append((start, end))
+        start = end + 1
+    return ranges
+
+
+def worker_arguments(spider, workers, max_pages):
+    if spider == 'careerjet_crawler':
+        return [['-a', f'start_page={start}', '-a', f'end_page={end}']
+                for start, end in page_ranges(max_pages, workers)]
+    return [['-a', f'shard={index}', '-a', f'shards={workers}'] for index in range(workers)]
+
+
+def merge_stage(stages):
+    """Combine one stage's exported histograms; quantiles become the worst shard's."""
+    count = sum(stage['count'] for stage in stages)
+    total = sum(stage['sum'] for stage in stages)
+    merged = {'count': count, 'sum': round(total, 6), 'mean': round(total / count, 6) if count else None}
+    for key in ('p50', 'p90', 'p99', 'max'):
+        values = [stage[key] for stage in stages if stage.get(key) is not None]
+        merged[key] = max(values) if values else None
+    return merged
+
+
+def merge_exports(exports):
+    """Merge worker metric exports: numeric stats are summed, stage histograms combined."""
+    stats, stages = {}, {}
+    for export in exports:
+        for key, value in export.get('stats', {}).items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                stats[key] = stats.get(key, 0) + value
+            else:
+                stats.setdefault(key, value)
+        for name, stage in export.get('stages', {}).items():
+            stages.setdefault(name, []).append(stage)
+    return stats, {name: merge_stage(parts) for name, parts in sorted(stages.items())}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a spider as sharded worker processes.")
+    parser.add_argument('spider', choices=SHARDED_SPIDERS)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+    parser.add_argument('-s', '--set', action='append', default=[], metavar='NAME=VALUE',
+                        help="Scrapy setting passed to every worker")
+    args = parser.parse_args()
+
+    settings = get_project_settings()
+    for option in args.set:
+        name, _, value = option.partition('=')
+        settings.set(name, value, priority='cmdline')
+
+    metrics_path = settings.get('STAGE_METRICS_PATH', 'metrics/%(name)s')
+    feed_dir = settings.get('FEED_STREAM_DIR', 'feeds')
+    coordinator_metrics = StageMetrics()
+    server = None
+    env = dict(os.environ)
+    writer_settings = []
+    if settings.get('STORAGE_BACKEND', 'sqlite') == 'sqlite':
+        authkey = secrets.token_bytes(16)
+        server = WriterServer(
+            settings.get('SQLITE_DB_PATH', 'careerjet_jobs.db'),
+            authkey,
+            pragmas=settings.getdict('SQLITE_PRAGMAS'),
+            metrics=coordinator_metrics,
+        ).serve_in_background()
+        env[AUTHKEY_ENV] = authkey.hex()
+        writer_settings = ['-s', f'SQLITE_WRITER_ADDRESS={server.address}']
+
+    workers = []
+    shard_arguments = worker_arguments(
+        args.spider, args.workers, settings.getint('LISTING_MAX_PAGES', 100)
+    )
+    for index, spider_arguments in enumerate(shard_arguments):
+        shard_name = f'{args.spider}-shard{index}'
+        command = [sys.executable, '-m', 'scrapy', 'crawl', args.spider, *spider_arguments]
+        for option in args.set:
+            command += ['-s', option]
+        command += [  # Last, so they win over --set
+            *writer_settings,
+            '-s', f"STAGE_METRICS_PATH={metrics_path % {'name': shard_name}}",
+            '-s', f'LOG_FILE={shard_name}.log',
+            '-s', f'FEED_STREAM_DIR={os.path.join(feed_dir, shard_name)}',  # One writer per feed
+        ]
+        workers.append(subprocess.Popen(command, env=env))
+    writer = f"writer at {server.address}" if server else "writing to PostgreSQL"
+    print(f"Started {len(workers)} {args.spider} workers; {writer}")
+
+    failed = 0
+    try:
+        for worker in workers:
+            failed += worker.wait() != 0
+    except KeyboardInterrupt:
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.wait()
+        raise
+    finally:
+        if server:
+            server.close()
+
+    exports = []
+    for index in range(len(workers)):
+        path = metrics_path % {'name': f'{args.spider}-shard{index}'} + '.json'
+        try:
+            with open(path, encoding='utf-8') as f:
+                exports.append(json.load(f))
+        except FileNotFoundError:
+            print(f"No metrics exported by shard {index} ({path})")
+    stats, stages = merge_exports(exports)
+    if server:
+        stats.update(server.stats())
+        stages.update(coordinator_metrics.to_dict()['stages'])
+
+    merged_path = metrics_path % {'name': args.spider} + '.json'
+    os.makedirs(os.path.dirname(merged_path) or '.', exist_ok=True)
+    with open(merged_path, 'w', encoding='utf-8') as f:
+        json.dump({'workers': len(workers), 'stats': stats, 'stages': stages}, f, indent=2, default=str)
+
+    print(f"items scraped: {stats.get('item_scraped_count', 0)}, "
+          f"rows committed by the writer: {stats.get('coordinator/rows_written', 0)}, "
+          f"failed workers: {failed}")
+    print(f"Merged stats written to {merged_path}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
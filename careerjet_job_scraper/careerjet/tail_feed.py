@@ -0,0 +1,70 @@
+"""
+Print the records of a streaming NDJSON feed (careerjet.feeds) as they are sealed.
+
+    python tail_feed.py jobs --checkpoint consumer.json            # what is new since the last run
+    python tail_feed.py job_descriptions --follow --from-offset 0  # everything, then keep tailing
+
+Only segments listed in the stream's manifest.jsonl are read, so this is safe
+to run while a crawl is writing the feed. With --checkpoint the next offset to
+read is loaded from and saved to that file (atomically, after every poll and
+on exit), so a restarted consumer picks up exactly where it stopped.
+Crawls started with sharded_crawl.py write one feed per worker, under
+FEED_STREAM_DIR/<spider>-shard<i>.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from careerjet.feeds import read_feed
+
+
+def load_checkpoint(path):
+    if not path or not os.path.exists(path):
+        return 0
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)['next_offset']
+
+
+def save_checkpoint(path, next_offset):
+    if not path:
+        return
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({'next_offset': next_offset, 'saved_at': time.time()}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tail a streaming NDJSON feed.")
+    parser.add_argument('stream', help="Stream name, e.g. jobs or job_descriptions")
+    parser.add_argument('--dir', default='feeds', help="FEED_STREAM_DIR of the crawl")
+    parser.add_argument('--checkpoint', help="JSON file holding this consumer's next offset")
+    parser.add_argument('--from-offset', type=int, help="Start here instead of at the checkpoint")
+    parser.add_argument('--follow', action='store_true', help="Keep polling for new segments")
+    parser.add_argument('--interval', type=float, default=5.0, help="Seconds between polls with --follow")
+    args = parser.parse_args()
+
+    next_offset = args.from_offset if args.from_offset is not None else load_checkpoint(args.checkpoint)
+    try:
+        while True:
+            for offset, record in read_feed(args.dir, args.stream, next_offset):
+                sys.stdout.write(json.dumps(record, ensure_ascii=False) + '\n')
+                next_offset = offset + 1
+            sys.stdout.flush()
+            save_checkpoint(args.checkpoint, next_offset)
+            if not args.follow:
+                break
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        save_checkpoint(args.checkpoint, next_offset)
+        print(f"Next offset {next_offset}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
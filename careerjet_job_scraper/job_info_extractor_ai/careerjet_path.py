@@ -0,0 +1,13 @@
+"""
+Put the crawler's `careerjet` package on sys.path, so the extractor scripts
+share careerjet.db (connections, claims, leases) and careerjet.instrumentation
+with the spiders instead of keeping their own copies. Import it before any
+`careerjet.*` import.
+"""
+import os
+import sys
+
+PROJECT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "careerjet"))
+
+if PROJECT_DIR not in sys.path:
+    sys.path.append(PROJECT_DIR)
@@ -0,0 +1,356 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Optional
+
+from llm_job_description_parser_v2 import (
+    JobDescriptionSchema, aextract_job_batch, aextract_job_info, aextract_job_sections, prompt, sections_prompt,
+    token_usage,
+)
+from job_store import DEFAULT_DB_PATH, new_claim_owner, open_store
+import careerjet_path  # noqa: F401
+from careerjet.instrumentation import EXTRACTOR_PREFIX, StageMetrics
+from prompt_compaction import DEFAULT_BOILERPLATE_PATH, DEFAULT_TOKEN_BUDGET, estimate_tokens, load_compactor
+from rule_extractor import DEFAULT_RULES_THRESHOLD, pre_extract
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncTokenBucket:
+    """
+    Token bucket that paces callers to `rate` acquisitions per `per` seconds,
+    allowing bursts of up to `capacity`. Waiters sleep exactly until the next
+    token is due instead of backing off for a fixed minute.
+    """
+
+    def __init__(self, rate: int, per: float = 60.0, capacity: Optional[int] = None):
+        self.fill_rate = rate / per
+        self.capacity = capacity or rate
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.fill_rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.fill_rate)
+
+
+def backoff_delay(attempt: int, base: float = 2.0, cap: float = 60.0) -> float:
+    """Exponential backoff with full jitter for the given retry attempt (1-based)."""
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+async def process_and_save_jobs_async(
+    db_path: str = DEFAULT_DB_PATH,
+    max_jobs: Optional[int] = None,
+    concurrency: int = 4,
+    rate: int = 10,
+    per: float = 60.0,
+    write_batch_size: int = 10,
+    max_retries: int = 3,
+    lease_seconds: int = 900,
+    llm=None,
+    cache=None,
+    metrics: Optional[StageMetrics] = None,
+    metrics_path: Optional[str] = None,
+    metrics_interval: float = 30.0,
+    boilerplate_path: str = DEFAULT_BOILERPLATE_PATH,
+    token_budget: Optional[int] = DEFAULT_TOKEN_BUDGET,
+    batch_llm=None,
+    batch_tokens: Optional[int] = None,
+    batch_max_jobs: int = 8,
+    sections_llm=None,
+    rules_threshold: Optional[float] = DEFAULT_RULES_THRESHOLD,
+    checkpoint=None,
+) -> dict:
+    """
+    Extract job components with up to `concurrency` LLM calls in flight,
+    paced by a token bucket of `rate` calls per `per` seconds.
+
+    Descriptions are claimed from the database as workers need them, failed
+    calls are retried with jittered exponential backoff, and results are
+    written back in transactions of `write_batch_size`.
+
+    With `batch_tokens`, each worker packs consecutive descriptions into one
+    structured-output call of up to `batch_tokens` estimated tokens and
+    `batch_max_jobs` jobs. Each call still takes a single rate-limit token, so
+    more jobs fit within the same calls per minute.
+
+    Unless `rules_threshold` is None, every description first goes through
+    rule_extractor.pre_extract. Jobs the rules cover completely are saved
+    without an LLM call; jobs missing only the free-text sections get a
+    sections-only call (batched mode still uses the full batch schema).
+
+    With a `checkpoint` (extraction_checkpoint.py), LLM results are journaled
+    until they are committed, so a killed run is resumed without calling the
+    LLM again for jobs it had already extracted.
+
+    :param db_path: Path to the SQLite database file, or a postgresql:// URL.
+    :param max_jobs: Stop after claiming this many descriptions (None = drain the queue).
+    :param concurrency: Number of concurrent LLM calls.
+    :param rate: Allowed LLM calls per `per` seconds.
+    :param per: Rate-limit window in seconds.
+    :param write_batch_size: Results buffered before each database write.
+    :param max_retries: Retries per claim before the job is counted as failed (job_store.fail_job).
+    :param lease_seconds: How long a claimed description stays reserved.
+    :param llm: Structured-output runnable to use instead of the Cohere client.
+    :param cache: ExtractionCache consulted before calling the LLM.
+    :param metrics: StageMetrics that records LLM, cache and DB timings.
+    :param metrics_path: Export metrics here every `metrics_interval` seconds.
+    :param metrics_interval: Seconds between metric exports.
+    :param boilerplate_path: Learned boilerplate segments (see prompt_compaction.py).
+    :param token_budget: Maximum estimated description tokens sent per job (0 = no limit).
+    :param batch_llm: JobDescriptionBatch runnable to use instead of the Cohere client.
+    :param batch_tokens: Pack descriptions into multi-job calls of up to this many
+        estimated tokens (None = one job per call).
+    :param batch_max_jobs: Maximum jobs per multi-job call.
+    :param sections_llm: JobSectionsSchema runnable to use instead of the Cohere client.
+    :param rules_threshold: Minimum rule confidence for a field to skip the LLM (None = no rules).
+    :param checkpoint: ExtractionCheckpoint to resume from and journal results to.
+    :return: Run statistics, including jobs per minute and tokens in/out.
+    """
+    metrics = metrics or StageMetrics(EXTRACTOR_PREFIX)
+    store = open_store(db_path)
+    store.ensure_schema()
+    owner = new_claim_owner()
+    compactor = load_compactor(store, boilerplate_path, token_budget)
+    bucket = AsyncTokenBucket(rate, per)
+    queue: asyncio.Queue = asyncio.Queue()
+    pending = []
+    companies = {}
+    stats = {"claimed": 0, "processed": 0, "cached": 0, "rules": 0, "sections": 0, "failed": 0, "retries": 0,
+             "batch_calls": 0, "batch_splits": 0, "tokens_in": 0, "tokens_out": 0,
+             "db_write_seconds": 0.0}
+    if checkpoint:
+        stats["resumed"] = checkpoint.resume(store, owner)
+    claim_lock = asyncio.Lock()
+    started = time.monotonic()
+
+    def flush() -> None:
+        if pending:
+            write_started = time.perf_counter()
+            store.save_components_many(pending)
+            elapsed = time.perf_counter() - write_started
+            stats["db_write_seconds"] += elapsed
+            metrics.observe("db_commit", elapsed)
+            logger.info(f"Saved {len(pending)} job components.")
+            pending.clear()
+            if checkpoint:
+                checkpoint.committed()
+
+    async def refill() -> bool:
+        async with claim_lock:
+            if not queue.empty():
+                return True
+            limit = concurrency * 2 * (batch_max_jobs if batch_tokens else 1)
+            if max_jobs is not None:
+                limit = min(limit, max_jobs - stats["claimed"])
+            if limit <= 0:
+                return False
+            rows = store.claim_jobs(owner, limit, lease_seconds)
+            stats["claimed"] += len(rows)
+            if rules_threshold is not None:
+                companies.update(store.listing_companies(row[1] for row in rows))
+            for row in rows:
+                queue.put_nowait(row)
+            return bool(rows)
+
+    async def next_job():
+        """
+        The next claimed job not answered from the cache or the rules, as
+        (job_id, job_link, description, compacted description, RuleExtraction
+        or None), or None once the queue is drained.
+        """
+        while True:
+            if queue.empty() and not await refill():
+                return None
+            try:
+                job_id, job_link, description = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                continue
+            company = companies.pop(job_link, None)
+
+            cached = None
+            if cache:
+                with metrics.time("cache_lookup"):
+                    cached = cache.get(description)
+            if cached is not None:
+                pending.append((job_id, job_link, cached.model_dump()))
+                stats["cached"] += 1
+                if len(pending) >= write_batch_size:
+                    flush()
+                continue
+
+            extraction = None
+            if rules_threshold is not None:
+                with metrics.time("rule_extraction"):
+                    extraction = pre_extract(description, company)
+                if extraction.plan(rules_threshold) == "rules":
+                    pending.append((job_id, job_link, {**extraction.fields, "tokens_in": 0, "tokens_out": 0}))
+                    stats["rules"] += 1
+                    if len(pending) >= write_batch_size:
+                        flush()
+                    continue
+            return job_id, job_link, description, compactor.compact(description), extraction
+
+    def save_result(job, result, template=prompt) -> None:
+        job_id, job_link, description, compacted, extraction = job
+        usage = token_usage(compacted, result, template)
+        if extraction is not None:
+            result = JobDescriptionSchema(**extraction.merge(result.model_dump(), rules_threshold))
+        if cache:
+            cache.put(description, result)
+        stats["tokens_in"] += usage["tokens_in"]
+        stats["tokens_out"] += usage["tokens_out"]
+        row = (job_id, job_link, {**result.model_dump(), **usage})
+        if checkpoint:
+            checkpoint.record(*row)
+        pending.append(row)
+        stats["processed"] += 1
+        if len(pending) >= write_batch_size:
+            flush()
+
+    async def extract_one(job) -> None:
+        job_id, compacted, extraction = job[0], job[3], job[4]
+        sections = extraction is not None and extraction.plan(rules_threshold) == "sections"
+        for attempt in range(max_retries + 1):
+            with metrics.time("rate_limit_wait"):
+                await bucket.acquire()
+            with metrics.time("llm_call"):
+                if sections:
+                    result = await aextract_job_sections(compacted, sections_llm)
+                else:
+                    result = await aextract_job_info(compacted, llm)
+            if not (isinstance(result, dict) and "error" in result):
+                break
+            if attempt < max_retries:
+                delay = backoff_delay(attempt + 1)
+                stats["retries"] += 1
+                logger.warning(f"[Job {job_id}] Extraction error: {result['error']}. Retrying in {delay:.1f}s.")
+                await asyncio.sleep(delay)
+        else:
+            logger.error(f"[Job {job_id}] Giving up after {max_retries} retries.")
+            stats["failed"] += 1
+            store.fail_job(job_id)
+            return
+        if sections:
+            stats["sections"] += 1
+        save_result(job, result, sections_prompt if sections else prompt)
+
+    async def extract_batch(batch) -> None:
+        """
+        Extract `batch` in one call. Transient errors are retried with backoff;
+        jobs missing from an invalid or incomplete response are split into two
+        halves and retried, down to single-job calls.
+        """
+        if len(batch) == 1:
+            return await extract_one(batch[0])
+        for attempt in range(max_retries + 1):
+            with metrics.time("rate_limit_wait"):
+                await bucket.acquire()
+            with metrics.time("llm_batch_call"):
+                response = await aextract_job_batch({job[0]: job[3] for job in batch}, batch_llm)
+            stats["batch_calls"] += 1
+            if "results" in response or response["invalid"]:
+                break
+            if attempt < max_retries:
+                delay = backoff_delay(attempt + 1)
+                stats["retries"] += 1
+                logger.warning(f"Batch of {len(batch)} jobs failed: {response['error']}. Retrying in {delay:.1f}s.")
+                await asyncio.sleep(delay)
+        else:
+            logger.error(f"Giving up on a batch of {len(batch)} jobs after {max_retries} retries.")
+            stats["failed"] += len(batch)
+            for job in batch:
+                store.fail_job(job[0])
+            return
+
+        results = response.get("results", {})
+        for job in batch:
+            if job[0] in results:
+                save_result(job, results[job[0]])
+        missing = [job for job in batch if job[0] not in results]
+        if missing:
+            stats["batch_splits"] += 1
+            reason = response.get("error") or f"{len(missing)} jobs missing from the response"
+            logger.warning(f"Batch of {len(batch)} jobs did not validate ({reason}); retrying in halves.")
+            half = (len(missing) + 1) // 2
+            await extract_batch(missing[:half])
+            await extract_batch(missing[half:])
+
+    async def worker() -> None:
+        carry = None
+        while True:
+            job = carry or await next_job()
+            carry = None
+            if job is None:
+                return
+            if not batch_tokens:
+                await extract_one(job)
+                continue
+
+            # Pack following jobs while they fit the batch's token and job limits
+            batch, tokens = [job], estimate_tokens(job[3])
+            while len(batch) < batch_max_jobs:
+                following = await next_job()
+                if following is None:
+                    break
+                cost = estimate_tokens(following[3])
+                if tokens + cost > batch_tokens:
+                    carry = following
+                    break
+                batch.append(following)
+                tokens += cost
+            await extract_batch(batch)
+
+    async def export_metrics() -> None:
+        while True:
+            await asyncio.sleep(metrics_interval)
+            metrics.export(metrics_path)
+
+    tasks = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    if metrics_path:
+        tasks.append(asyncio.create_task(export_metrics()))
+    try:
+        await asyncio.gather(*tasks[:concurrency])
+    finally:
+        # A failed worker (or a cancelled run) must not leave the others writing to the store closed below
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        recovered = False
+        try:
+            flush()
+            copied = store.copy_duplicate_components()
+            if copied:
+                logger.info(f"Copied components to {copied} duplicate job descriptions.")
+            released = store.release_claims(owner)
+            if released:
+                logger.info(f"Released {released} unfinished job descriptions.")
+            store.close()
+            recovered = True
+        finally:
+            # Keep the journal for the next run if its results or claims may not be in the database
+            if checkpoint and recovered:
+                checkpoint.discard()
+            elif checkpoint:
+                checkpoint.close()
+
+    elapsed = time.monotonic() - started
+    stats["elapsed_seconds"] = round(elapsed, 2)
+    stats["db_write_seconds"] = round(stats["db_write_seconds"], 4)
+    done = stats["processed"] + stats["cached"] + stats["rules"]
+    stats["jobs_per_minute"] = round(done / elapsed * 60, 2) if elapsed else 0.0
+    if cache:
+        stats["cache"] = cache.stats()
+    stats["compaction"] = compactor.stats()
+    logger.info(f"✅ Async extraction complete: {stats}")
+    return stats
@@ -0,0 +1,145 @@
+import hashlib
+import json
+import re
+import sqlite3
+import time
+import unicodedata
+from typing import Optional
+
+from llm_job_description_parser_v2 import MODEL_NAME, JobDescriptionSchema, prompt, sections_prompt
+from rule_extractor import DEFAULT_RULES_THRESHOLD, RULES_VERSION, STRONG_SECTION, WEAK_SECTION
+
+DEFAULT_CACHE_PATH = "llm_cache.db"
+
+_whitespace = re.compile(r"\s+")
+
+
+def normalize_description(text: str) -> str:
+    """Fold case, Unicode forms and whitespace so trivially re-posted ads hash alike."""
+    text = unicodedata.normalize("NFKC", text or "").casefold()
+    return _whitespace.sub(" ", text).strip()
+
+
+def extraction_version(model: str = MODEL_NAME, rules_threshold: Optional[float] = DEFAULT_RULES_THRESHOLD) -> str:
+    """
+    Fingerprint of everything that shapes the stored result: model, prompt
+    templates, schema, pre-extraction rules and their confidences. Changing
+    any of them invalidates old cache entries.
+
+    :param model: Name of the LLM answering, so results of another model (or of
+        the stub LLM) are never served as this one's.
+    :param rules_threshold: Rule confidence the run merges at (None = rules
+        disabled); cached results are merged rule and LLM fields.
+    """
+    payload = json.dumps({
+        "model": model,
+        "prompt": prompt.template,
+        "sections_prompt": sections_prompt.template,
+        "rules": RULES_VERSION,
+        "rules_threshold": rules_threshold,
+        "section_confidence": [STRONG_SECTION, WEAK_SECTION],
+        "schema": JobDescriptionSchema.model_json_schema(),
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class ExtractionCache:
+    """
+    Persistent cache of JobDescriptionSchema results keyed by the hash of the
+    normalized description and the extraction version.
+
+    Entries unused for `ttl_days` are dropped, and once the cache holds more
+    than `max_entries` the least recently used ones are evicted.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_CACHE_PATH, max_entries: int = 200_000,
+                 ttl_days: Optional[float] = 90, model: str = MODEL_NAME,
+                 rules_threshold: Optional[float] = DEFAULT_RULES_THRESHOLD):
+        self.conn = sqlite3.connect(db_path, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA busy_timeout = 30000")
+        self.conn.execute("""
+        CREATE TABLE IF NOT EXISTS extraction_cache (
+            content_hash TEXT NOT NULL,
+            version TEXT NOT NULL,
+            result TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            last_used_at REAL NOT NULL,
+            hits INTEGER DEFAULT 0,
+            PRIMARY KEY (content_hash, version)
+        )
+        """)
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_extraction_cache_last_used "
+            "ON extraction_cache (last_used_at)"
+        )
+        self.version = extraction_version(model, rules_threshold)
+        self.max_entries = max_entries
+        self.ttl_days = ttl_days
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def content_hash(description: str) -> str:
+        return hashlib.sha256(normalize_description(description).encode("utf-8")).hexdigest()
+
+    def get(self, description: str) -> Optional[JobDescriptionSchema]:
+        key = self.content_hash(description)
+        row = self.conn.execute(
+            "SELECT result FROM extraction_cache WHERE content_hash = ? AND version = ?",
+            (key, self.version),
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.conn.execute(
+            "UPDATE extraction_cache SET last_used_at = ?, hits = hits + 1 "
+            "WHERE content_hash = ? AND version = ?",
+            (time.time(), key, self.version),
+        )
+        return JobDescriptionSchema.model_validate(json.loads(row[0]))
+
+    def put(self, description: str, result: JobDescriptionSchema) -> None:
+        now = time.time()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO extraction_cache "
+            "(content_hash, version, result, created_at, last_used_at) VALUES (?, ?, ?, ?, ?)",
+            (self.content_hash(description), self.version, json.dumps(result.model_dump()), now, now),
+        )
+
+    def evict(self) -> int:
+        """Drop expired entries, other versions and the LRU overflow; return rows removed."""
+        removed = self.conn.execute(
+            "DELETE FROM extraction_cache WHERE version != ?", (self.version,)
+        ).rowcount
+        if self.ttl_days is not None:
+            cutoff = time.time() - self.ttl_days * 86400
+            removed += self.conn.execute(
+                "DELETE FROM extraction_cache WHERE last_used_at < ?", (cutoff,)
+            ).rowcount
+        overflow = self.entries() - self.max_entries
+        if overflow > 0:
+            removed += self.conn.execute("""
+                DELETE FROM extraction_cache WHERE rowid IN (
+                    SELECT rowid FROM extraction_cache ORDER BY last_used_at LIMIT ?
+                )
+            """, (overflow,)).rowcount
+        return removed
+
+    def entries(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM extraction_cache").fetchone()[0]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": self.entries(),
+            "version": self.version,
+        }
+
+    def close(self) -> None:
+        self.evict()
+        self.conn.close()
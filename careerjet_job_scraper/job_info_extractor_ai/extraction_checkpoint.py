@@ -0,0 +1,133 @@
+import json
+import logging
+import os
+from typing import Optional
+
+from job_store import POSTGRES_SCHEMES
+
+try:
+    import fcntl
+except ImportError:  # Windows: checkpoints are not locked
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_NAME = "extractor.jsonl"
+
+
+def default_checkpoint_path(db_path: str) -> str:
+    """checkpoints/extractor.jsonl next to the SQLite database (or in the working directory)."""
+    directory = "" if db_path.startswith(POSTGRES_SCHEMES) else os.path.dirname(db_path)
+    return os.path.join(directory, "checkpoints", CHECKPOINT_NAME)
+
+
+class ExtractionCheckpoint:
+    """
+    Write-ahead journal of one extractor run, so a killed run neither loses
+    paid-for LLM results nor leaves its claims stuck until their leases expire.
+
+    The first line records the run's claim owner. Every LLM result is
+    appended and fsynced before it is buffered for the database, and the
+    journal is cut back to its header once that buffer is committed. On the
+    next start, resume() saves the results the killed run never committed,
+    releases the rows it still held IN_PROGRESS, and starts a journal for the
+    new owner. A run that ends normally deletes its journal.
+
+    The journal is locked by the process using it: give concurrent extractors
+    sharing a database their own path.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.lock = open(f"{path}.lock", "a")
+        if fcntl is not None:
+            try:
+                fcntl.flock(self.lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                self.lock.close()
+                raise RuntimeError(f"Extraction checkpoint {path} is in use by another process")
+        self.file = None
+        self.owner = None
+
+    def _read(self):
+        """(owner, [(job_id, job_link, result_dict), ...]) of the journal on disk; a torn last line is ignored."""
+        owner, results = None, []
+        if not os.path.exists(self.path):
+            return owner, results
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                if not line.endswith("\n"):
+                    break
+                entry = json.loads(line)
+                if "owner" in entry:
+                    owner = entry["owner"]
+                else:
+                    results.append((entry["job_id"], entry["job_link"], entry["result"]))
+        return owner, results
+
+    def resume(self, store, owner: str) -> dict:
+        """
+        Recover whatever a killed run left behind, then journal for `owner`.
+
+        :return: {"replayed": results saved from the journal, "released": claims handed back}
+        """
+        previous, results = self._read()
+        if results:
+            store.save_components_many(results)
+        released = store.release_claims(previous) if previous else 0
+        if results or released:
+            logger.info(f"Resumed from {self.path}: saved {len(results)} journaled results, "
+                        f"released {released} descriptions claimed by {previous}.")
+        self.owner = owner
+        self.committed()
+        return {"replayed": len(results), "released": released}
+
+    def record(self, job_id: int, job_link: str, result_dict: dict) -> None:
+        """Journal one result before it is buffered for the database."""
+        self.file.write(json.dumps({"job_id": job_id, "job_link": job_link, "result": result_dict},
+                                   ensure_ascii=False) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def committed(self) -> None:
+        """Every recorded result is in the database: start the journal over."""
+        if self.file is not None:
+            self.file.close()
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"owner": self.owner}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        self.file = open(self.path, "a", encoding="utf-8")
+
+    def discard(self) -> None:
+        """The run ended with nothing left to recover: delete the journal."""
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        for path in (self.path, f"{self.path}.lock"):
+            if os.path.exists(path):
+                os.remove(path)
+        self.lock.close()
+
+    def close(self) -> None:
+        """Keep the journal for the next run (e.g. the final write failed)."""
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        self.lock.close()
+
+
+def open_checkpoint(path: Optional[str]) -> Optional[ExtractionCheckpoint]:
+    """The checkpoint at `path`, or None (with a warning) if another extractor holds it."""
+    if not path:
+        return None
+    try:
+        return ExtractionCheckpoint(path)
+    except RuntimeError as e:
+        logger.warning(f"{e}; running without a checkpoint.")
+        return None
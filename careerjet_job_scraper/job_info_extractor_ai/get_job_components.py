@@ -1,17 +1,19 @@
-import sqlite3
+import argparse
+import asyncio
 import logging
 import time
-from llm_job_description_parser_v2 import extract_job_info
-from pyrate_limiter import Limiter, Rate, Duration, BucketFullException
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
-    handlers=[
-        logging.FileHandler("job_processing.log"),
-        logging.StreamHandler()
-    ]
+from llm_job_description_parser_v2 import (
+    MODEL_NAME, JobDescriptionSchema, MissingAPIKeyError, extract_job_info, extract_job_sections, prompt,
+    sections_prompt, token_usage,
 )
+from extraction_cache import DEFAULT_CACHE_PATH, ExtractionCache
+from extraction_checkpoint import default_checkpoint_path, open_checkpoint
+from prompt_compaction import DEFAULT_BOILERPLATE_PATH, DEFAULT_TOKEN_BUDGET, load_compactor
+from job_store import DEFAULT_DB_PATH, new_claim_owner, open_store
+import careerjet_path  # noqa: F401
+from careerjet.instrumentation import EXTRACTOR_PREFIX, StageMetrics
+from rule_extractor import DEFAULT_RULES_THRESHOLD, pre_extract
+from pyrate_limiter import Limiter, Rate, Duration, BucketFullException
 logger = logging.getLogger(__name__)
 
 # Initialize rate limiter: 10 requests per minute
@@ -19,104 +21,240 @@ rate = Rate(10, Duration.MINUTE)
 limiter = Limiter(rate)
 
 def process_and_save_jobs(
-    db_path: str = "../careerjet/careerjet_jobs.db",
-    batch_size: int = 40
+    db_path: str = DEFAULT_DB_PATH,
+    batch_size: int = 40,
+    lease_seconds: int = 900,
+    llm=None,
+    cache=None,
+    metrics=None,
+    boilerplate_path: str = DEFAULT_BOILERPLATE_PATH,
+    token_budget: int = DEFAULT_TOKEN_BUDGET,
+    sections_llm=None,
+    rules_threshold: float = DEFAULT_RULES_THRESHOLD,
+    checkpoint=None
 ):
     """
-    Process unprocessed job descriptions from the SQLite database,
+    Process unprocessed job descriptions from the job database,
     extract structured information using an LLM, and save the result
     into the job_components table.
 
-    :param db_path: Path to the SQLite database file.
+    Descriptions are claimed under a lease, so several workers can share the
+    database; anything this run does not finish is released on exit, and rows
+    orphaned by a crash are reclaimed once their lease expires, or at once by
+    the next run given the same `checkpoint`.
+
+    Rule pre-extraction (rule_extractor.py) runs before the LLM: jobs it
+    covers completely are saved without a call, and jobs missing only the
+    free-text sections get a shorter sections-only call.
+
+    :param db_path: Path to the SQLite database file, or a postgresql:// URL.
     :param batch_size: Number of job descriptions to process per call.
+    :param lease_seconds: How long a claimed description stays reserved.
+    :param llm: Structured-output runnable to use instead of the Cohere client.
+    :param cache: ExtractionCache consulted before calling the LLM.
+    :param metrics: StageMetrics that records LLM, cache and DB timings.
+    :param boilerplate_path: Learned boilerplate segments (see prompt_compaction.py).
+    :param token_budget: Maximum estimated description tokens sent per job (0 = no limit).
+    :param sections_llm: JobSectionsSchema runnable to use instead of the Cohere client.
+    :param rules_threshold: Minimum rule confidence for a field to skip the LLM (None = no rules).
+    :param checkpoint: ExtractionCheckpoint that records this run's claim owner.
     """
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-
-    # Ensure destination table exists
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS job_components (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        job_link TEXT UNIQUE,
-        job_responsibilities TEXT,
-        job_requirements TEXT,
-        company_name TEXT,
-        company_address TEXT,
-        application_email TEXT,
-        benefits TEXT,
-        compensation TEXT,
-        extracted_at DATETIME DEFAULT CURRENT_TIMESTAMP
-    )
-    """)
-    conn.commit()
-
-    # Fetch unprocessed jobs
-    cursor.execute("""
-        SELECT id, job_link, job_description
-        FROM job_description
-        WHERE status != 'DONE'
-        LIMIT ?
-    """, (batch_size,))
-    rows = cursor.fetchall()
-
-    for job_id, job_link, description in rows:
+    metrics = metrics or StageMetrics(EXTRACTOR_PREFIX)
+    store = open_store(db_path)
+    store.ensure_schema()
+    owner = new_claim_owner()
+    if checkpoint:
+        checkpoint.resume(store, owner)
+    compactor = load_compactor(store, boilerplate_path, token_budget)
+
+    # Claim unprocessed jobs and mark them IN_PROGRESS in one statement
+    rows = store.claim_jobs(owner, batch_size, lease_seconds)
+    logger.info(f"Claimed {len(rows)} job descriptions as {owner}.")
+    companies = store.listing_companies(job_link for _, job_link, _ in rows) if rules_threshold is not None else {}
+    routes = {"rules": 0, "sections": 0, "llm": 0}
+
+    try:
+        for job_id, job_link, description in rows:
+            try:
+                logger.info(f"[Job {job_id}] Starting processing.")
+
+                cached = None
+                if cache:
+                    with metrics.time("cache_lookup"):
+                        cached = cache.get(description)
+                if cached is not None:
+                    with metrics.time("db_commit"):
+                        store.save_components(job_id, job_link, cached.model_dump())
+                    logger.info(f"[Job {job_id}] ✅ Saved from extraction cache.")
+                    continue
+
+                extraction, route = None, "llm"
+                if rules_threshold is not None:
+                    with metrics.time("rule_extraction"):
+                        extraction = pre_extract(description, companies.get(job_link))
+                    route = extraction.plan(rules_threshold)
+                if route == "rules":
+                    with metrics.time("db_commit"):
+                        store.save_components(job_id, job_link, {**extraction.fields, "tokens_in": 0, "tokens_out": 0})
+                    routes["rules"] += 1
+                    logger.info(f"[Job {job_id}] ✅ Saved from rule pre-extraction.")
+                    continue
+
+                # Apply rate limiting with manual backoff
+                wait_started = time.perf_counter()
+                while True:
+                    try:
+                        limiter.try_acquire(job_link)
+                        break  # Exit loop if acquisition is successful
+                    except BucketFullException:
+                        wait_time = 60  # Wait for 60 seconds before retrying
+                        logger.warning(f"[Job {job_id}] Rate limit exceeded. Sleeping for {wait_time} seconds.")
+                        time.sleep(wait_time)
+                metrics.observe("rate_limit_wait", time.perf_counter() - wait_started)
+
+                # Drop boilerplate and cut to the token budget before the call
+                compacted = compactor.compact(description)
+                with metrics.time("llm_call"):
+                    if route == "sections":
+                        result = extract_job_sections(compacted, sections_llm)
+                    else:
+                        result = extract_job_info(compacted, llm)
+                if isinstance(result, dict) and "error" in result:
+                    logger.error(f"[Job {job_id}] Extraction error: {result['error']}")
+                    store.fail_job(job_id)
+                    continue
+                usage = token_usage(compacted, result, sections_prompt if route == "sections" else prompt)
+                if extraction is not None:
+                    result = JobDescriptionSchema(**extraction.merge(result.model_dump(), rules_threshold))
+                routes[route] += 1
+                if cache:
+                    cache.put(description, result)
+
+                # Convert Pydantic model to dict, save and mark as DONE
+                with metrics.time("db_commit"):
+                    store.save_components(job_id, job_link, {**result.model_dump(), **usage})
+
+                logger.info(f"[Job {job_id}] ✅ Successfully processed and saved.")
+
+            except MissingAPIKeyError:
+                raise  # No COHERE_API_KEY: every remaining job would fail the same way
+            except Exception as e:
+                logger.exception(f"[Job {job_id}] ❌ Unexpected error during processing: {e}")
+                store.fail_job(job_id)
+    finally:
+        recovered = False
         try:
-            logger.info(f"[Job {job_id}] Starting processing.")
-
-            # Mark as IN_PROGRESS
-            cursor.execute("UPDATE job_description SET status = 'IN_PROGRESS' WHERE id = ?", (job_id,))
-            conn.commit()
-            logger.info(f"[Job {job_id}] Marked as IN_PROGRESS.")
-
-            # Apply rate limiting with manual backoff
-            while True:
-                try:
-                    limiter.try_acquire(job_link)
-                    break  # Exit loop if acquisition is successful
-                except BucketFullException:
-                    wait_time = 60  # Wait for 60 seconds before retrying
-                    logger.warning(f"[Job {job_id}] Rate limit exceeded. Sleeping for {wait_time} seconds.")
-                    time.sleep(wait_time)
-
-            # Extract job info with retry logic
-            result = extract_job_info(description)
-            if isinstance(result, dict) and "error" in result:
-                logger.error(f"[Job {job_id}] Extraction error: {result['error']}")
-                continue
-
-            # Convert Pydantic model to dict
-            result_dict = result.model_dump()
-
-            # Save to job_components table
-            cursor.execute("""
-                INSERT OR REPLACE INTO job_components (
-                    job_link, job_responsibilities, job_requirements,
-                    company_name, company_address, application_email,
-                    benefits, compensation
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                job_link,
-                result_dict.get("job_responsibilities"),
-                result_dict.get("job_requirements"),
-                result_dict.get("company_name"),
-                result_dict.get("company_address"),
-                result_dict.get("application_email"),
-                result_dict.get("benefits"),
-                result_dict.get("compensation")
-            ))
-
-            # Mark as DONE
-            cursor.execute("UPDATE job_description SET status = 'DONE' WHERE id = ?", (job_id,))
-            conn.commit()
-
-            logger.info(f"[Job {job_id}] ✅ Successfully processed and saved.")
-
-        except Exception as e:
-            logger.exception(f"[Job {job_id}] ❌ Unexpected error during processing: {e}")
-
-    conn.close()
+            copied = store.copy_duplicate_components()
+            if copied:
+                logger.info(f"Copied components to {copied} duplicate job descriptions.")
+            released = store.release_claims(owner)
+            if released:
+                logger.info(f"Released {released} unfinished job descriptions.")
+            store.close()
+            recovered = True
+        finally:
+            # Keep the journal (and its claim owner) for the next run if the claims were not released
+            if checkpoint and recovered:
+                checkpoint.discard()
+            elif checkpoint:
+                checkpoint.close()
+    if cache:
+        logger.info(f"Extraction cache: {cache.stats()}")
+    logger.info(f"Prompt compaction: {compactor.stats()}")
+    logger.info(f"Extraction routes: {routes}")
     logger.info("✅ Job extraction session complete. Database connection closed.")
 
-# Example usage
+def main():
+    parser = argparse.ArgumentParser(description="Extract job components with an LLM.")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="Path to careerjet_jobs.db or a postgresql:// URL")
+    parser.add_argument("--mode", choices=("sequential", "async", "batched"), default="sequential",
+                        help="batched: async, with several short descriptions per LLM call")
+    parser.add_argument("--batch-size", type=int, default=40, help="Jobs to process (async: 0 = all)")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent LLM calls in async/batched mode")
+    parser.add_argument("--batch-tokens", type=int, default=4000,
+                        help="Maximum estimated description tokens per batched call")
+    parser.add_argument("--batch-jobs", type=int, default=8, help="Maximum jobs per batched call")
+    parser.add_argument("--rate", type=int, default=10, help="LLM calls allowed per minute")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH, help="Extraction cache database")
+    parser.add_argument("--no-cache", action="store_true", help="Always call the LLM")
+    parser.add_argument("--boilerplate", default=DEFAULT_BOILERPLATE_PATH,
+                        help="Learned boilerplate segments; learned from the database if missing")
+    parser.add_argument("--token-budget", type=int, default=DEFAULT_TOKEN_BUDGET,
+                        help="Maximum estimated description tokens per LLM call (0 = no limit)")
+    parser.add_argument("--rules-threshold", type=float, default=DEFAULT_RULES_THRESHOLD,
+                        help="Minimum rule confidence for a field to be taken without the LLM")
+    parser.add_argument("--no-rules", action="store_true", help="Send every description to the LLM")
+    parser.add_argument("--metrics", metavar="PATH",
+                        help="Export stage timings to PATH.json and PATH.prom")
+    parser.add_argument("--checkpoint", metavar="PATH",
+                        help="Journal of this run for crash recovery (default: checkpoints/extractor.jsonl "
+                             "next to the database)")
+    parser.add_argument("--no-checkpoint", action="store_true", help="Do not journal or resume runs")
+    parser.add_argument("--stub-llm", type=float, metavar="LATENCY",
+                        help="Use the local stub LLM with this latency in seconds")
+    args = parser.parse_args()
+
+    # Configured here, not on import, so importing this module creates no log file
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+        handlers=[
+            logging.FileHandler("job_processing.log"),
+            logging.StreamHandler()
+        ]
+    )
+
+    llm = batch_llm = sections_llm = None
+    if args.stub_llm is not None:
+        from llm_job_description_parser_v2 import JobSectionsSchema
+        from stub_llm import StubStructuredLLM
+        llm = StubStructuredLLM(latency=args.stub_llm)
+        batch_llm = StubStructuredLLM(latency=args.stub_llm, batched=True)
+        sections_llm = StubStructuredLLM(latency=args.stub_llm, schema=JobSectionsSchema)
+    # Stub results are cached under their own version, never served to a real run
+    model = llm.model_name if llm is not None else MODEL_NAME
+    rules_threshold = None if args.no_rules else args.rules_threshold
+    cache = None if args.no_cache else ExtractionCache(args.cache, model=model, rules_threshold=rules_threshold)
+    checkpoint = None if args.no_checkpoint else open_checkpoint(args.checkpoint or default_checkpoint_path(args.db))
+    metrics = StageMetrics(EXTRACTOR_PREFIX)
+
+    try:
+        run(args, llm, batch_llm, sections_llm, cache, metrics, checkpoint)
+    finally:
+        if cache:
+            cache.close()
+        if args.metrics:
+            metrics.export(args.metrics)
+
+
+def run(args, llm, batch_llm, sections_llm, cache, metrics, checkpoint):
+    rules_threshold = None if args.no_rules else args.rules_threshold
+    if args.mode in ("async", "batched"):
+        from concurrent_extractor import process_and_save_jobs_async
+        asyncio.run(process_and_save_jobs_async(
+            db_path=args.db,
+            max_jobs=args.batch_size or None,
+            concurrency=args.workers,
+            rate=args.rate,
+            llm=llm,
+            cache=cache,
+            metrics=metrics,
+            metrics_path=args.metrics,
+            boilerplate_path=args.boilerplate,
+            token_budget=args.token_budget,
+            batch_llm=batch_llm,
+            batch_tokens=args.batch_tokens if args.mode == "batched" else None,
+            batch_max_jobs=args.batch_jobs,
+            sections_llm=sections_llm,
+            rules_threshold=rules_threshold,
+            checkpoint=checkpoint,
+        ))
+    else:
+        process_and_save_jobs(db_path=args.db, batch_size=args.batch_size, llm=llm, cache=cache,
+                              metrics=metrics, boilerplate_path=args.boilerplate,
+                              token_budget=args.token_budget, sections_llm=sections_llm,
+                              rules_threshold=rules_threshold, checkpoint=checkpoint)
+
+
 if __name__ == "__main__":
-    process_and_save_jobs()
+    main()
@@ -0,0 +1,352 @@
+import logging
+import sqlite3
+import time
+
+import careerjet_path  # noqa: F401
+from careerjet.db import (
+    ATTEMPT_COLUMNS, DESCRIPTION_FINISHED, LEASE_COLUMNS, claim_rows, claimable_clause, connect,
+    ensure_change_tracking, ensure_columns, new_claim_owner, release_claims as release_rows,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = "../careerjet/careerjet_jobs.db"
+POSTGRES_SCHEMES = ("postgresql://", "postgres://")
+COMPONENT_FIELDS = (
+    "job_responsibilities", "job_requirements", "company_name", "company_address",
+    "application_email", "benefits", "compensation",
+)
+# Estimated prompt and response tokens of the LLM call (NULL for cached/copied rows)
+TOKEN_FIELDS = ("tokens_in", "tokens_out")
+# Failed extractions after which a description is marked ERROR instead of released
+MAX_ATTEMPTS = 3
+
+
+def ensure_schema(conn: sqlite3.Connection) -> None:
+    """
+    Create job_components (adding token columns to older tables), add
+    lease, duplicate_of and attempts columns to job_description and track
+    changes to both (careerjet.db.ensure_change_tracking).
+    """
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS job_components (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        job_link TEXT UNIQUE,
+        job_responsibilities TEXT,
+        job_requirements TEXT,
+        company_name TEXT,
+        company_address TEXT,
+        application_email TEXT,
+        benefits TEXT,
+        compensation TEXT,
+        extracted_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        tokens_in INTEGER,
+        tokens_out INTEGER
+    )
+    """)
+    ensure_columns(conn, "job_components", {field: "INTEGER" for field in TOKEN_FIELDS})
+    ensure_columns(conn, "job_description", {**LEASE_COLUMNS, "duplicate_of": "TEXT", **ATTEMPT_COLUMNS})
+    for table in ("job_description", "job_components"):
+        ensure_change_tracking(conn, table)
+
+
+def claim_jobs(conn: sqlite3.Connection, owner: str, limit: int, lease_seconds: int = 900):
+    """
+    Atomically claim up to `limit` unprocessed descriptions for `owner`.
+
+    Rows are claimable unless their status is IN_PROGRESS or one of
+    DESCRIPTION_FINISHED (careerjet.db), or when they are IN_PROGRESS under
+    an expired lease (a crashed worker). DUPLICATE rows get their components
+    from copy_duplicate_components.
+
+    :return: List of (id, job_link, job_description) tuples.
+    """
+    return claim_rows(conn, "job_description", "status", owner, limit, lease_seconds,
+                      returning="id, job_link, job_description", finished=DESCRIPTION_FINISHED)
+
+
+def save_components(conn: sqlite3.Connection, job_id: int, job_link: str, result_dict: dict) -> None:
+    """Store one extraction result and mark its description DONE in one transaction."""
+    save_components_many(conn, [(job_id, job_link, result_dict)])
+
+
+def save_components_many(conn: sqlite3.Connection, results) -> None:
+    """
+    Store several extraction results in one transaction.
+
+    :param results: Iterable of (job_id, job_link, result_dict) tuples.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        _write_components(conn, list(results))
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+def _write_components(conn: sqlite3.Connection, results) -> None:
+    fields = COMPONENT_FIELDS + TOKEN_FIELDS
+    conn.executemany(f"""
+        INSERT OR REPLACE INTO job_components (job_link, {", ".join(fields)})
+        VALUES ({", ".join("?" * (len(fields) + 1))})
+    """, [
+        (job_link, *(result_dict.get(field) for field in fields))
+        for _, job_link, result_dict in results
+    ])
+    conn.executemany("""
+        UPDATE job_description
+        SET status = 'DONE', claim_owner = NULL, lease_expires_at = NULL
+        WHERE id = ?
+    """, [(job_id,) for job_id, _, _ in results])
+
+
+def copy_duplicate_components(conn: sqlite3.Connection) -> int:
+    """
+    Give DUPLICATE descriptions the components already extracted for their
+    canonical description (duplicate_of), instead of another LLM call.
+
+    :return: Number of rows copied.
+    """
+    fields = ", ".join(COMPONENT_FIELDS)
+    return conn.execute(f"""
+        INSERT OR REPLACE INTO job_components (job_link, {fields})
+        SELECT d.job_link, {", ".join(f"c.{field}" for field in COMPONENT_FIELDS)}
+        FROM job_description d
+        JOIN job_components c ON c.job_link = d.duplicate_of
+        WHERE d.status = 'DUPLICATE'
+          AND NOT EXISTS (SELECT 1 FROM job_components own WHERE own.job_link = d.job_link)
+    """).rowcount
+
+
+def sample_descriptions(conn: sqlite3.Connection, limit: int = 5000) -> list:
+    """The `limit` most recently stored job descriptions, e.g. to learn boilerplate from."""
+    return [description for (description,) in conn.execute(
+        "SELECT job_description FROM job_description WHERE job_description IS NOT NULL "
+        "ORDER BY id DESC LIMIT ?", (limit,)
+    )]
+
+
+def listing_companies(conn: sqlite3.Connection, job_links) -> dict:
+    """Company names from the `jobs` listings of `job_links`, as {job_link: company}."""
+    job_links = list(job_links)
+    if not job_links or not conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'jobs'"
+    ).fetchone():
+        return {}
+    companies = {}
+    for start in range(0, len(job_links), 500):
+        chunk = job_links[start:start + 500]
+        companies.update(conn.execute(
+            f"SELECT job_link, company FROM jobs WHERE job_link IN ({', '.join('?' * len(chunk))}) "
+            "AND company IS NOT NULL AND company != ''", chunk
+        ).fetchall())
+    return companies
+
+
+# Count a failed extraction; the description goes back to NEW, or to ERROR once it has failed max_attempts times
+FAIL_JOB_SQL = """
+    UPDATE job_description
+    SET attempts = COALESCE(attempts, 0) + 1,
+        status = CASE WHEN COALESCE(attempts, 0) + 1 >= {0} THEN 'ERROR' ELSE 'NEW' END,
+        claim_owner = NULL, lease_expires_at = NULL
+    WHERE id = {0}
+    RETURNING status, attempts
+"""
+
+
+def _log_failure(job_id: int, row) -> str:
+    status, attempts = row if row else (None, 0)
+    if status == "ERROR":
+        logger.error(f"[Job {job_id}] Extraction failed {attempts} times; marked ERROR and not claimed again.")
+    return status
+
+
+def fail_job(conn: sqlite3.Connection, job_id: int, max_attempts: int = MAX_ATTEMPTS) -> str:
+    """
+    Give up the lease on a description whose extraction failed.
+
+    :return: The new status, NEW or ERROR.
+    """
+    return _log_failure(job_id, conn.execute(FAIL_JOB_SQL.format("?"), (max_attempts, job_id)).fetchone())
+
+
+def release_claims(conn: sqlite3.Connection, owner: str) -> int:
+    """Hand every description still IN_PROGRESS under `owner` back to the queue."""
+    return release_rows(conn, "job_description", "status", owner)
+
+
+class SQLiteJobStore:
+    """The functions above, bound to one SQLite connection."""
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        self.conn = connect(db_path)
+
+    def ensure_schema(self) -> None:
+        ensure_schema(self.conn)
+
+    def claim_jobs(self, owner: str, limit: int, lease_seconds: int = 900):
+        return claim_jobs(self.conn, owner, limit, lease_seconds)
+
+    def save_components(self, job_id: int, job_link: str, result_dict: dict) -> None:
+        save_components(self.conn, job_id, job_link, result_dict)
+
+    def save_components_many(self, results) -> None:
+        save_components_many(self.conn, results)
+
+    def copy_duplicate_components(self) -> int:
+        return copy_duplicate_components(self.conn)
+
+    def sample_descriptions(self, limit: int = 5000) -> list:
+        return sample_descriptions(self.conn, limit)
+
+    def listing_companies(self, job_links) -> dict:
+        return listing_companies(self.conn, job_links)
+
+    def fail_job(self, job_id: int, max_attempts: int = MAX_ATTEMPTS) -> str:
+        return fail_job(self.conn, job_id, max_attempts)
+
+    def release_claims(self, owner: str) -> int:
+        return release_claims(self.conn, owner)
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+class PostgresJobStore:
+    """
+    Same interface on PostgreSQL, through a psycopg connection pool.
+
+    Claims use FOR UPDATE SKIP LOCKED, so concurrent extractors skip rows
+    another worker is claiming instead of waiting on them, and results are
+    written with one multi-row upsert per batch. Requires `psycopg[pool]`.
+    """
+
+    def __init__(self, dsn: str, pool_size: int = 4):
+        try:
+            from psycopg_pool import ConnectionPool
+        except ImportError as e:
+            raise ImportError("A postgresql:// --db requires psycopg[pool]") from e
+        self.pool = ConnectionPool(dsn, min_size=1, max_size=pool_size, open=True)
+
+    def ensure_schema(self) -> None:
+        with self.pool.connection() as conn:
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS job_components (
+                id BIGSERIAL PRIMARY KEY,
+                job_link TEXT UNIQUE,
+                job_responsibilities TEXT,
+                job_requirements TEXT,
+                company_name TEXT,
+                company_address TEXT,
+                application_email TEXT,
+                benefits TEXT,
+                compensation TEXT,
+                extracted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """)
+            conn.execute("""
+                ALTER TABLE job_components
+                ADD COLUMN IF NOT EXISTS tokens_in INTEGER,
+                ADD COLUMN IF NOT EXISTS tokens_out INTEGER
+            """)
+            conn.execute("""
+                ALTER TABLE job_description
+                ADD COLUMN IF NOT EXISTS claim_owner TEXT,
+                ADD COLUMN IF NOT EXISTS lease_expires_at DOUBLE PRECISION,
+                ADD COLUMN IF NOT EXISTS duplicate_of TEXT,
+                ADD COLUMN IF NOT EXISTS attempts INTEGER
+            """)
+
+    def claim_jobs(self, owner: str, limit: int, lease_seconds: int = 900):
+        now = time.time()
+        condition, params = claimable_clause("status", now, finished=DESCRIPTION_FINISHED, placeholder="%s")
+        with self.pool.connection() as conn:
+            return conn.execute(f"""
+                UPDATE job_description
+                SET status = 'IN_PROGRESS', claim_owner = %s, lease_expires_at = %s
+                WHERE id IN (
+                    SELECT id FROM job_description
+                    WHERE {condition}
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING id, job_link, job_description
+            """, (owner, now + lease_seconds, *params, limit)).fetchall()
+
+    def save_components(self, job_id: int, job_link: str, result_dict: dict) -> None:
+        self.save_components_many([(job_id, job_link, result_dict)])
+
+    def save_components_many(self, results) -> None:
+        # One row per link: an upsert may not touch the same row twice in one statement
+        latest = {job_link: (job_id, result_dict) for job_id, job_link, result_dict in results}
+        if not latest:
+            return
+        fields = COMPONENT_FIELDS + TOKEN_FIELDS
+        columns = [[result_dict.get(field) for _, result_dict in latest.values()] for field in fields]
+        casts = ["%s::text[]"] * (len(COMPONENT_FIELDS) + 1) + ["%s::int[]"] * len(TOKEN_FIELDS)
+        with self.pool.connection() as conn, conn.transaction():
+            conn.execute(f"""
+                INSERT INTO job_components (job_link, {", ".join(fields)})
+                SELECT * FROM unnest({", ".join(casts)})
+                ON CONFLICT (job_link) DO UPDATE SET
+                    {", ".join(f"{field} = EXCLUDED.{field}" for field in fields)},
+                    extracted_at = CURRENT_TIMESTAMP
+            """, (list(latest), *columns))
+            conn.execute("""
+                UPDATE job_description
+                SET status = 'DONE', claim_owner = NULL, lease_expires_at = NULL
+                WHERE id = ANY(%s)
+            """, ([job_id for job_id, _ in latest.values()],))
+
+    def copy_duplicate_components(self) -> int:
+        with self.pool.connection() as conn:
+            return conn.execute(f"""
+                INSERT INTO job_components (job_link, {", ".join(COMPONENT_FIELDS)})
+                SELECT d.job_link, {", ".join(f"c.{field}" for field in COMPONENT_FIELDS)}
+                FROM job_description d
+                JOIN job_components c ON c.job_link = d.duplicate_of
+                WHERE d.status = 'DUPLICATE'
+                ON CONFLICT (job_link) DO NOTHING
+            """).rowcount
+
+    def sample_descriptions(self, limit: int = 5000) -> list:
+        with self.pool.connection() as conn:
+            return [description for (description,) in conn.execute(
+                "SELECT job_description FROM job_description WHERE job_description IS NOT NULL "
+                "ORDER BY id DESC LIMIT %s", (limit,)
+            )]
+
+    def listing_companies(self, job_links) -> dict:
+        job_links = list(job_links)
+        if not job_links:
+            return {}
+        with self.pool.connection() as conn:
+            if conn.execute("SELECT to_regclass('jobs')").fetchone()[0] is None:
+                return {}
+            return dict(conn.execute(
+                "SELECT job_link, company FROM jobs WHERE job_link = ANY(%s) "
+                "AND company IS NOT NULL AND company <> ''", (job_links,)
+            ).fetchall())
+
+    def fail_job(self, job_id: int, max_attempts: int = MAX_ATTEMPTS) -> str:
+        with self.pool.connection() as conn:
+            return _log_failure(job_id, conn.execute(FAIL_JOB_SQL.format("%s"), (max_attempts, job_id)).fetchone())
+
+    def release_claims(self, owner: str) -> int:
+        with self.pool.connection() as conn:
+            return conn.execute("""
+                UPDATE job_description
+                SET status = 'NEW', claim_owner = NULL, lease_expires_at = NULL
+                WHERE claim_owner = %s AND status = 'IN_PROGRESS'
+            """, (owner,)).rowcount
+
+    def close(self) -> None:
+        self.pool.close()
+
+
+def open_store(target: str = DEFAULT_DB_PATH):
+    """A PostgresJobStore for postgresql:// URLs, otherwise a SQLiteJobStore on the file path."""
+    if target.startswith(POSTGRES_SCHEMES):
+        return PostgresJobStore(target)
+    return SQLiteJobStore(target)
@@ -1,18 +1,19 @@
-from typing import Optional
-from pydantic import BaseModel, Field
+"""
+Schemas, prompts and LLM calls for job component extraction.
+
+LangChain and Cohere are only imported, and COHERE_API_KEY only read, when
+a call first needs the Cohere client (see chat_model and structured_llm_for).
+Importing this module is cheap, so cached or rule-only runs and inspection
+scripts neither wait for those imports nor need an API key.
+"""
+import functools
 import os
-from dotenv import load_dotenv
-from langchain_core.prompts import PromptTemplate
-from langchain_cohere import ChatCohere
+from typing import List, Optional, Type
 
+from pydantic import BaseModel, Field, ValidationError
 
-# --------------- Load environment variables --------------- #
-load_dotenv()  # Loads from .env file in current working directory
+from prompt_compaction import estimate_tokens
 
-# Ensure the API key is available
-api_key = os.getenv("COHERE_API_KEY")
-if not api_key:
-    raise EnvironmentError("Missing COHERE_API_KEY in environment or .env file.")
 
 class JobDescriptionSchema(BaseModel):
     job_responsibilities: str = Field(
@@ -44,37 +45,207 @@ class JobDescriptionSchema(BaseModel):
         description="Information about salary or compensation, if provided."
     )
 
-# Define the prompt template with a placeholder for job_description
+class JobSectionsSchema(BaseModel):
+    """The free-text sections only, for jobs whose other fields the rules already found."""
+    job_responsibilities: str = Field(
+        ...,
+        description="Section of the job description detailing key responsibilities."
+    )
+    job_requirements: str = Field(
+        ...,
+        description="Section of the job description outlining required skills, qualifications, or expertise."
+    )
+
+class BatchedJobDescription(JobDescriptionSchema):
+    job_id: int = Field(
+        ...,
+        description="The job_id shown above the job description these fields were extracted from."
+    )
+
+
+class JobDescriptionBatch(BaseModel):
+    jobs: List[BatchedJobDescription] = Field(
+        ...,
+        description="One entry per job description, in any order."
+    )
+
+class PromptTemplate:
+    """
+    A `str.format` template with the `template`/`partial`/`format` interface
+    of LangChain's PromptTemplate.
+
+    Stands in for langchain_core.prompts.PromptTemplate, whose import takes
+    about half a second, so rendering a prompt (token estimates, cache keys)
+    does not load LangChain. Only f-string templates are supported; they
+    render exactly as LangChain's do (tests/test_prompt_template.py).
+    """
+
+    def __init__(self, template: str, partial_variables: Optional[dict] = None):
+        self.template = template
+        self.partial_variables = partial_variables or {}
+
+    @classmethod
+    def from_template(cls, template: str) -> "PromptTemplate":
+        return cls(template)
+
+    def partial(self, **kwargs) -> "PromptTemplate":
+        """The template with `kwargs` filled in, leaving the other variables to `format`."""
+        return PromptTemplate(self.template, {**self.partial_variables, **kwargs})
+
+    def format(self, **kwargs) -> str:
+        return self.template.format(**{**self.partial_variables, **kwargs})
+
+
+# The field list and descriptions travel with the structured-output schema,
+# so the prompt itself only needs the (compacted) description
 prompt = PromptTemplate.from_template(
-    """You are an expert job description analyzer. Given a raw job description, extract the following:
-    - job_responsibilities
-    - job_requirements
-    - company_name
-    - company_address
-    - application_email
-    - benefits
-    - compensation
-
-    Job Description:
-    {job_description}
+    "Extract the job details from this job description. Leave fields that are not stated empty.\n\n"
+    "{job_description}"
+)
+
+sections_prompt = PromptTemplate.from_template(
+    "Extract the responsibilities and the requirements from this job description.\n\n"
+    "{job_description}"
+)
+
+batch_prompt = PromptTemplate.from_template(
+    "Extract the job details from each job description below, returning one entry per job with its job_id. "
+    "Leave fields that are not stated empty.\n\n"
+    "{job_descriptions}"
+)
+
+MODEL_NAME = "command-a-03-2025"
+
+
+class MissingAPIKeyError(EnvironmentError):
+    """COHERE_API_KEY is not set, so no LLM call can succeed."""
+
+
+@functools.lru_cache(maxsize=None)
+def chat_model():
     """
-    )
+    The Cohere chat model, created on first use.
+
+    :raises MissingAPIKeyError: COHERE_API_KEY is not set in the environment or a .env file
+    """
+    from dotenv import load_dotenv
+    load_dotenv()  # Loads from .env file in current working directory
+    api_key = os.getenv("COHERE_API_KEY")
+    if not api_key:
+        raise MissingAPIKeyError("Missing COHERE_API_KEY in environment or .env file.")
+    from langchain_cohere import ChatCohere
+    return ChatCohere(model=MODEL_NAME, api_key=api_key)
+
+
+@functools.lru_cache(maxsize=None)
+def structured_llm_for(schema: Type[BaseModel]):
+    """The Cohere runnable answering with `schema`, created on first use."""
+    return chat_model().with_structured_output(schema)
+
 
-llm = ChatCohere(model="command-a-03-2025", api_key=api_key)
-structured_llm = llm.with_structured_output(JobDescriptionSchema)
+def _is_invalid_response(error: Exception) -> bool:
+    """Whether `error` means the model answered but the answer did not fit the schema."""
+    if isinstance(error, ValidationError):
+        return True
+    from langchain_core.exceptions import OutputParserException
+    return isinstance(error, OutputParserException)
 
-def extract_job_info(job_description: str) -> dict:
+def token_usage(job_description: str, result: BaseModel, template: PromptTemplate = prompt) -> dict:
+    """Estimated tokens sent and received for one extraction, as tokens_in/tokens_out."""
+    return {
+        "tokens_in": estimate_tokens(template.format(job_description=job_description)),
+        "tokens_out": estimate_tokens(result.model_dump_json()),
+    }
+
+
+def extract_job_info(job_description: str, llm=None) -> dict:
     """
     Extracts structured information from a job description.
     
     :param job_description: The raw text of the job listing
+    :param llm: Structured-output runnable to use instead of the Cohere client
+    :return: Dictionary with parsed fields
+    """
+    runnable = llm or structured_llm_for(JobDescriptionSchema)
+    try:
+        formatted_prompt = prompt.format(job_description=job_description)
+        response = runnable.invoke(formatted_prompt)
+        return response
+    except Exception as e:
+        return {"error": str(e)}
+
+
+async def aextract_job_info(job_description: str, llm=None) -> dict:
+    """
+    Async counterpart of extract_job_info, using the runnable's ainvoke.
+
+    :param job_description: The raw text of the job listing
+    :param llm: Structured-output runnable to use instead of the Cohere client
     :return: Dictionary with parsed fields
     """
+    runnable = llm or structured_llm_for(JobDescriptionSchema)
     try:
         formatted_prompt = prompt.format(job_description=job_description)
-        response = structured_llm.invoke(formatted_prompt)
+        response = await runnable.ainvoke(formatted_prompt)
         return response
     except Exception as e:
         return {"error": str(e)}
 
 
+def extract_job_sections(job_description: str, llm=None) -> dict:
+    """
+    Extracts only the responsibilities and requirements (JobSectionsSchema).
+
+    :param job_description: The raw text of the job listing
+    :param llm: JobSectionsSchema runnable to use instead of the Cohere client
+    :return: JobSectionsSchema, or a dictionary with an "error"
+    """
+    runnable = llm or structured_llm_for(JobSectionsSchema)
+    try:
+        return runnable.invoke(sections_prompt.format(job_description=job_description))
+    except Exception as e:
+        return {"error": str(e)}
+
+
+async def aextract_job_sections(job_description: str, llm=None) -> dict:
+    """
+    Async counterpart of extract_job_sections.
+
+    :param job_description: The raw text of the job listing
+    :param llm: JobSectionsSchema runnable to use instead of the Cohere client
+    :return: JobSectionsSchema, or a dictionary with an "error"
+    """
+    runnable = llm or structured_llm_for(JobSectionsSchema)
+    try:
+        return await runnable.ainvoke(sections_prompt.format(job_description=job_description))
+    except Exception as e:
+        return {"error": str(e)}
+
+
+def format_batch(job_descriptions: dict) -> str:
+    """Prompt for several descriptions, each under a `[job_id=N]` header."""
+    return batch_prompt.format(job_descriptions="\n\n".join(
+        f"[job_id={job_id}]\n{description}" for job_id, description in job_descriptions.items()
+    ))
+
+
+async def aextract_job_batch(job_descriptions: dict, llm=None) -> dict:
+    """
+    Extract several descriptions in one structured-output call.
+
+    :param job_descriptions: Mapping of job id to description text
+    :param llm: Structured-output runnable for JobDescriptionBatch to use instead of the Cohere client
+    :return: {"results": {job_id: JobDescriptionSchema}} for the ids the model answered
+             (other ids are left out), or {"error": message, "invalid": bool} where
+             `invalid` marks a response that did not validate against the schema
+    """
+    runnable = llm or structured_llm_for(JobDescriptionBatch)
+    try:
+        response = await runnable.ainvoke(format_batch(job_descriptions))
+    except Exception as e:
+        return {"error": str(e), "invalid": _is_invalid_response(e)}
+    results = {}
+    for job in response.jobs:
+        if job.job_id in job_descriptions:
+            results[job.job_id] = JobDescriptionSchema.model_validate(job.model_dump(exclude={"job_id"}))
+    return {"results": results}
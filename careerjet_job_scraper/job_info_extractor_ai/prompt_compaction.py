@@ -0,0 +1,181 @@
+"""
+Shrink job descriptions before they are sent to the LLM.
+
+Two passes run on every description:
+
+* Boilerplate removal. Descriptions are split into segments (sentences or
+  lines). Segments that appear in a large share of the corpus, such as
+  "Only shortlisted candidates will be called", equal-opportunity
+  disclaimers and navigation text, are learned once with
+  `PromptCompactor.learn` and dropped. Segments repeated within a single
+  description are dropped too.
+* Token budget. What remains is cut to `token_budget` tokens, keeping whole
+  segments from the start of the ad while they fit.
+
+Token counts come from estimate_tokens(), a tokenizer-free approximation
+(words in chunks of up to six characters, plus punctuation) that is close
+enough to budget prompts and compare runs.
+
+    python prompt_compaction.py --db ../careerjet/careerjet_jobs.db --sample 5000
+"""
+import argparse
+import json
+import re
+import unicodedata
+from collections import Counter
+from typing import Iterable, Optional
+
+DEFAULT_BOILERPLATE_PATH = "boilerplate.json"
+DEFAULT_TOKEN_BUDGET = 1500
+# Shorter segments ("Salary:", "Dhaka.") are too likely to carry the ad's own data
+MIN_BOILERPLATE_WORDS = 4
+
+# Sentence ends followed by a capital, so "Tk. 15,000" or "Ltd. teams" stay whole
+_segment_break = re.compile(r"(?<=[.!?])\s+(?=[A-Z])|\s*\n\s*")
+_piece = re.compile(r"\w{1,6}|[^\w\s]")
+_whitespace = re.compile(r"\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate subword token count of `text`."""
+    return len(_piece.findall(text or ""))
+
+
+def split_segments(text: str) -> list:
+    """Sentences or lines of `text`, stripped, without empty ones."""
+    return [segment.strip() for segment in _segment_break.split(text or "") if segment.strip()]
+
+
+def segment_key(segment: str) -> str:
+    """Case-, Unicode- and whitespace-folded form used to compare segments."""
+    return _whitespace.sub(" ", unicodedata.normalize("NFKC", segment).casefold()).strip()
+
+
+class PromptCompactor:
+    """
+    Drops learned boilerplate segments and repeated segments, then truncates
+    to `token_budget` estimated tokens (0 or None disables truncation).
+    """
+
+    def __init__(self, boilerplate: Iterable[str] = (), token_budget: Optional[int] = DEFAULT_TOKEN_BUDGET):
+        self.boilerplate = frozenset(boilerplate)
+        self.token_budget = token_budget
+        self.compacted = 0
+        self.truncated = 0
+        self.segments_dropped = 0
+        self.tokens_before = 0
+        self.tokens_after = 0
+
+    @classmethod
+    def learn(cls, descriptions: Iterable[str], min_fraction: float = 0.05, min_docs: int = 20,
+              token_budget: Optional[int] = DEFAULT_TOKEN_BUDGET) -> "PromptCompactor":
+        """
+        Treat every segment of at least MIN_BOILERPLATE_WORDS words found in at
+        least `min_fraction` of `descriptions` (and in at least `min_docs` of
+        them) as boilerplate.
+        """
+        document_frequency = Counter()
+        documents = 0
+        for description in descriptions:
+            documents += 1
+            document_frequency.update({segment_key(segment) for segment in split_segments(description)})
+        threshold = max(min_docs, min_fraction * documents)
+        boilerplate = {
+            key for key, count in document_frequency.items()
+            if count >= threshold and len(key.split()) >= MIN_BOILERPLATE_WORDS
+        }
+        return cls(boilerplate, token_budget)
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_BOILERPLATE_PATH,
+             token_budget: Optional[int] = DEFAULT_TOKEN_BUDGET) -> "PromptCompactor":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f)["segments"], token_budget)
+
+    def save(self, path: str = DEFAULT_BOILERPLATE_PATH) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"segments": sorted(self.boilerplate)}, f, ensure_ascii=False, indent=2)
+
+    def compact(self, description: str) -> str:
+        """Return `description` without boilerplate, within the token budget."""
+        kept, seen, tokens = [], set(), 0
+        segments = split_segments(description)
+        for segment in segments:
+            key = segment_key(segment)
+            if key in self.boilerplate or key in seen:
+                self.segments_dropped += 1
+                continue
+            seen.add(key)
+            cost = estimate_tokens(segment)
+            if self.token_budget and tokens + cost > self.token_budget:
+                # Cut the first segment that does not fit at a piece boundary
+                remaining = self.token_budget - tokens
+                if remaining > 0:
+                    cut = [match.end() for match in _piece.finditer(segment)][remaining - 1]
+                    kept.append(segment[:cut])
+                    tokens += remaining
+                self.truncated += 1
+                break
+            kept.append(segment)
+            tokens += cost
+        self.compacted += 1
+        self.tokens_before += estimate_tokens(description)
+        self.tokens_after += tokens
+        return " ".join(kept)
+
+    def stats(self) -> dict:
+        return {
+            "boilerplate_segments": len(self.boilerplate),
+            "compacted": self.compacted,
+            "truncated": self.truncated,
+            "segments_dropped": self.segments_dropped,
+            "tokens_before": self.tokens_before,
+            "tokens_after": self.tokens_after,
+            "token_reduction": round(1 - self.tokens_after / self.tokens_before, 3) if self.tokens_before else 0.0,
+        }
+
+
+def load_compactor(store, path: str = DEFAULT_BOILERPLATE_PATH,
+                   token_budget: Optional[int] = DEFAULT_TOKEN_BUDGET,
+                   sample: int = 5000) -> PromptCompactor:
+    """
+    The compactor saved at `path`, or one learned from the latest `sample`
+    descriptions in `store` when there is none yet. A learned set is saved to
+    `path` once the corpus is large enough to yield any boilerplate.
+    """
+    try:
+        return PromptCompactor.load(path, token_budget)
+    except FileNotFoundError:
+        compactor = PromptCompactor.learn(store.sample_descriptions(sample), token_budget=token_budget)
+        if compactor.boilerplate:
+            compactor.save(path)
+        return compactor
+
+
+def main():
+    from job_store import DEFAULT_DB_PATH, open_store
+
+    parser = argparse.ArgumentParser(description="Learn boilerplate segments from stored job descriptions.")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="Path to careerjet_jobs.db or a postgresql:// URL")
+    parser.add_argument("--out", default=DEFAULT_BOILERPLATE_PATH)
+    parser.add_argument("--sample", type=int, default=5000, help="Most recent descriptions to learn from")
+    parser.add_argument("--min-fraction", type=float, default=0.05,
+                        help="Share of descriptions a segment must appear in to count as boilerplate")
+    parser.add_argument("--min-docs", type=int, default=20)
+    args = parser.parse_args()
+
+    store = open_store(args.db)
+    try:
+        descriptions = store.sample_descriptions(args.sample)
+    finally:
+        store.close()
+    compactor = PromptCompactor.learn(descriptions, args.min_fraction, args.min_docs)
+    compactor.save(args.out)
+    for description in descriptions:
+        compactor.compact(description)
+    print(f"Learned {len(compactor.boilerplate)} boilerplate segments from {len(descriptions)} descriptions "
+          f"into {args.out}: {compactor.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""
+Rule-based pre-extraction of JobDescriptionSchema fields.
+
+Several fields are easy to find without an LLM: an email address, a
+"Salary:" line, an "Address:" line, a section under a "Requirements"
+heading, or the company name the listing page already gave. `pre_extract` fills what it can and scores each field from 0 to 1.
+That includes fields it is confident are *absent*: an ad with no email
+address at all has application_email None with high confidence.
+
+`RuleExtraction.plan(threshold)` picks the cheapest route for a job:
+
+* "rules": every field is at or above the threshold, so no LLM call is needed.
+* "sections": only job_responsibilities/job_requirements are missing, so
+  the LLM is asked for those alone (JobSectionsSchema, a shorter response).
+* "llm": the full schema. Confident rule values fill fields the LLM left empty.
+
+Descriptions are stored as one line (extractors.join_text), so headings and
+labels are found inside running text instead of at line starts.
+
+    python ../benchmarks/eval_rule_extractor.py   # field accuracy on labelled fixtures
+"""
+import re
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_RULES_THRESHOLD = 0.7
+# Part of the extraction cache version; bump when rules change their output
+RULES_VERSION = "2"
+
+SECTION_FIELDS = ("job_responsibilities", "job_requirements")
+RULE_FIELDS = ("company_name", "company_address", "application_email", "benefits", "compensation")
+
+HEADINGS = {
+    "job_responsibilities": [
+        "Job Responsibilities", "Key Responsibilities", "Duties and Responsibilities",
+        "Roles and Responsibilities", "Responsibilities", "Job Context", "Job Description", "Duties",
+        "What You Will Do",
+    ],
+    "job_requirements": [
+        "Educational Requirements", "Experience Requirements", "Additional Requirements", "Job Requirements",
+        "Requirements", "Qualifications", "Required Skills", "What We Are Looking For",
+    ],
+    "benefits": [
+        "Compensation & Other Benefits", "Compensation and Other Benefits", "Other Benefits", "Benefits",
+        "Facilities", "Perks", "What We Offer",
+    ],
+    # Headings and phrases that only end the section before them
+    None: [
+        "Salary Range", "Salary", "Job Location", "Employment Status", "Employment Type", "Workplace",
+        "Company Information", "About Us", "About the Company", "Company Address", "Address",
+        "Application Deadline", "How to Apply", "Apply Procedure", "Read Before Apply", "Send your CV",
+        "Send your resume", "Email your CV", "Interested candidates", "Only shortlisted", "Our office",
+        "For queries", "Apply at", "Apply by", "Apply online", "Apply through", "Please apply",
+    ],
+}
+
+_heading = re.compile(
+    r"(?:^|(?<=[\s.:;!?]))(?P<heading>"
+    + "|".join(
+        f"{re.escape(h)}|{re.escape(h.upper())}"
+        for h in sorted((h for names in HEADINGS.values() for h in names), key=len, reverse=True)
+    )
+    + r")(?P<colon>\s*:)?(?=\s|$)"
+)
+_heading_kind = {h.casefold(): kind for kind, names in HEADINGS.items() for h in names}
+# A section word carrying on a sentence ("handle Duties assigned by ...") rather than heading one
+_prose_after = re.compile(r"\s+[a-z]")
+# Confidence of a section: every heading strong, or some only found inside running text.
+# Weak sections stay below DEFAULT_RULES_THRESHOLD, so they never skip the LLM on their own
+STRONG_SECTION, WEAK_SECTION = 0.9, 0.6
+
+_email = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)*\.[A-Za-z]{2,}")
+_apply_cue = re.compile(r"\b(?:send|apply|cv|resume|résumé|application|submit|mail)\b", re.IGNORECASE)
+
+_currency = r"(?:Tk\.?|BDT|৳|USD|US\$|\$|Taka)"
+_number = r"\d[\d,]*(?:\.\d+)?\s*[kK]?"
+_amount = re.compile(
+    rf"(?:{_currency}\s*)?{_number}(?:\s*(?:-|–|to)\s*(?:{_currency}\s*)?{_number})?"
+    rf"(?:\s*(?:{_currency}))?(?:\s*(?:per|/|a)\s*(?:month|year|annum|hour|week|day)|\s*(?:monthly|yearly|annually))?"
+)
+_currency_amount = re.compile(
+    rf"{_currency}\s*{_number}(?:\s*(?:-|–|to)\s*(?:{_currency}\s*)?{_number})?"
+    rf"(?:\s*(?:per|/|a)\s*(?:month|year|annum|hour|week|day)|\s*(?:monthly|yearly|annually))?"
+    rf"|{_number}(?:\s*(?:-|–|to)\s*{_number})?\s*(?:BDT|Taka|USD)\b"
+)
+_salary_label = re.compile(r"\b(?:Salary(?: Range)?|Compensation|Remuneration|Pay Scale)\s*:\s*", re.IGNORECASE)
+_negotiable = re.compile(r"negotiable", re.IGNORECASE)
+_pay_words = re.compile(r"\b(?:salary|salaries|remuneration|compensation|wage|pay scale|taka|tk\.?|bdt)\b|৳",
+                        re.IGNORECASE)
+
+_address_label = re.compile(r"\b(?:Company Address|Office Address|Address)\s*:\s*", re.IGNORECASE)
+_address_start = re.compile(r"\b(?:House|Plot|Holding|Level|Road|Rd\.|Block|Sector|Suite|Floor)\s*(?:No\.?\s*)?#?\s*\d")
+_address_end = re.compile(r"\b[A-Z][a-z]+\s*-\s*\d{4}\b|\bBangladesh\b")
+_job_location = re.compile(r"\bJob Location\s*:?\s*((?:[A-Z][\w-]*,?\s*){1,3})")
+
+_company_label = re.compile(r"\bCompany(?: Name)?\s*:\s*")
+_about_company = re.compile(r"\bAbout\s+((?:[A-Z][\w&.'-]*\s*){1,6})")
+_legal_name = re.compile(
+    r"\b((?:[A-Z][\w&'-]*\.?\s+){1,5}(?:Ltd\.?|Limited|PLC|Inc\.?|Corporation|Group|Bank|Foundation))(?=\W|$)"
+)
+
+_sentence_end = re.compile(r"(?<=[a-z0-9)])\.(?=\s+[A-Z]|\s*$)")
+_benefit_words = re.compile(
+    r"\b(?:benefits?|facilit(?:y|ies)|perks?|bonus(?:es)?|allowances?|insurance|provident fund|gratuity|"
+    r"incentives?|leave encashment|lunch)\b",
+    re.IGNORECASE,
+)
+
+
+class RuleExtraction:
+    """Field values found by the rules and a 0-1 confidence for each."""
+
+    def __init__(self, fields: Dict[str, Optional[str]], confidence: Dict[str, float]):
+        self.fields = fields
+        self.confidence = confidence
+
+    def confident(self, threshold: float = DEFAULT_RULES_THRESHOLD) -> Dict[str, Optional[str]]:
+        """Fields whose confidence reaches `threshold` (a None value means "not in the ad")."""
+        return {name: value for name, value in self.fields.items() if self.confidence[name] >= threshold}
+
+    def plan(self, threshold: float = DEFAULT_RULES_THRESHOLD) -> str:
+        """"rules", "sections" or "llm"; see the module docstring."""
+        confident = self.confident(threshold)
+        if all(name in confident for name in RULE_FIELDS):
+            if all(confident.get(name) for name in SECTION_FIELDS):
+                return "rules"
+            return "sections"
+        return "llm"
+
+    def merge(self, extracted: dict, threshold: float = DEFAULT_RULES_THRESHOLD) -> dict:
+        """`extracted` (LLM fields) with empty values filled from confident rule values."""
+        merged = dict(extracted)
+        for name, value in self.confident(threshold).items():
+            if value and not merged.get(name):
+                merged[name] = value
+        return merged
+
+
+def _clean(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip(" \t\n:;,-–•*")
+
+
+def _find_headings(text: str) -> List[Tuple[int, int, Optional[str], bool]]:
+    """
+    (start, end, kind, strong) for each heading; strong = followed by ':' or
+    at a line, sentence or text start. A section heading that is neither and
+    is followed by a lowercase word is part of a sentence and is skipped.
+    """
+    found = []
+    for match in _heading.finditer(text):
+        start = match.start("heading")
+        # Last character before the heading, skipping spaces and tabs, without copying the prefix
+        previous = start - 1
+        while previous >= 0 and text[previous] in " \t":
+            previous -= 1
+        strong = bool(match.group("colon")) or previous < 0 or text[previous] in "\n.:!?"
+        kind = _heading_kind[match.group("heading").casefold()]
+        if not strong and kind is not None and _prose_after.match(text, match.end()):
+            continue
+        found.append((start, match.end(), kind, strong))
+    return found
+
+
+def _sections(text: str, headings) -> Dict[str, Tuple[str, float]]:
+    """Text under each section kind (several headings of one kind are joined) and its confidence."""
+    parts: Dict[str, List[str]] = {}
+    strength: Dict[str, List[bool]] = {}
+    for index, (start, end, kind, strong) in enumerate(headings):
+        if kind is None:
+            continue
+        stop = headings[index + 1][0] if index + 1 < len(headings) else len(text)
+        body = _clean(text[end:stop])
+        if len(body.split()) < 2:
+            continue
+        parts.setdefault(kind, []).append(body)
+        strength.setdefault(kind, []).append(strong)
+    return {
+        kind: ("\n".join(bodies), STRONG_SECTION if all(strength[kind]) else WEAK_SECTION)
+        for kind, bodies in parts.items()
+    }
+
+
+def _application_email(text: str) -> Tuple[Optional[str], float]:
+    emails = list(dict.fromkeys(match.group(0).rstrip(".") for match in _email.finditer(text)))
+    if not emails:
+        return None, 0.95
+    if len(emails) == 1:
+        return emails[0], 0.95
+    # Several addresses: take the one closest after an "apply/send CV" cue
+    for email in emails:
+        position = text.find(email)
+        if _apply_cue.search(text[max(0, position - 80):position]):
+            return email, 0.8
+    return emails[0], 0.5
+
+
+def _compensation(text: str) -> Tuple[Optional[str], float]:
+    for label in _salary_label.finditer(text):
+        rest = text[label.end():label.end() + 120]
+        if _negotiable.match(rest):
+            return "Negotiable", 0.9
+        amount = _amount.match(rest)
+        if amount and any(ch.isdigit() for ch in amount.group(0)):
+            return _clean(amount.group(0)), 0.9
+    amount = _currency_amount.search(text)
+    if amount:
+        return _clean(amount.group(0)), 0.7
+    if _pay_words.search(text):
+        return None, 0.4  # Pay is mentioned ("attractive salary") but not as an amount
+    return None, 0.9
+
+
+def _until_boundary(text: str, start: int, headings, limit: int = 160) -> str:
+    """Text from `start` to the next heading, line break or sentence end, at most `limit` characters."""
+    stop = min([h[0] for h in headings if h[0] >= start] + [start + limit, len(text)])
+    value = text[start:stop].split("\n", 1)[0]
+    end = _sentence_end.search(value)
+    return _clean(value[:end.start()] if end else value)
+
+
+def _company_address(text: str, headings) -> Tuple[Optional[str], float]:
+    label = _address_label.search(text)
+    if label:
+        rest = text[label.end():]
+        end = _address_end.search(rest[:200])
+        if end:
+            return _clean(rest[:end.end()]), 0.9
+        return _until_boundary(text, label.end(), headings) or None, 0.8
+    start = _address_start.search(text)
+    if start:
+        end = _address_end.search(text, start.start(), start.start() + 200)
+        if end:
+            return _clean(text[start.start():end.end()]), 0.7
+        return _until_boundary(text, start.start(), headings), 0.5
+    location = _job_location.search(text)
+    if location:
+        return _clean(location.group(1)), 0.75
+    return None, 0.75
+
+
+def _company_name(text: str, headings, listing_company: Optional[str]) -> Tuple[Optional[str], float]:
+    if listing_company:
+        # The listing names the employer; more certain when the ad mentions it too
+        return listing_company, 0.9 if listing_company.casefold() in text.casefold() else 0.8
+    label = _company_label.search(text)
+    if label:
+        value = _until_boundary(text, label.end(), headings, limit=80)
+        if value:
+            return value, 0.9
+    # Names inside the sections are usually clients or partners, not the employer
+    first_section = min([start for start, _, kind, _ in headings if kind in SECTION_FIELDS] + [len(text)])
+    names = [_clean(match.group(1)) for match in _legal_name.finditer(text, 0, first_section)]
+    about = _about_company.search(text)
+    if about:
+        named = _clean(about.group(1))
+        for name in names:
+            if name.startswith(named) or named.startswith(name):
+                return name, 0.85
+    if names and len(set(names)) == 1:
+        return names[0], 0.75
+    if names:
+        return max(set(names), key=names.count), 0.5
+    return None, 0.3
+
+
+def _benefits(text: str, sections) -> Tuple[Optional[str], float]:
+    if "benefits" in sections:
+        return sections["benefits"]
+    if _benefit_words.search(text):
+        return None, 0.4  # Mentioned in passing; the LLM may still summarize them
+    return None, 0.85
+
+
+def pre_extract(description: str, listing_company: Optional[str] = None) -> RuleExtraction:
+    """
+    Apply the rules to one description.
+
+    :param description: Job ad text as stored in job_description
+    :param listing_company: Company from the job's `jobs` listing, if known
+    :return: RuleExtraction with a value (or None) and a confidence per schema field
+    """
+    text = description or ""
+    headings = _find_headings(text)
+    sections = _sections(text, headings)
+    found = {
+        name: sections.get(name, (None, 0.0)) for name in SECTION_FIELDS
+    }
+    found["company_name"] = _company_name(text, headings, listing_company)
+    found["company_address"] = _company_address(text, headings)
+    found["application_email"] = _application_email(text)
+    found["benefits"] = _benefits(text, sections)
+    found["compensation"] = _compensation(text)
+    return RuleExtraction(
+        {name: value for name, (value, _) in found.items()},
+        {name: confidence for name, (_, confidence) in found.items()},
+    )
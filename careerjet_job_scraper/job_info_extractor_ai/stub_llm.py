@@ -0,0 +1,75 @@
+import asyncio
+import random
+import re
+import time
+from typing import Optional, Type
+
+from langchain_core.exceptions import OutputParserException
+from pydantic import BaseModel
+
+from llm_job_description_parser_v2 import BatchedJobDescription, JobDescriptionBatch, JobDescriptionSchema
+
+_job_header = re.compile(r"^\[job_id=(\d+)\]$", re.MULTILINE)
+
+
+class StubStructuredLLM:
+    """
+    Local stand-in for the structured Cohere runnable, for benchmarks and dry runs.
+
+    Responds after `latency` ± `jitter` seconds with a JobDescriptionSchema built
+    from the prompt, and fails with probability `failure_rate` the way a
+    rate-limited API would.
+
+    With `batched=True` it stands in for the JobDescriptionBatch runnable
+    instead, answering every `[job_id=N]` section of the prompt. Prompts with
+    more than `max_batch_jobs` jobs fail validation, like a truncated response.
+    `schema` is the single-job model answered otherwise (e.g. JobSectionsSchema).
+    """
+
+    # Keeps stub results under their own extraction-cache version
+    model_name = "stub-llm"
+
+    def __init__(self, latency: float = 0.5, jitter: float = 0.2, failure_rate: float = 0.0,
+                 batched: bool = False, max_batch_jobs: Optional[int] = None,
+                 schema: Type[BaseModel] = JobDescriptionSchema):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.batched = batched
+        self.max_batch_jobs = max_batch_jobs
+        self.schema = schema
+        self.calls = 0
+
+    def _delay(self) -> float:
+        return max(0.0, self.latency + random.uniform(-self.jitter, self.jitter))
+
+    def _respond(self, prompt) -> BaseModel:
+        self.calls += 1
+        if random.random() < self.failure_rate:
+            raise RuntimeError("429 Too Many Requests (stub)")
+        text = str(prompt)
+        if self.batched:
+            return self._respond_batch(text)
+        return self.schema(
+            job_responsibilities=text[-200:],
+            job_requirements=text[-100:],
+        )
+
+    def _respond_batch(self, text: str) -> JobDescriptionBatch:
+        parts = _job_header.split(text)
+        sections = dict(zip(map(int, parts[1::2]), parts[2::2]))
+        if self.max_batch_jobs is not None and len(sections) > self.max_batch_jobs:
+            raise OutputParserException(f"Response truncated after {self.max_batch_jobs} jobs (stub)")
+        return JobDescriptionBatch(jobs=[
+            BatchedJobDescription(job_id=job_id, job_responsibilities=section.strip()[-200:],
+                                  job_requirements=section.strip()[-100:])
+            for job_id, section in sections.items()
+        ])
+
+    def invoke(self, prompt) -> BaseModel:
+        time.sleep(self._delay())
+        return self._respond(prompt)
+
+    async def ainvoke(self, prompt) -> BaseModel:
+        await asyncio.sleep(self._delay())
+        return self._respond(prompt)
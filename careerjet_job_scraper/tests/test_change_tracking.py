@@ -0,0 +1,87 @@
+"""
+Change sequence stamping (careerjet.db.ensure_change_tracking), which
+export_parquet.py and careerjet.search sync from.
+
+    python -m unittest discover -s tests      # from careerjet_job_scraper/
+"""
+import os
+import sys
+import tempfile
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "careerjet"))
+
+from careerjet.db import (  # noqa: E402
+    BufferedSQLiteWriter, change_sequence, claim_rows, connect, ensure_change_tracking, release_claims,
+    untracked_tables,
+)
+from careerjet.storage import SQLiteStorage  # noqa: E402
+
+LINK = "https://example.com/jobad/1"
+
+
+class ChangeTrackingTest(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.TemporaryDirectory(prefix="careerjet-test-")
+        self.path = os.path.join(self.workdir.name, "jobs.db")
+        self.storage = SQLiteStorage(BufferedSQLiteWriter(self.path))
+        self.storage.ensure_jobs_table()
+        self.storage.ensure_description_table()
+        self.conn = self.storage.writer.connection
+
+    def tearDown(self):
+        self.storage.close()
+        self.workdir.cleanup()
+
+    def stamp(self, table="jobs"):
+        return self.conn.execute(f"SELECT change_seq FROM {table} WHERE job_link = ?", (LINK,)).fetchone()[0]
+
+    def test_insert_stamps_the_next_value(self):
+        self.conn.execute("INSERT INTO jobs (job_link, title) VALUES (?, 'Accountant')", (LINK,))
+        first = self.stamp()
+        self.conn.execute("INSERT INTO job_description (job_link, job_description) VALUES (?, 'text')", (LINK,))
+        self.assertEqual(self.stamp("job_description"), first + 1)
+        self.assertEqual(change_sequence(self.conn), first + 1)
+
+    def test_content_update_stamps_again(self):
+        self.conn.execute("INSERT INTO jobs (job_link, title) VALUES (?, 'Accountant')", (LINK,))
+        before = self.stamp()
+        self.conn.execute("UPDATE jobs SET title = 'Senior Accountant' WHERE job_link = ?", (LINK,))
+        self.assertGreater(self.stamp(), before)
+
+    def test_replace_stamps_again(self):
+        self.conn.execute("INSERT INTO job_description (job_link, job_description) VALUES (?, 'old')", (LINK,))
+        before = self.stamp("job_description")
+        self.conn.execute("INSERT OR REPLACE INTO job_description (job_link, job_description) VALUES (?, 'new')",
+                          (LINK,))
+        self.assertGreater(self.stamp("job_description"), before)
+
+    def test_claims_and_unchanged_values_do_not_stamp(self):
+        self.conn.execute("INSERT INTO jobs (job_link, title) VALUES (?, 'Accountant')", (LINK,))
+        before, sequence = self.stamp(), change_sequence(self.conn)
+        claim_rows(self.conn, "jobs", "crawl_status", "worker-a", 10, 60)
+        release_claims(self.conn, "jobs", "crawl_status", "worker-a")
+        self.conn.execute("UPDATE jobs SET crawl_status = 'DONE' WHERE job_link = ?", (LINK,))
+        self.conn.execute("UPDATE jobs SET title = 'Accountant' WHERE job_link = ?", (LINK,))
+        self.assertEqual(self.stamp(), before)
+        self.assertEqual(change_sequence(self.conn), sequence)
+
+    def test_rows_from_before_tracking_get_zero(self):
+        conn = connect(os.path.join(self.workdir.name, "legacy.db"))
+        try:
+            conn.execute("CREATE TABLE jobs (id INTEGER PRIMARY KEY, job_link TEXT UNIQUE, title TEXT)")
+            conn.execute("INSERT INTO jobs (job_link, title) VALUES (?, 'Accountant')", (LINK,))
+            self.assertEqual(untracked_tables(conn, ["jobs", "job_description"]), ["jobs"])
+            ensure_change_tracking(conn, "jobs")
+            ensure_change_tracking(conn, "jobs")  # Safe on every start
+            self.assertEqual(untracked_tables(conn, ["jobs"]), [])
+            self.assertEqual(conn.execute("SELECT change_seq FROM jobs").fetchone(), (0,))
+            conn.execute("UPDATE jobs SET title = 'Auditor'")
+            self.assertEqual(conn.execute("SELECT change_seq FROM jobs").fetchone(), (1,))
+        finally:
+            conn.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
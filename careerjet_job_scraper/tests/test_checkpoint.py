@@ -0,0 +1,144 @@
+"""
+Resuming after a crash from the crawl frontier checkpoint
+(careerjet.checkpoint.Checkpoint) and the extractor's journal
+(job_info_extractor_ai/extraction_checkpoint.py).
+
+    python -m unittest discover -s tests      # from careerjet_job_scraper/
+"""
+import os
+import sys
+import tempfile
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "careerjet"))
+sys.path.insert(0, os.path.join(HERE, "..", "job_info_extractor_ai"))
+
+from careerjet.checkpoint import Checkpoint, CheckpointLocked, FAILED  # noqa: E402
+from extraction_checkpoint import ExtractionCheckpoint  # noqa: E402
+from job_store import SQLiteJobStore  # noqa: E402
+
+LINKS = [f"https://example.com/jobad/{i}" for i in range(4)]
+
+
+class FrontierCheckpointTest(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.TemporaryDirectory(prefix="careerjet-test-")
+        self.path = os.path.join(self.workdir.name, "checkpoints", "careerjet_crawler.db")
+
+    def tearDown(self):
+        self.workdir.cleanup()
+
+    def test_in_flight_requests_are_queued_again_after_a_crash(self):
+        checkpoint = Checkpoint(self.path)
+        for page in range(3):
+            self.assertTrue(checkpoint.push(f"page-{page}", 0, f"request {page}".encode()))
+        self.assertFalse(checkpoint.push("page-0", 0, b"request 0"))
+        done, in_flight = checkpoint.pop(), checkpoint.pop()
+        checkpoint.mark_done([done[0]])
+        checkpoint.close()  # Killed with one request at the downloader
+
+        checkpoint = Checkpoint(self.path)
+        try:
+            self.assertEqual(checkpoint.requeue_in_flight(), 1)
+            self.assertEqual(checkpoint.counts(), {"queued": 2, "in_flight": 0, "done": 1, "failed": 0})
+            self.assertEqual(checkpoint.pop(), in_flight)
+            self.assertFalse(checkpoint.push("page-0", 0, b"request 0"))  # Finished pages stay seen
+        finally:
+            checkpoint.discard()
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_retry_goes_back_into_its_row(self):
+        checkpoint = Checkpoint(self.path)
+        try:
+            checkpoint.push("page-0", 0, b"request")
+            row_id, _ = checkpoint.pop()
+            self.assertTrue(checkpoint.requeue(row_id, -1, b"retry"))
+            self.assertFalse(checkpoint.requeue(row_id, -1, b"retry"))  # Only in-flight rows
+            self.assertEqual(checkpoint.pop(), (row_id, b"retry"))
+            checkpoint.mark_done([row_id], FAILED)
+            checkpoint.mark_done([row_id])  # A later DONE does not overwrite the failure
+            self.assertEqual(checkpoint.counts(), {"queued": 0, "in_flight": 0, "done": 0, "failed": 1})
+        finally:
+            checkpoint.close()
+
+    def test_second_process_is_locked_out(self):
+        checkpoint = Checkpoint(self.path)
+        try:
+            with self.assertRaises(CheckpointLocked):
+                Checkpoint(self.path)
+        finally:
+            checkpoint.close()
+
+
+class ExtractionCheckpointTest(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.TemporaryDirectory(prefix="careerjet-test-")
+        self.store = SQLiteJobStore(os.path.join(self.workdir.name, "jobs.db"))
+        self.store.conn.execute(
+            "CREATE TABLE job_description (id INTEGER PRIMARY KEY AUTOINCREMENT, job_link TEXT UNIQUE, "
+            "job_description TEXT, status TEXT DEFAULT 'NEW')"
+        )
+        self.store.ensure_schema()
+        self.store.conn.executemany("INSERT INTO job_description (job_link, job_description) VALUES (?, 'text')",
+                                    [(link,) for link in LINKS])
+        self.path = os.path.join(self.workdir.name, "checkpoints", "extractor.jsonl")
+
+    def tearDown(self):
+        self.store.close()
+        self.workdir.cleanup()
+
+    def statuses(self):
+        return dict(self.store.conn.execute("SELECT job_link, status FROM job_description"))
+
+    def test_resume_saves_journaled_results_and_releases_claims(self):
+        checkpoint = ExtractionCheckpoint(self.path)
+        checkpoint.resume(self.store, "crashed")
+        claimed = self.store.claim_jobs("crashed", 3)
+        job_id, job_link, _ = claimed[0]
+        checkpoint.record(job_id, job_link, {"job_responsibilities": "Audit", "job_requirements": "CA"})
+        checkpoint.close()  # Killed before the result reached the database
+
+        checkpoint = ExtractionCheckpoint(self.path)
+        self.assertEqual(checkpoint.resume(self.store, "next"), {"replayed": 1, "released": 2})
+        self.assertEqual(self.statuses(), {job_link: "DONE", **{link: "NEW" for link in LINKS if link != job_link}})
+        self.assertEqual(
+            self.store.conn.execute("SELECT job_responsibilities FROM job_components WHERE job_link = ?",
+                                    (job_link,)).fetchone(),
+            ("Audit",),
+        )
+        checkpoint.discard()
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_committed_results_are_not_replayed(self):
+        checkpoint = ExtractionCheckpoint(self.path)
+        checkpoint.resume(self.store, "crashed")
+        (job_id, job_link, _), = self.store.claim_jobs("crashed", 1)
+        checkpoint.record(job_id, job_link, {"job_responsibilities": "Audit", "job_requirements": "CA"})
+        self.store.save_components(job_id, job_link, {"job_responsibilities": "Audit", "job_requirements": "CA"})
+        checkpoint.committed()
+        checkpoint.close()
+
+        checkpoint = ExtractionCheckpoint(self.path)
+        try:
+            self.assertEqual(checkpoint.resume(self.store, "next"), {"replayed": 0, "released": 0})
+        finally:
+            checkpoint.discard()
+
+    def test_torn_journal_line_is_ignored(self):
+        checkpoint = ExtractionCheckpoint(self.path)
+        checkpoint.resume(self.store, "crashed")
+        self.store.claim_jobs("crashed", 1)
+        checkpoint.file.write('{"job_id": 1, "job_li')
+        checkpoint.close()
+
+        checkpoint = ExtractionCheckpoint(self.path)
+        try:
+            self.assertEqual(checkpoint.resume(self.store, "next"), {"replayed": 0, "released": 1})
+            self.assertEqual(set(self.statuses().values()), {"NEW"})
+        finally:
+            checkpoint.discard()
+
+
+if __name__ == "__main__":
+    unittest.main()
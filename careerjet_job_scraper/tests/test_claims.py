@@ -0,0 +1,108 @@
+"""
+Lease claims on the work queues (careerjet.db.claim_rows / release_claims),
+through the SQLite storage the spiders use and the extractor's job store.
+
+    python -m unittest discover -s tests      # from careerjet_job_scraper/
+"""
+import os
+import sys
+import tempfile
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "careerjet"))
+sys.path.insert(0, os.path.join(HERE, "..", "job_info_extractor_ai"))
+
+from careerjet.db import BufferedSQLiteWriter, shard_of  # noqa: E402
+from careerjet.storage import SQLiteStorage  # noqa: E402
+from job_store import SQLiteJobStore  # noqa: E402
+
+LINKS = [f"https://example.com/jobad/{i}" for i in range(10)]
+
+
+class ListingClaimTest(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.TemporaryDirectory(prefix="careerjet-test-")
+        self.storage = SQLiteStorage(BufferedSQLiteWriter(os.path.join(self.workdir.name, "jobs.db")))
+        self.storage.ensure_jobs_table()
+        self.storage.writer.connection.executemany("INSERT INTO jobs (job_link) VALUES (?)", [(link,) for link in LINKS])
+
+    def tearDown(self):
+        self.storage.close()
+        self.workdir.cleanup()
+
+    def statuses(self):
+        return dict(self.storage.writer.execute("SELECT job_link, crawl_status FROM jobs"))
+
+    def test_owners_claim_disjoint_rows(self):
+        first = self.storage.claim_jobs("worker-a", 4, 60)
+        second = self.storage.claim_jobs("worker-b", 10, 60)
+        self.assertEqual(len(first), 4)
+        self.assertEqual(len(second), 6)
+        self.assertFalse(set(first) & set(second))
+        self.assertEqual(self.storage.claim_jobs("worker-c", 10, 60), [])
+        owners = dict(self.storage.writer.execute("SELECT job_link, claim_owner FROM jobs"))
+        self.assertTrue(all(owners[link] == "worker-a" for link in first))
+        self.assertEqual(set(self.statuses().values()), {"IN_PROGRESS"})
+
+    def test_release_hands_back_only_unfinished_rows_of_the_owner(self):
+        mine = self.storage.claim_jobs("worker-a", 3, 60)
+        theirs = self.storage.claim_jobs("worker-b", 3, 60)
+        self.storage.set_job_status(mine[0], "DONE")
+        self.assertEqual(self.storage.release_claims("worker-a"), 2)
+        statuses = self.statuses()
+        self.assertEqual(statuses[mine[0]], "DONE")
+        self.assertEqual({statuses[link] for link in mine[1:]}, {"NEW"})
+        self.assertEqual({statuses[link] for link in theirs}, {"IN_PROGRESS"})
+        lease = self.storage.writer.execute(
+            "SELECT claim_owner, lease_expires_at FROM jobs WHERE job_link = ?", (mine[1],)
+        ).fetchone()
+        self.assertEqual(lease, (None, None))
+
+    def test_expired_lease_is_claimable_again(self):
+        crashed = self.storage.claim_jobs("crashed", 2, -1)  # Lease already over
+        held = self.storage.claim_jobs("alive", 3, 60)
+        reclaimed = self.storage.claim_jobs("worker-b", 10, 60)
+        self.assertTrue(set(crashed) <= set(reclaimed))
+        self.assertFalse(set(held) & set(reclaimed))
+        self.assertEqual(self.storage.release_claims("crashed"), 0)
+
+    def test_shard_claims_only_its_links(self):
+        claimed = self.storage.claim_jobs("worker-a", 10, 60, shard=1, shards=3)
+        self.assertEqual(sorted(claimed), sorted(link for link in LINKS if shard_of(link, 3) == 1))
+
+
+class DescriptionClaimTest(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.TemporaryDirectory(prefix="careerjet-test-")
+        self.store = SQLiteJobStore(os.path.join(self.workdir.name, "jobs.db"))
+        self.store.conn.execute(
+            "CREATE TABLE job_description (id INTEGER PRIMARY KEY AUTOINCREMENT, job_link TEXT UNIQUE, "
+            "job_description TEXT, status TEXT DEFAULT 'NEW')"
+        )
+        self.store.ensure_schema()
+        self.store.conn.executemany(
+            "INSERT INTO job_description (job_link, job_description, status) VALUES (?, 'text', ?)",
+            [(link, status) for link, status in zip(LINKS, ("NEW", "DONE", "DUPLICATE", "ERROR", "IN_PROGRESS"))],
+        )
+
+    def tearDown(self):
+        self.store.close()
+        self.workdir.cleanup()
+
+    def test_finished_descriptions_are_not_claimed(self):
+        # The IN_PROGRESS row has no lease: left by a run from before leases, so claimable
+        claimed = {job_link for _, job_link, _ in self.store.claim_jobs("worker-a", 10)}
+        self.assertEqual(claimed, {LINKS[0], LINKS[4]})
+
+    def test_failed_extraction_releases_the_lease(self):
+        (job_id, _, _), = self.store.claim_jobs("worker-a", 1)
+        self.assertEqual(self.store.fail_job(job_id, max_attempts=2), "NEW")
+        (again, _, _), = self.store.claim_jobs("worker-b", 1)
+        self.assertEqual(again, job_id)
+        self.assertEqual(self.store.fail_job(job_id, max_attempts=2), "ERROR")
+        self.assertEqual([row for row in self.store.claim_jobs("worker-c", 10) if row[0] == job_id], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+"""
+Crash recovery of the rotated NDJSON feeds (careerjet.feeds.RotatingFeedWriter).
+
+    python -m unittest discover -s tests      # from careerjet_job_scraper/
+"""
+import os
+import sys
+import tempfile
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "careerjet"))
+
+from careerjet.feeds import MANIFEST, RotatingFeedWriter, read_feed, read_manifest  # noqa: E402
+
+STREAM = "jobs"
+
+
+class FeedRecoveryTest(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.TemporaryDirectory(prefix="careerjet-test-")
+        self.directory = self.workdir.name
+        self.stream_dir = os.path.join(self.directory, STREAM)
+
+    def tearDown(self):
+        self.workdir.cleanup()
+
+    def writer(self):
+        return RotatingFeedWriter(self.directory, STREAM, compression="gzip", max_seconds=3600)
+
+    def write(self, writer, first, count):
+        return [writer.write({"job_link": f"https://example.com/jobad/{i}"}) for i in range(first, first + count)]
+
+    def feed(self):
+        return [(offset, record["job_link"]) for offset, record in read_feed(self.directory, STREAM)]
+
+    def crash(self, writer):
+        """Stop without sealing, as a killed process would."""
+        writer.writer.close()
+        writer.file.close()
+
+    def test_leftover_part_is_abandoned_and_its_offsets_reused(self):
+        writer = self.writer()
+        self.write(writer, 0, 3)
+        writer.seal()
+        self.write(writer, 3, 2)
+        self.crash(writer)
+        self.assertTrue(any(name.endswith(".part") for name in os.listdir(self.stream_dir)))
+
+        writer = self.writer()
+        self.assertEqual(writer.next_offset, 3)
+        names = os.listdir(self.stream_dir)
+        self.assertFalse(any(name.endswith(".part") for name in names))
+        self.assertEqual(len([name for name in names if name.endswith(".abandoned")]), 1)
+        self.assertEqual(self.write(writer, 10, 2), [3, 4])
+        writer.close()
+        self.assertEqual([offset for offset, _ in self.feed()], [0, 1, 2, 3, 4])
+        self.assertEqual(self.feed()[3][1], "https://example.com/jobad/10")
+
+    def test_sealed_segment_missing_from_the_manifest_is_listed_again(self):
+        writer = self.writer()
+        self.write(writer, 0, 3)
+        writer.seal()
+        self.write(writer, 3, 4)
+        writer.close()
+        expected = self.feed()
+        # A crash between the rename and the manifest append
+        manifest = os.path.join(self.stream_dir, MANIFEST)
+        with open(manifest, encoding="utf-8") as f:
+            first = f.readline()
+        with open(manifest, "w", encoding="utf-8") as f:
+            f.write(first)
+        self.assertEqual(len(read_manifest(self.stream_dir)), 1)
+
+        writer = self.writer()
+        self.assertEqual(writer.next_offset, 7)
+        self.assertEqual(self.feed(), expected)
+        self.assertEqual(self.write(writer, 7, 1), [7])
+        writer.close()
+        self.assertEqual([segment["first_offset"] for segment in read_manifest(self.stream_dir)], [0, 3, 7])
+
+    def test_torn_manifest_line_is_dropped(self):
+        writer = self.writer()
+        self.write(writer, 0, 2)
+        writer.close()
+        with open(os.path.join(self.stream_dir, MANIFEST), "a", encoding="utf-8") as f:
+            f.write('{"file": "jobs-0000')
+        self.assertEqual([offset for offset, _ in self.feed()], [0, 1])
+
+        writer = self.writer()
+        self.write(writer, 2, 1)
+        writer.close()
+        self.assertEqual([offset for offset, _ in self.feed()], [0, 1, 2])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+"""
+The extractor's PromptTemplate (job_info_extractor_ai/llm_job_description_parser_v2.py)
+against LangChain's, which it replaces to keep LangChain out of the import.
+
+    python -m unittest discover -s tests      # from careerjet_job_scraper/
+
+Skipped when langchain_core is not installed.
+"""
+import importlib.util
+import os
+import sys
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "job_info_extractor_ai"))
+
+from llm_job_description_parser_v2 import batch_prompt, prompt, sections_prompt  # noqa: E402
+
+PROMPTS = {
+    "prompt": (prompt, "job_description"),
+    "sections_prompt": (sections_prompt, "job_description"),
+    "batch_prompt": (batch_prompt, "job_descriptions"),
+}
+# Braces, format fields and non-ASCII text must come through untouched
+DESCRIPTIONS = (
+    "Responsibilities:\n- Maintain {customer} accounts\n\nRequirements:\n- Tally, {0} and {{VAT}}",
+    "বেতন: ৳ 25,000 - 30,000 / month. Send CV to hr@example.com",
+    "",
+)
+
+
+@unittest.skipUnless(importlib.util.find_spec("langchain_core"), "langchain_core is not installed")
+class PromptTemplateTest(unittest.TestCase):
+    def langchain(self, template):
+        from langchain_core.prompts import PromptTemplate
+        return PromptTemplate.from_template(template.template)
+
+    def test_format_matches_langchain(self):
+        for name, (template, variable) in PROMPTS.items():
+            for description in DESCRIPTIONS:
+                with self.subTest(prompt=name, description=description[:20]):
+                    self.assertEqual(
+                        template.format(**{variable: description}),
+                        self.langchain(template).format(**{variable: description}),
+                    )
+
+    def test_partial_matches_langchain(self):
+        for name, (template, variable) in PROMPTS.items():
+            for description in DESCRIPTIONS:
+                with self.subTest(prompt=name, description=description[:20]):
+                    self.assertEqual(
+                        template.partial(**{variable: description}).format(),
+                        self.langchain(template).partial(**{variable: description}).format(),
+                    )
+
+    def test_same_variables_as_langchain(self):
+        for name, (template, variable) in PROMPTS.items():
+            with self.subTest(prompt=name):
+                self.assertEqual(self.langchain(template).input_variables, [variable])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+"""
+Field accuracy of rule pre-extraction (job_info_extractor_ai/rule_extractor.py)
+on the labelled descriptions in benchmarks/fixtures/job_descriptions.json.
+
+    python -m unittest discover -s tests      # from careerjet_job_scraper/
+
+Values are compared as in benchmarks/eval_rule_extractor.py, which prints
+the full coverage and accuracy report.
+"""
+import json
+import os
+import sys
+import unittest
+from collections import Counter
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "job_info_extractor_ai"))
+sys.path.insert(0, os.path.join(HERE, "..", "benchmarks"))
+
+from eval_rule_extractor import FIXTURES, correct  # noqa: E402
+from rule_extractor import DEFAULT_RULES_THRESHOLD, RULE_FIELDS, SECTION_FIELDS, pre_extract  # noqa: E402
+
+MIN_F1 = 0.6
+# Share of confident values that must match their label, per field
+MIN_ACCURACY = 0.8
+# Fixtures whose section words only appear inside sentences
+PROSE_HEADINGS = ("prose-no-headings", "prose-heading-words", "mid-sentence-capitalised-heading")
+
+
+def load_fixtures():
+    with open(FIXTURES, encoding="utf-8") as f:
+        return json.load(f)
+
+
+class RuleExtractorFixtureTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.fixtures = load_fixtures()
+        cls.extractions = {
+            fixture["id"]: pre_extract(fixture["description"], fixture.get("listing_company"))
+            for fixture in cls.fixtures
+        }
+
+    def test_confident_fields_are_accurate(self):
+        covered, right = Counter(), Counter()
+        for fixture in self.fixtures:
+            confident = self.extractions[fixture["id"]].confident(DEFAULT_RULES_THRESHOLD)
+            for field, value in confident.items():
+                covered[field] += 1
+                right[field] += correct(field, fixture["expected"][field], value, MIN_F1)
+        for field in SECTION_FIELDS + RULE_FIELDS:
+            with self.subTest(field=field):
+                self.assertGreater(covered[field], 0, "no fixture is covered by the rules")
+                self.assertGreaterEqual(right[field] / covered[field], MIN_ACCURACY)
+
+    def test_confident_sections_match_their_labels(self):
+        for fixture in self.fixtures:
+            confident = self.extractions[fixture["id"]].confident(DEFAULT_RULES_THRESHOLD)
+            for field in SECTION_FIELDS + ("benefits",):
+                if field in confident:
+                    with self.subTest(fixture=fixture["id"], field=field):
+                        self.assertTrue(correct(field, fixture["expected"][field], confident[field], MIN_F1),
+                                        confident[field])
+
+    def test_heading_words_in_prose_are_not_sections(self):
+        for fixture_id in PROSE_HEADINGS:
+            extraction = self.extractions[fixture_id]
+            with self.subTest(fixture=fixture_id):
+                self.assertNotEqual(extraction.plan(DEFAULT_RULES_THRESHOLD), "rules")
+                for field in SECTION_FIELDS:
+                    self.assertNotIn(field, extraction.confident(DEFAULT_RULES_THRESHOLD))
+
+    def test_heading_words_inside_a_section_do_not_split_it(self):
+        extraction = self.extractions["heading-words-inside-sections"]
+        self.assertIn("other Duties given by the operations head", extraction.fields["job_responsibilities"])
+        self.assertIn("Responsibilities covering customs clearance", extraction.fields["job_requirements"])
+
+    def test_every_fixture_is_labelled_for_every_field(self):
+        for fixture in self.fixtures:
+            with self.subTest(fixture=fixture["id"]):
+                self.assertEqual(set(fixture["expected"]), set(SECTION_FIELDS + RULE_FIELDS))
+
+
+if __name__ == "__main__":
+    unittest.main()